@@ -9,7 +9,14 @@
 import unittest
 from unittest import TestCase
 
-from wsimod.arcs.arcs import AltQueueArc, Arc, DecayArc, DecayArcAlt, QueueArc
+from wsimod.arcs.arcs import (
+    AltQueueArc,
+    Arc,
+    ArrayQueueArc,
+    DecayArc,
+    DecayArcAlt,
+    QueueArc,
+)
 from wsimod.core import constants
 from wsimod.nodes.nodes import Node
 from wsimod.nodes.storage import Storage
@@ -185,6 +192,57 @@ class MyTestClass(TestCase):
         _ = arc1.update_queue(direction="push")
         self.assertDictAlmostEqual(d1, arc1.vqip_out)
 
+    def test_queue_arc_buckets(self):
+        node1 = Node(name="1")
+        node2 = Storage(name="2", capacity=15)
+
+        node2.push_set_handler["other"] = node2.push_set_handler["default"]
+        node2.push_check_handler["other"] = node2.push_check_handler["default"]
+
+        arc1 = QueueArc(
+            in_port=node1,
+            out_port=node2,
+            name="arc1",
+            number_of_timesteps=1,
+        )
+
+        d1 = {"volume": 10, "phosphate": 0.0001, "temperature": 15}
+        d2 = {"volume": 10, "phosphate": 0.0003, "temperature": 15}
+
+        # Requests arriving at the same time (and tag) are merged
+        arc1.send_push_request(d1)
+        arc1.send_push_request(d2)
+        arc1.send_push_request(d1, tag="other")
+        arc1.send_push_request(d1, time=1)
+        self.assertEqual(3, len(arc1.queue))
+        d3 = {"volume": 20, "phosphate": 0.0004, "temperature": 15}
+        self.assertDictAlmostEqual(d3, arc1.queue[0]["vqip"])
+        self.assertEqual(10, arc1.queue[0]["average_flow"])
+        self.assertEqual([1, 1, 2], [x["arrival"] for x in arc1.queue])
+        self.assertNotIn("time", arc1.queue[0])
+
+        # Without backflow, water that is not received remains in the arc
+        arc1.end_timestep()
+        _ = arc1.update_queue(direction="push", backflow_enabled=False)
+        self.assertEqual(15, arc1.vqip_out["volume"])
+        self.assertEqual(5, arc1.queue[0]["vqip"]["volume"])
+        self.assertEqual(7.5, arc1.flow_out)
+
+        self.assertEqual(10, arc1.queue[1]["vqip"]["volume"])
+
+        # And is merged with requests arriving at the next timestep
+        arc1.end_timestep()
+        self.assertEqual(2, len(arc1.queue))
+        self.assertEqual(15, arc1.queue[0]["vqip"]["volume"])
+        self.assertEqual([2, 2], [x["arrival"] for x in arc1.queue])
+
+        # With backflow, water that is not received leaves the arc
+        node2.tank.storage = node2.empty_vqip()
+        backflow = arc1.update_queue(direction="push")
+        self.assertEqual(15, arc1.vqip_out["volume"])
+        self.assertEqual(10, backflow["volume"])
+        self.assertEqual([], arc1.queue)
+
     def test_queue_arc_pull(self):
         node1 = Node(name="1")
         node2 = Storage(name="2", capacity=10, initial_storage=5)
@@ -267,6 +325,36 @@ class MyTestClass(TestCase):
         self.assertDictAlmostEqual(d2, arc1.queue[0])
         self.assertDictAlmostEqual(d1, arc1.vqip_out)
 
+    def test_array_queue_arc(self):
+        arcs = [
+            type_(
+                in_port=Node(name="1"),
+                out_port=Waste(name="2"),
+                name="arc1",
+                number_of_timesteps=1,
+            )
+            for type_ in [AltQueueArc, ArrayQueueArc]
+        ]
+        d1 = {"volume": 10, "phosphate": 0.0001, "temperature": 15}
+        d2 = {"volume": 5, "phosphate": 0.0003, "temperature": 10}
+
+        # The ring gives the same queue as an AltQueueArc, including when it is
+        # extended after the start has moved on
+        for time, vqip in [(0, d1), (2, d2), (1, d1), (0, d2), (4, d1), (0, d1)]:
+            for arc in arcs:
+                arc.send_push_request(vqip, time=time)
+                arc.end_timestep()
+            queue, queue_ = arcs[0].queue, arcs[1].queue
+            for t in queue:
+                self.assertDictAlmostEqual(queue[t], dict(queue_[t]), 15)
+            for t in set(queue_).difference(queue):
+                self.assertEqual(0, queue_[t]["volume"])
+        self.assertEqual(2, arcs[1].queue_start)
+
+        # The queue cannot be edited
+        with self.assertRaises(TypeError):
+            arcs[1].queue[0] = d1
+
     def test_decay_arc(self):
         node1 = Node(name="1", data_input_dict={("temperature", 1): 10})
         node2 = Waste(name="2")
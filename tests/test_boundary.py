@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Tests for recording and replaying the flows crossing a boundary."""
+
+import tempfile
+import unittest
+import warnings
+import zipfile
+from pathlib import Path
+from unittest import TestCase
+
+from wsimod.arcs.arcs import Arc
+from wsimod.core import constants
+from wsimod.nodes.catchment import Catchment
+from wsimod.nodes.nodes import Node
+from wsimod.nodes.storage import River
+from wsimod.nodes.waste import Waste
+from wsimod.orchestration.model import Model, to_datetime
+
+
+class MyTestClass(TestCase):
+    def create_model(self):
+        """Create a river network, where r3 and c0 are upstream of arc r3-r2."""
+        constants.set_default_pollutants()
+        dates = [to_datetime("2000-01-{0:02d}".format(i)) for i in range(1, 31)]
+        data = {}
+        for i, date in enumerate(dates):
+            data[("temperature", date)] = 4 + i / 2
+            data[("flow", date)] = 5 + i % 4
+            for pol in constants.POLLUTANTS:
+                if pol != "temperature":
+                    data[(pol, date)] = 0.001 * (1 + i % 3)
+
+        rivers = {
+            name: River(name=name, length=length, data_input_dict=data)
+            for name, length in [("r1", 2000), ("r2", 200), ("r3", 5000)]
+        }
+        catchments = [
+            Catchment(name="c{0}".format(i), data_input_dict=data) for i in range(2)
+        ]
+        waste = Waste(name="waste")
+        arcs = [
+            Arc(name="c0-r3", in_port=catchments[0], out_port=rivers["r3"]),
+            Arc(name="c1-r2", in_port=catchments[1], out_port=rivers["r2"]),
+            Arc(name="r3-r2", in_port=rivers["r3"], out_port=rivers["r2"]),
+            Arc(name="r2-r1", in_port=rivers["r2"], out_port=rivers["r1"], capacity=9),
+            Arc(name="r1-waste", in_port=rivers["r1"], out_port=waste),
+        ]
+        model = Model()
+        model.add_instantiated_nodes(list(rivers.values()) + catchments + [waste])
+        model.add_instantiated_arcs(arcs)
+        model.dates = dates
+        return model
+
+    def test_replay(self):
+        model = self.create_model()
+        flows, tanks, _, _ = model.run(verbose=False, record_boundary=["r3-r2"])
+        self.assertEqual(
+            set(["push"]), set(record["direction"] for record in model.boundary)
+        )
+
+        # Recording does not leave the arcs wrapped
+        self.assertNotIn("send_push_request", model.arcs["r3-r2"].__dict__)
+
+        replay = self.create_model()
+        upstream = replay.replay_boundary(model.boundary)
+        self.assertEqual(set(["r3", "c0"]), upstream)
+        self.assertEqual(["r2", "r1"], replay.river_discharge_order)
+        self.assertIs(replay.nodes["r3-r2-replay"], replay.arcs["r3-r2"].in_port)
+
+        flows_, tanks_, _, _ = replay.run(verbose=False)
+        for name in ["r3-r2", "r2-r1", "r1-waste"]:
+            self.assertEqual(
+                [x for x in flows if x["arc"] == name],
+                [x for x in flows_ if x["arc"] == name],
+            )
+        self.assertEqual(
+            [x for x in tanks if x["node"] == "r1"],
+            [x for x in tanks_ if x["node"] == "r1"],
+        )
+
+    def test_prune(self):
+        model = self.create_model()
+        flows, _, _, _ = model.run(verbose=False)
+
+        pruned = self.create_model().prune(["r3"])
+        flows_, _, _, _ = pruned.run(verbose=False)
+        self.assertEqual(set(["c0", "r3", "r2-pruned"]), set(pruned.nodes))
+        self.assertEqual(["r3"], pruned.river_discharge_order)
+        for name in ["c0-r3", "r3-r2"]:
+            self.assertEqual(
+                [x for x in flows if x["arc"] == name],
+                [x for x in flows_ if x["arc"] == name],
+            )
+
+        # The capacity of r2-r1 still applies when r1 is removed
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            pruned = self.create_model().prune(["r2"])
+        self.assertEqual(set(["c0", "c1", "r3", "r2", "r1-pruned"]), set(pruned.nodes))
+        flows_, _, _, _ = pruned.run(verbose=False)
+        self.assertEqual(
+            [x for x in flows if x["arc"] == "r2-r1"],
+            [x for x in flows_ if x["arc"] == "r2-r1"],
+        )
+
+        # Every node is upstream of the waste
+        with self.assertWarns(UserWarning):
+            pruned = self.create_model().prune(["waste"])
+        self.assertEqual(set(model.nodes), set(pruned.nodes))
+
+    def test_prune_copy(self):
+        model = self.create_model()
+        nodes = dict(model.nodes)
+        nodes_type = {type_: dict(x) for type_, x in model.nodes_type.items()}
+        arcs = {name: (arc.in_port, arc.out_port) for name, arc in model.arcs.items()}
+        pruned = model.prune(["r3"])
+        pruned.run(verbose=False)
+
+        # The source model is unchanged and shares no nodes with the pruned model
+        self.assertEqual(nodes, model.nodes)
+        self.assertEqual(nodes_type, model.nodes_type)
+        self.assertEqual(["r3", "r2", "r1"], model.river_discharge_order)
+        self.assertEqual(
+            arcs,
+            {name: (arc.in_port, arc.out_port) for name, arc in model.arcs.items()},
+        )
+        self.assertIn("r3-r2", model.nodes["r2"].in_arcs)
+        for node in pruned.nodes.values():
+            self.assertNotIn(node, nodes.values())
+
+        # And it still simulates all of the (unchanged) model
+        flows, _, _, _ = model.run(verbose=False)
+        flows_, _, _, _ = self.create_model().run(verbose=False)
+        self.assertEqual(flows_, flows)
+
+    def test_prune_coupled(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with zipfile.ZipFile(
+                Path(__file__).parent / "test_model_data.zip", "r"
+            ) as zip_ref:
+                zip_ref.extractall(temp_dir)
+            constants.set_default_pollutants()
+            model = Model()
+            model.load(temp_dir)
+        dates = model.dates[:50]
+
+        # The WWTW is kept, since it may not accept all water from the foul sewer
+        pruned = model.prune(["3607-river"])
+        self.assertIn("barnoldswick_stw-wwtw", pruned.nodes)
+        self.assertIn("external-river", model.nodes)
+        self.assertNotIn("external-river", pruned.nodes)
+        flows, _, _, _ = model.run(dates=dates, verbose=False)
+        flows_, _, _, _ = pruned.run(dates=dates, verbose=False)
+        flows = [x for x in flows if x["arc"] in pruned.arcs]
+        self.assertEqual(len(flows), len(flows_))
+        for x, y in zip(flows, flows_):
+            self.assertAlmostEqual(x["flow"], y["flow"], delta=abs(x["flow"]) * 1e-12)
+
+    def test_not_boundary(self):
+        constants.set_simple_pollutants()
+        node = Node(name="node")
+        wastes = [Waste(name="w1"), Waste(name="w2")]
+        model = Model()
+        model.add_instantiated_nodes([node] + wastes)
+        model.add_instantiated_arcs(
+            [
+                Arc(name="node-w1", in_port=node, out_port=wastes[0]),
+                Arc(name="node-w2", in_port=node, out_port=wastes[1]),
+            ]
+        )
+        with self.assertRaises(ValueError):
+            model.replay_boundary([], arcs=["node-w1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
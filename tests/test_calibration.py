@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Tests for evaluating parameter sets with early termination."""
+
+import copy
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import TestCase
+
+from wsimod.core import constants
+from wsimod.orchestration.calibration import Calibration
+from wsimod.orchestration.model import Model
+
+ARC = "3607-gw-to-3607-river"
+
+
+def cost(model, date):
+    """Baseflow as an objective."""
+    return model.arcs[ARC].vqip_out["volume"]
+
+
+class MyTestClass(TestCase):
+    def test_calibration(self):
+        parameter_sets = [
+            {},
+            {
+                "nodes": {
+                    "3607-gw": {
+                        "type_": "Groundwater",
+                        "name": "3607-gw",
+                        "residence_time": 10,
+                    }
+                }
+            },
+        ]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with zipfile.ZipFile(
+                Path(__file__).parent / "test_model_data.zip", "r"
+            ) as zip_ref:
+                zip_ref.extractall(temp_dir)
+            constants.set_default_pollutants()
+            model = Model()
+            model.load(temp_dir)
+            dates = model.dates[:20]
+            model.add_overrides(copy.deepcopy(parameter_sets[1]))
+            flows, _, _, _ = model.run(dates=dates, record_arcs=[ARC], verbose=False)
+            objective = sum(x["flow"] for x in flows)
+
+            # Full runs
+            results = Calibration(temp_dir, cost, dates=dates, processes=1).run(
+                parameter_sets
+            )
+            self.assertEqual(
+                {"objective": objective, "aborted": False, "time": dates[-1]},
+                results[1],
+            )
+            self.assertNotEqual(objective, results[0]["objective"])
+
+            # Stopped by the threshold or predicate
+            results = Calibration(
+                temp_dir,
+                cost,
+                dates=dates,
+                threshold=objective / 2,
+                stop=lambda model, date, _: (date == dates[4])
+                & (model.nodes["3607-gw"].residence_time == 100),
+                processes=2,
+            ).run(parameter_sets)
+        self.assertEqual(dates[4], results[0]["time"])
+        self.assertTrue(results[1]["aborted"])
+        self.assertGreaterEqual(results[1]["objective"], objective / 2)
+        self.assertLess(results[1]["objective"], objective)
+        self.assertIn(results[1]["time"], dates[5:-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
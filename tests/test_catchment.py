@@ -47,6 +47,28 @@ class MyTestClass(TestCase):
         d1 = {"volume": 10, "phosphate": 0.4 * 10, "temperature": 10}
         self.assertDictAlmostEqual(d1, vq)
 
+    def test_precompute_inputs(self):
+        catchment = Catchment(
+            name="",
+            data_input_dict={
+                ("flow", 1): 10,
+                ("phosphate", 1): 0.4,
+                ("temperature", 1): 10,
+                ("flow", 2): 5,
+                ("phosphate", 2): 0.2,
+                ("temperature", 2): 12,
+            },
+        )
+        catchment.precompute_inputs([1, 2])
+        catchment.t = 2
+        vq = catchment.get_flow()
+        d1 = {"volume": 5, "phosphate": 0.2 * 5, "temperature": 12}
+        self.assertDictAlmostEqual(d1, vq)
+
+        # Returned VQIPs can be changed without affecting the precomputed ones
+        vq["volume"] = 0
+        self.assertEqual(5, catchment.get_flow()["volume"])
+
     def test_get_avail(self):
         catchment = Catchment(
             name="",
@@ -10,7 +10,12 @@ import unittest
 from unittest import TestCase
 
 from wsimod.core import constants
-from wsimod.core.core import DecayObj, WSIObj
+from wsimod.core.core import (
+    DecayObj,
+    TemperatureFactors,
+    WSIObj,
+    get_temperature_factors,
+)
 
 
 class MyTestClass(TestCase):
@@ -43,6 +48,15 @@ class MyTestClass(TestCase):
         blend = {"volume": 15, "phosphate": 0.0001 + 0.00005, "temperature": 40 / 3}
         self.assertDictEqual(blend, obj.sum_vqip(d1, d2))
 
+    def test_add(self):
+        obj = WSIObj()
+        d1 = {"volume": 10, "phosphate": 0.0001, "temperature": 15}
+        d2 = {"volume": 5, "phosphate": 0.00005, "temperature": 10}
+        blend = obj.sum_vqip(d1, d2)
+        reply = obj.add_vqip(d1, d2)
+        self.assertIs(d1, reply)
+        self.assertDictEqual(blend, d1)
+
     def test_to_total(self):
         obj = WSIObj()
         d = {"volume": 10, "phosphate": 0.0001, "temperature": 15}
@@ -143,6 +157,23 @@ class MyTestClass(TestCase):
         self.assertDictEqual(out_, d2)
         self.assertDictEqual(ds_, d5)
 
+    def test_temperature_factors(self):
+        factors = get_temperature_factors(1.005)
+        self.assertIs(factors, get_temperature_factors(1.005))
+        self.assertEqual(1.005 ** (15 - 20), factors[15])
+        self.assertIn(15, factors)
+
+        # Treatment works use the inverse factor, in a separate table
+        inverse = get_temperature_factors(1.005, inverse=True)
+        self.assertIsNot(factors, inverse)
+        self.assertEqual(1.005 ** (20 - 15), inverse[15])
+
+        # Full tables are emptied
+        factors = TemperatureFactors(1.005)
+        factors.max_size = 2
+        _ = [factors[x] for x in [10, 11, 12]]
+        self.assertEqual([12], list(factors))
+
     def test_generic_decay(self):
         class Do(DecayObj):
             """"""
@@ -13,7 +13,8 @@ from unittest import TestCase
 import pandas as pd
 import zipfile
 
-from wsimod.orchestration.model import Model, PARQUET_AVAILABLE
+from wsimod.core import constants
+from wsimod.orchestration.model import Model, PARQUET_AVAILABLE, to_datetime
 
 
 def _unzip_model_data(temp_dir: str):
@@ -54,6 +55,173 @@ class TestDataLoading(TestCase):
         df2.time = df2.time.astype(str)
         pd.testing.assert_frame_equal(df, df2)
 
+    def test_load_save_partitioned(self):
+        """Test saving and selectively loading a dataset partitioned by node."""
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            model_path = _unzip_model_data(temp_dir)
+
+            model = Model()
+            model.load(model_path)
+            results = model.run(dates=model.dates[0:3])
+            model.save_unified_data(temp_dir, partition_cols=["node"])
+            assert os.path.isdir(os.path.join(temp_dir, "unified_data.parquet"))
+
+            model2 = Model()
+            model2.load(temp_dir)
+            results2 = model2.run(dates=model2.dates[0:3])
+
+            # Data input dicts are identical to those loaded from csv
+            for name, node in model.nodes.items():
+                if getattr(node, "data_input_dict", None):
+                    data_input_dict = model2.nodes[name].data_input_dict
+                    assert len(data_input_dict) == len(node.data_input_dict)
+                    for (variable, time), value in node.data_input_dict.items():
+                        key = (variable, pd.Timestamp(str(time)))
+                        assert data_input_dict[key] == value
+        df = pd.DataFrame(results[0])
+        df.time = df.time.astype(str)
+        df2 = pd.DataFrame(results2[0])
+        df2.time = df2.time.astype(str)
+        pd.testing.assert_frame_equal(df, df2)
+
+    def test_bundle(self):
+        """Test compiling and loading a model bundle, including stale detection."""
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            model_path = _unzip_model_data(temp_dir)
+
+            model = Model()
+            model.load(model_path)
+            bundle = os.path.join(temp_dir, "model.bundle")
+            model.compile_bundle(bundle)
+            results = model.run(dates=model.dates[0:3])
+
+            model2 = Model.from_bundle(bundle)
+            assert model2.river_discharge_order == model.river_discharge_order
+            assert set(model2.nodes_type) == set(model.nodes_type)
+            results2 = model2.run(dates=model2.dates[0:3])
+
+            # Touching a source file without changing it does not make it stale
+            config = os.path.join(model_path, "config.yml")
+            os.utime(config, (0, 0))
+            Model.from_bundle(bundle)
+
+            # Changing a source file does
+            with open(config, "a") as f:
+                f.write("\n")
+            with self.assertRaises(ValueError):
+                Model.from_bundle(bundle)
+            Model.from_bundle(bundle, check_sources=False)
+        df = pd.DataFrame(results[0])
+        df2 = pd.DataFrame(results2[0])
+        pd.testing.assert_frame_equal(df, df2)
+
+    def test_shared_data(self):
+        """Test that identical input data is shared on load and saved once."""
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            model_path = _unzip_model_data(temp_dir)
+
+            model = Model()
+            model.load(model_path)
+            nodes = [
+                node
+                for node in model.nodes.values()
+                if getattr(node, "data_input_dict", None)
+            ]
+            # Give two nodes identical (but separate) data
+            nodes[1].data_input_dict = nodes[0].data_input_dict.copy()
+
+            for save in ["save", "save_unified_data"]:
+                save_dir = os.path.join(temp_dir, save)
+                getattr(model, save)(save_dir)
+                model2 = Model()
+                model2.load(save_dir)
+                data_0 = model2.nodes[nodes[0].name].data_input_dict
+                data_1 = model2.nodes[nodes[1].name].data_input_dict
+                assert data_0 is data_1
+                assert len(data_0) == len(nodes[0].data_input_dict)
+
+            # Written once
+            assert not os.path.exists(
+                os.path.join(temp_dir, "save", f"{nodes[1].name}-inputs.csv")
+            )
+            unified = pd.read_parquet(
+                os.path.join(temp_dir, "save_unified_data", "unified_data.parquet")
+            )
+            assert nodes[1].name not in set(unified.node)
+
+    def test_shared_data_read_only(self):
+        """Test that writing shared input data through one node cannot change the
+        data of another."""
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            model_path = _unzip_model_data(temp_dir)
+
+            model = Model()
+            model.load(model_path)
+            nodes = [
+                node
+                for node in model.nodes.values()
+                if getattr(node, "data_input_dict", None)
+            ]
+            nodes[1].data_input_dict = nodes[0].data_input_dict.copy()
+            save_dir = os.path.join(temp_dir, "save")
+            model.save(save_dir)
+
+            model = Model()
+            model.load(save_dir)
+            node_0 = model.nodes[nodes[0].name]
+            node_1 = model.nodes[nodes[1].name]
+            assert node_0.data_input_dict is node_1.data_input_dict
+            shared = node_1.data_input_dict
+            original = dict(shared)
+            key = next(iter(original))
+
+            with self.assertRaises(TypeError):
+                node_0.data_input_dict[key] = -1
+            with self.assertRaises(TypeError):
+                node_0.data_input_dict.update({key: -1})
+            assert node_1.data_input_dict == original
+
+            # Interpolation assigns a new data_input_dict to nodes with gaps
+            variable, time = key
+            extra_date = to_datetime("2100-01-01")
+            node_0.get_input_variables = lambda: {variable}
+            model.check_inputs(dates=list(model.dates) + [extra_date], interpolate=True)
+            assert node_0.data_input_dict is not shared
+            assert (variable, extra_date) in node_0.data_input_dict
+            assert (variable, extra_date) not in node_1.data_input_dict
+            assert shared == original
+
+    def test_hydrology_only(self):
+        """Test that volumes are identical when pollutants are not simulated."""
+        self.addCleanup(constants.set_default_pollutants)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            model_path = _unzip_model_data(temp_dir)
+
+            results = []
+            for hydrology_only in [False, True]:
+                model = Model()
+                model.load(model_path, hydrology_only=hydrology_only)
+                tanks = [
+                    name for name, node in model.nodes.items() if "tank" in dir(node)
+                ]
+                flows, tanks, _, _ = model.run(
+                    dates=model.dates[0:60],
+                    record_all=False,
+                    record_arcs=list(model.arcs),
+                    record_tanks=tanks,
+                )
+                results.append((flows, tanks))
+
+        (flows, tanks), (flows_, tanks_) = results
+        assert set(flows_[0]) == set(["arc", "flow", "time"])
+        assert [x["flow"] for x in flows] == [x["flow"] for x in flows_]
+        assert [x["storage"] for x in tanks] == [x["storage"] for x in tanks_]
+
     def test_misc_load_save(self):
         """Test miscellaneous load and save functionality."""
 
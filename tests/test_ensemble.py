@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Tests for simulating an ensemble of models in lock-step."""
+
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import TestCase
+
+from wsimod.core import constants
+from wsimod.orchestration.ensemble import Ensemble
+from wsimod.orchestration.model import Model
+
+
+class MyTestClass(TestCase):
+    def create_members(self, temp_dir, vectorised):
+        """Create two models of the test network, with different parameters."""
+        members = []
+        for percolation_coefficient in [0.1, 0.4]:
+            constants.set_default_pollutants()
+            model = Model()
+            model.load(temp_dir)
+            model.vectorised_land = vectorised
+            model.vectorised_rivers = vectorised
+            for node in model.nodes_type["Land"].values():
+                for surface in node.surfaces:
+                    if hasattr(surface, "percolation_coefficient"):
+                        surface.percolation_coefficient = percolation_coefficient
+            members.append(model)
+        return members
+
+    def test_ensemble_identical(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with zipfile.ZipFile(
+                Path(__file__).parent / "test_model_data.zip", "r"
+            ) as zip_ref:
+                zip_ref.extractall(temp_dir)
+            for vectorised in [False, True]:
+                members = self.create_members(temp_dir, vectorised)
+                dates = members[0].dates[:30]
+                tanks = list(members[0].nodes_type["River"])
+                results = []
+                for model in self.create_members(temp_dir, vectorised):
+                    results.append(
+                        model.run(
+                            dates=dates,
+                            verbose=False,
+                            record_tanks=tanks,
+                            record_events=[{"arc": "3607-storm-to-3607-river"}],
+                        )
+                        + (model.events,)
+                    )
+
+                results_ = [
+                    x + (model.events,)
+                    for x, model in zip(
+                        Ensemble(members).run(
+                            dates=dates,
+                            verbose=False,
+                            record_tanks=tanks,
+                            record_events=[{"arc": "3607-storm-to-3607-river"}],
+                        ),
+                        members,
+                    )
+                ]
+                self.assertNotEqual(results_[0], results_[1])
+                self.assertEqual(results, results_)
+
+            # Members must use the vectorised engines in the same way
+            members[1].vectorised_land = False
+            with self.assertRaises(ValueError):
+                Ensemble(members)
+
+
+if __name__ == "__main__":
+    unittest.main()
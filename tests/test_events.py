@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""Tests for detecting events while a model is run."""
+
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import TestCase
+
+from wsimod.arcs.arcs import Arc
+from wsimod.core import constants
+from wsimod.nodes.nodes import Node
+from wsimod.nodes.waste import Waste
+from wsimod.orchestration.events import EventRecorder
+from wsimod.orchestration.model import Model
+
+ARC = "3607-storm-to-3607-river"
+
+
+class MyTestClass(TestCase):
+    def create_model(self):
+        constants.set_simple_pollutants()
+        model = Model()
+        node = Node(name="sewer")
+        waste = Waste(name="waste")
+        model.add_instantiated_nodes([node, waste])
+        model.add_instantiated_arcs([Arc(name="cso", in_port=node, out_port=waste)])
+        return model
+
+    def record(self, recorder, arc, flows):
+        for i, flow in enumerate(flows):
+            arc.vqip_out = arc.v_change_vqip(arc.empty_vqip(), flow)
+            recorder.record(i)
+        return recorder.finish()
+
+    def test_daily(self):
+        model = self.create_model()
+        recorder = EventRecorder(model, [{"arc": "cso"}])
+        events = self.record(
+            recorder, model.arcs["cso"], [0, 5, 0, 0, 3, 4, 0, 0, 0, 2]
+        )
+        self.assertEqual(
+            [
+                {
+                    "name": "cso",
+                    "start": 1,
+                    "end": 1,
+                    "duration": 24,
+                    "volume": 5,
+                    "peak": 5,
+                    "count": 1,
+                },
+                {
+                    "name": "cso",
+                    "start": 4,
+                    "end": 5,
+                    "duration": 48,
+                    "volume": 7,
+                    "peak": 4,
+                    "count": 2,
+                },
+                {
+                    "name": "cso",
+                    "start": 9,
+                    "end": 9,
+                    "duration": 24,
+                    "volume": 2,
+                    "peak": 2,
+                    "count": 1,
+                },
+            ],
+            events,
+        )
+
+    def test_hourly(self):
+        model = self.create_model()
+        recorder = EventRecorder(
+            model, [{"arc": "cso", "threshold": 1, "name": "spills"}], timestep=1
+        )
+        spills = [0, 5, 13, 40, 70, 200, 240]
+        flows = [2 if i in spills else 1 for i in range(250)]
+        events = self.record(recorder, model.arcs["cso"], flows)
+
+        # First block (0 to 12) then blocks of 24 hours until one has no spill
+        self.assertEqual(
+            [(0, 13, 2), (40, 40, 1), (70, 70, 1), (200, 200, 1), (240, 240, 1)],
+            [(x["start"], x["end"], x["count"]) for x in events],
+        )
+        self.assertEqual({"spills"}, {x["name"] for x in events})
+        with self.assertRaises(ValueError):
+            EventRecorder(model, [{"name": "cso"}])
+
+    def test_node_monitor(self):
+        model = self.create_model()
+        recorder = EventRecorder(model, [{"node": "sewer", "of_type": ["Waste"]}])
+        self.assertEqual([model.arcs["cso"]], recorder.monitors[0]["arcs"])
+
+        # Monitors of nodes without arcs to nodes of those types would never report
+        for monitor in [
+            {"node": "sewer"},
+            {"node": "sewer", "of_type": ["Land"]},
+        ]:
+            with self.assertRaises(ValueError):
+                EventRecorder(model, [monitor])
+
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with zipfile.ZipFile(
+                Path(__file__).parent / "test_model_data.zip", "r"
+            ) as zip_ref:
+                zip_ref.extractall(temp_dir)
+            constants.set_default_pollutants()
+            model = Model()
+            model.load(temp_dir)
+        dates = model.dates[:100]
+        flows, _, _, _ = model.run(
+            dates=dates,
+            record_arcs=[ARC],
+            record_all=False,
+            verbose=False,
+            record_events=[
+                {"arc": ARC},
+                {"node": "3607-storm", "of_type": ["River"], "name": "storm"},
+            ],
+        )
+        spills = [x for x in flows if x["flow"] > constants.FLOAT_ACCURACY]
+        for name in [ARC, "storm"]:
+            events = [x for x in model.events if x["name"] == name]
+            self.assertEqual(len(spills), sum(x["count"] for x in events))
+            self.assertAlmostEqual(
+                sum(x["flow"] for x in spills), sum(x["volume"] for x in events)
+            )
+            self.assertEqual(spills[0]["time"], events[0]["start"])
+
+
+if __name__ == "__main__":
+    unittest.main()
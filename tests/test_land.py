@@ -20,8 +20,10 @@ from wsimod.nodes.land import (
     Land,
     PerviousSurface,
     Surface,
+    no_mass_balance,
 )
 from wsimod.nodes.nodes import Node
+from wsimod.nodes.nutrient_pool import NutrientPool
 from wsimod.nodes.sewer import Sewer
 from wsimod.nodes.storage import Reservoir
 from wsimod.nodes.tanks import Tank, DecayTank
@@ -158,6 +160,36 @@ class MyTestClass(TestCase):
 
         self.assertDictAlmostEqual(d1, surface.storage, 16)
 
+    def test_run_surface_mass_balance(self):
+        constants.set_simple_pollutants()
+        node = Land(name="")
+        surface = Surface(parent=node, area=10, decays={})
+
+        def inflow():
+            vqip = surface.empty_vqip()
+            vqip["volume"] = 2
+            vqip["temperature"] = 10
+            return (vqip, surface.empty_vqip())
+
+        @no_mass_balance
+        def process():
+            vqip = surface.empty_vqip()
+            vqip["volume"] = 5
+            return (surface.empty_vqip(), vqip)
+
+        surface.inflows = [inflow, inflow]
+        surface.processes = [process]
+        surface.run()
+        d1 = surface.empty_vqip()
+        self.assertDictEqual(d1, node.running_outflow_mb)
+        d1["volume"] = 4
+        d1["temperature"] = 10
+        self.assertDictEqual(d1, node.running_inflow_mb)
+
+        # Built in surface functions that have no mass balance are registered
+        self.assertFalse(PerviousSurface.route.mass_balance)
+        self.assertFalse(hasattr(PerviousSurface.ihacres, "mass_balance"))
+
     def test_simple_dep(self):
         constants.set_simple_pollutants()
         d1 = {"phosphate": 2, "volume": 0, "temperature": 0}
@@ -641,6 +673,31 @@ class MyTestClass(TestCase):
         self.assertEqual(0.17647058823529413, surface.crop_cover)
         self.assertEqual(0.058823529411764705, surface.ground_cover)
 
+    def test_day_of_year_tables(self):
+        constants.set_default_pollutants()
+        surface, ivol, isoil = self.create_growing_surface()
+        for doy in range(1, 366):
+            self.assertEqual(
+                surface.quick_interp(
+                    doy, surface.crop_factor_stage_dates, surface.crop_factor_stages
+                ),
+                surface.crop_factor_table[doy],
+            )
+            self.assertEqual(
+                surface.quick_interp(
+                    doy, surface.harvest_sow_calendar, surface.crop_cover_stages
+                ),
+                surface.crop_cover_table[doy],
+            )
+
+        # Tables are recalculated on override, and days outside of the stage dates
+        # are not tabulated
+        surface.apply_overrides(
+            {"crop_factor_stages": [1, 2, 1], "crop_factor_stage_dates": [1, 32, 90]}
+        )
+        self.assertEqual(1.5, surface.crop_factor_table[61])
+        self.assertIsNone(surface.crop_factor_table[91])
+
     def test_adjust_vqip(self):
         constants.set_default_pollutants()
         surface = GrowingSurface()
@@ -909,6 +966,27 @@ class MyTestClass(TestCase):
         self.assertDictAlmostEqual(d1, r1, 14)
         self.assertDictAlmostEqual(d2, r2, 15)
 
+    def test_soil_pool_transformation_limit(self):
+        constants.set_default_pollutants()
+        nutrient_pool = NutrientPool(immobdpar={"N": 0.3, "P": 1.5})
+        for j, pool in enumerate(nutrient_pool.pools):
+            pool.storage = {"N": 2 + j, "P": 0.5 * j}
+        nutrient_pool.temperature_dependence_factor = 1.8
+        nutrient_pool.soil_moisture_dependence_factor = 0.5
+        total = {
+            x: sum(pool.storage[x] for pool in nutrient_pool.pools)
+            for x in constants.NUTRIENTS
+        }
+        inorganic, organic = nutrient_pool.soil_pool_transformation()
+
+        # Extraction is limited by the nutrients in a pool
+        self.assertEqual(0, nutrient_pool.dissolved_inorganic_pool.storage["P"])
+        self.assertEqual(-1, inorganic["P"])
+        for x in constants.NUTRIENTS:
+            self.assertAlmostEqual(
+                total[x], sum(pool.storage[x] for pool in nutrient_pool.pools)
+            )
+
     def test_crop_uptake(self):
         constants.set_default_pollutants()
         surface, ivol, isoil = self.create_growing_surface()
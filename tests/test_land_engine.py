@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Tests for the vectorised land engine."""
+
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import TestCase
+
+from wsimod.arcs.arcs import Arc
+from wsimod.core import constants
+from wsimod.nodes.land import Land
+from wsimod.nodes.nodes import Node
+from wsimod.nodes.waste import Waste
+from wsimod.orchestration.land_engine import LandEngine
+from wsimod.orchestration.model import Model, to_datetime
+
+
+class MyTestClass(TestCase):
+    def create_model(self):
+        """Create a model with two Land nodes, one of which has a surface whose climate
+        function has been replaced (which must calculate its own response)."""
+        constants.set_simple_pollutants()
+        dates = [to_datetime("2000-01-{0:02d}".format(i)) for i in range(1, 31)]
+        lands = []
+        for i in range(2):
+            data = {}
+            for j, date in enumerate(dates):
+                data[("precipitation", date)] = 0.002 * (j % 5) * (i + 1)
+                data[("et0", date)] = 0.001 + 0.0001 * j
+                data[("temperature", date)] = 4 + j / 3
+            surfaces = [
+                {
+                    "type_": "PerviousSurface",
+                    "surface": "grass",
+                    "area": 100 * (i + 1),
+                    "depth": 0.5,
+                    "ihacres_p": 8,
+                    "initial_storage": 10,
+                    "decays": {},
+                },
+                {
+                    "type_": "PerviousSurface",
+                    "surface": "woodland",
+                    "area": 50,
+                    "field_capacity": 0.25,
+                    "infiltration_capacity": 0.004,
+                    "initial_storage": 12,
+                    "decays": {},
+                },
+                {
+                    "type_": "ImperviousSurface",
+                    "surface": "urban",
+                    "area": 20,
+                    "decays": {},
+                },
+            ]
+            lands.append(
+                Land(name="land{0}".format(i), data_input_dict=data, surfaces=surfaces)
+            )
+        surface = lands[1].get_surface("woodland")
+        surface.get_climate = lambda: (0.001, 0.002)
+
+        junction = Node(name="junction")
+        waste = Waste(name="waste")
+        arcs = [
+            Arc(name="land0-junction", in_port=lands[0], out_port=junction),
+            Arc(name="land1-junction", in_port=lands[1], out_port=junction),
+            Arc(name="junction-waste", in_port=junction, out_port=waste),
+        ]
+        model = Model()
+        model.add_instantiated_nodes(lands + [junction, waste])
+        model.add_instantiated_arcs(arcs)
+        model.dates = dates
+        return model
+
+    def test_compatible(self):
+        model = self.create_model()
+        engine = LandEngine(model)
+        self.assertEqual(
+            [("land0", "grass"), ("land0", "woodland"), ("land1", "grass")],
+            [(x.parent.name, x.surface) for x in engine.surfaces],
+        )
+        self.assertEqual([0, 0, 1], engine.parent_index.tolist())
+
+    def test_engine_identical(self):
+        results = []
+        for vectorised_land in [False, True]:
+            model = self.create_model()
+            model.vectorised_land = vectorised_land
+            results.append(
+                model.run(
+                    verbose=False,
+                    record_surfaces=[
+                        (land, surface)
+                        for land in ["land0", "land1"]
+                        for surface in ["grass", "woodland"]
+                    ],
+                )
+            )
+        (flows, _, _, surfaces), (flows_, _, _, surfaces_) = results
+        self.assertEqual(flows, flows_)
+        self.assertEqual(surfaces, surfaces_)
+
+    def test_engine_identical_growing(self):
+        results = []
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with zipfile.ZipFile(
+                Path(__file__).parent / "test_model_data.zip", "r"
+            ) as zip_ref:
+                zip_ref.extractall(temp_dir)
+            for vectorised_land in [False, True]:
+                constants.set_default_pollutants()
+                model = Model()
+                model.load(temp_dir)
+                model.vectorised_land = vectorised_land
+                flows, tanks, _, _ = model.run(dates=model.dates[:60], verbose=False)
+                results.append((model, flows, tanks))
+        (model, flows, tanks), (model_, flows_, tanks_) = results
+        self.assertTrue(LandEngine(model_).surfaces)
+        self.assertEqual(flows, flows_)
+        self.assertEqual(tanks, tanks_)
+
+
+if __name__ == "__main__":
+    unittest.main()
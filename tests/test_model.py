@@ -4,19 +4,23 @@
 @author: Barney
 
 """
+
 import os
 import pytest
 import unittest
 import tempfile
 import yaml
+import zipfile
+from pathlib import Path
 from unittest import TestCase, mock
 
 from wsimod.arcs.arcs import Arc
+from wsimod.core import constants
 from wsimod.nodes.land import Land
 from wsimod.nodes.nodes import Node
 from wsimod.nodes.sewer import Sewer
 from wsimod.nodes.waste import Waste
-from wsimod.orchestration.model import Model, to_datetime
+from wsimod.orchestration.model import Model, compile_schedules, to_datetime
 import os
 
 
@@ -294,6 +298,186 @@ class MyTestClass(TestCase):
             0.03, my_model.nodes["my_land"].get_surface("urban").storage["volume"]
         )
 
+    def test_step(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with zipfile.ZipFile(
+                Path(__file__).parent / "test_model_data.zip", "r"
+            ) as zip_ref:
+                zip_ref.extractall(temp_dir)
+            models = []
+            for _ in range(3):
+                constants.set_default_pollutants()
+                my_model = Model()
+                my_model.load(temp_dir)
+                models.append(my_model)
+        dates = models[0].dates[:20]
+        arc = "3607-land-to-3607-river"
+        flows, tanks, _, surfaces = models[0].run(dates=dates, verbose=False)
+
+        # Stepwise simulation gives the same results
+        models[1].start(dates=dates, verbose=False)
+        outflows = []
+        while (date := models[1].step()) is not None:
+            # Flows of the timestep remain until the next step
+            outflows.append(models[1].arcs[arc].vqip_out["volume"])
+        self.assertEqual(date, None)
+        self.assertEqual((flows, tanks, [], surfaces), models[1].finish())
+        self.assertEqual([x["flow"] for x in flows if x["arc"] == arc], outflows)
+
+        # Stop early with the generator
+        for date in models[2].iterate(dates=dates, verbose=False):
+            if date == dates[9]:
+                break
+        self.assertEqual(
+            [x for x in flows if x["time"] in dates[:10]], models[2].simulation["flows"]
+        )
+        self.assertEqual(0, models[2].arcs[arc].vqip_out["volume"])
+
+    def test_every(self):
+        self.assertEqual(
+            [
+                [[("Land", "run", 1)], [("Groundwater", "infiltrate", 2)]],
+                [[("Land", "run", 1)], [("Groundwater", "infiltrate", 0)]],
+            ],
+            compile_schedules(
+                [{"Land": "run"}, {"Groundwater": "infiltrate", "every": 2}]
+            ),
+        )
+        with self.assertRaises(ValueError):
+            compile_schedules([{"Land": "run", "every": 0}])
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with zipfile.ZipFile(
+                Path(__file__).parent / "test_model_data.zip", "r"
+            ) as zip_ref:
+                zip_ref.extractall(temp_dir)
+            constants.set_default_pollutants()
+            my_model = Model()
+            my_model.load(temp_dir)
+        for timestep_item in my_model.orchestration:
+            if "Groundwater" in timestep_item:
+                timestep_item["every"] = 7
+        dates = my_model.dates[:20]
+        arc = my_model.arcs["3607-gw-to-3607-river"]
+        groundwater = my_model.nodes["3607-gw"]
+        flows = []
+        for date in my_model.iterate(dates=dates, record_all=False, verbose=False):
+            flows.append(arc.vqip_out["volume"])
+            in_, ds_, out_ = groundwater.node_mass_balance()
+            self.assertAlmostEqual(0, in_["volume"] - ds_["volume"] - out_["volume"])
+
+        # Outflow is released on every timestep, at the rate calculated by the last
+        # call (where the tank is empty at the first timestep)
+        self.assertEqual(list(range(7, 20)), [i for i, x in enumerate(flows) if x > 0])
+        self.assertEqual(flows[7], flows[13])
+        self.assertNotEqual(flows[13], flows[14])
+        self.assertEqual(1, groundwater.steps)
+
+        # Nodes that would not act on the inputs of skipped timesteps
+        my_model.orchestration[2]["every"] = 7
+        with self.assertRaises(ValueError) as error:
+            my_model.run(dates=dates, verbose=False)
+        self.assertIn("3607-land", str(error.exception))
+
+    def test_check_inputs(self):
+        dates = [to_datetime(x) for x in ["2000-01-01", "2000-01-02", "2000-01-03"]]
+        land_inputs = {
+            ("temperature", dates[0]): 10,
+            ("precipitation", dates[0]): 0.01,
+            ("et0", dates[0]): 0.002,
+            ("temperature", dates[2]): 12,
+            ("precipitation", dates[2]): 0.03,
+        }
+        surface = {
+            "type_": "PerviousSurface",
+            "surface": "rural",
+            "area": 100,
+            "depth": 0.5,
+        }
+        land = {
+            "type_": "Land",
+            "data_input_dict": land_inputs,
+            "surfaces": [surface],
+            "name": "my_land",
+        }
+        my_model = Model()
+        my_model.dates = dates
+        my_model.add_nodes([land])
+
+        # All gaps reported at once
+        with pytest.raises(ValueError) as error:
+            my_model.check_inputs()
+        self.assertIn("temperature", str(error.value))
+        self.assertIn("et0", str(error.value))
+
+        gaps = my_model.check_inputs(interpolate=True)
+        self.assertEqual(
+            {"temperature": [dates[1]], "precipitation": [dates[1]], "et0": dates[1:]},
+            gaps["my_land"],
+        )
+        # Filled data is assigned as a new data_input_dict
+        filled = my_model.nodes["my_land"].data_input_dict
+        self.assertAlmostEqual(11, filled[("temperature", dates[1])])
+        self.assertAlmostEqual(0.02, filled[("precipitation", dates[1])])
+        self.assertEqual(0.002, filled[("et0", dates[2])])
+        self.assertNotIn(("et0", dates[2]), land_inputs)
+        self.assertEqual({}, my_model.check_inputs())
+
+    def test_check_inputs_decays(self):
+        dates = [to_datetime(x) for x in ["2000-01-01", "2000-01-02"]]
+        decays = {"phosphate": {"constant": 0.001, "exponent": 1.005}}
+        my_model = Model()
+        my_model.dates = dates
+        my_model.add_nodes(
+            [
+                {
+                    "type_": "Groundwater",
+                    "name": "my_groundwater",
+                    "decays": decays,
+                    "data_input_dict": {("temperature", dates[0]): 10},
+                },
+                {"type_": "Node", "name": "my_node", "data_input_dict": {}},
+                {"type_": "Waste", "name": "my_waste"},
+            ]
+        )
+        my_model.add_arcs(
+            [
+                {
+                    "type_": "DecayArc",
+                    "name": "my_arc",
+                    "in_port": "my_node",
+                    "out_port": "my_waste",
+                    "decays": decays,
+                }
+            ]
+        )
+
+        # Temperature is read by the decaying tank and arc (from its in_port)
+        with pytest.raises(ValueError) as error:
+            my_model.check_inputs()
+        self.assertIn("my_groundwater - temperature", str(error.value))
+        self.assertIn("my_node - temperature", str(error.value))
+
+        my_model.nodes["my_node"].data_input_dict[("temperature", dates[1])] = 12
+        gaps = my_model.check_inputs(interpolate=True)
+        self.assertEqual({"temperature": [dates[1]]}, gaps["my_groundwater"])
+        self.assertEqual({"temperature": [dates[0]]}, gaps["my_node"])
+
+        # Including the decaying internal arcs of queue tanks
+        my_model.add_nodes(
+            [
+                {
+                    "type_": "QueueGroundwater",
+                    "name": "my_queue_groundwater",
+                    "decays": decays,
+                    "data_input_dict": {},
+                }
+            ]
+        )
+        with pytest.raises(ValueError) as error:
+            my_model.check_inputs()
+        self.assertIn("my_queue_groundwater - temperature", str(error.value))
+
     def test_customise_orchestration(self):
         my_model = Model()
         my_model.load(
@@ -353,6 +353,29 @@ class MyTestClass(TestCase):
         self.assertDictAlmostEqual(d3, arc4.vqip_in, 14)
         self.assertDictAlmostEqual(d4, arc3.vqip_in, 14)
 
+    def test_allocate_distributed(self):
+        node1, node2, node3, node4, arc1, arc2, arc3, arc4 = self.get_simple_model2()
+
+        # arc2 is capped, and the excess is reallocated to arc1
+        connected = node3.get_connected(direction="pull")
+        allocated = node3.allocate_distributed(29, connected, node3.in_arcs)
+        self.assertAlmostEqual(20, allocated["arc2"], 14)
+        self.assertAlmostEqual(9, allocated["arc1"], 14)
+
+        # Each arc is requested from only once
+        requests = []
+        for arc in [arc1, arc2]:
+            arc.send_pull_request = (
+                lambda vqip, tag="default", arc=arc, f=arc.send_pull_request: (
+                    requests.append(arc.name) or f(vqip, tag=tag)
+                )
+            )
+        reply = node3.pull_distributed({"volume": 29})
+        self.assertAlmostEqual(29, reply["volume"], 14)
+        self.assertEqual(["arc1", "arc2"], requests)
+        self.assertAlmostEqual(9, arc1.vqip_out["volume"], 14)
+        self.assertAlmostEqual(20, arc2.vqip_out["volume"], 14)
+
     def test_pull_check_basic(self):
         d1 = {"volume": 30, "phosphate": 0.7, "temperature": (15 * 10 + 12 * 20) / 30}
 
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""Tests for setting model parameters from vectors."""
+
+import tempfile
+import unittest
+import zipfile
+from math import log
+from pathlib import Path
+from unittest import TestCase
+
+from wsimod.core import constants
+from wsimod.orchestration.model import Model
+from wsimod.orchestration.parameters import (
+    ParameterSpace,
+    apply_overrides,
+    set_attributes,
+    set_growing_surface,
+)
+
+PARAMETERS = [
+    {"node": "3607-land", "surface": "Grass", "parameter": "field_capacity"},
+    {"node": "3607-land", "surface": "Grass", "parameter": "rooting_depth"},
+    {"node": "3607-land", "surface": "Woodland", "parameter": "sowing_day"},
+    {"node": "3607-land", "surface": "Impervious", "parameter": "pore_depth"},
+    {"node": "3607-land", "parameter": "surface_residence_time"},
+    {"node": "3607-gw", "parameter": "residence_time"},
+    {"node": "3607-river", "parameter": "length"},
+    {"arc": "3607-storm-to-3607-river", "parameter": "capacity"},
+]
+
+OVERRIDES = {
+    "nodes": {
+        "3607-land": {
+            "type_": "Land",
+            "name": "3607-land",
+            "surface_residence_time": 3,
+            "surfaces": {
+                "Grass": {"field_capacity": 0.3, "rooting_depth": 1.2},
+                "Woodland": {"sowing_day": 100},
+                "Impervious": {"pore_depth": 0.002},
+            },
+        },
+        "3607-gw": {"type_": "Groundwater", "name": "3607-gw", "residence_time": 50},
+        "3607-river": {"type_": "River", "name": "3607-river", "length": 500},
+    },
+    "arcs": {
+        "3607-storm-to-3607-river": {
+            "type_": "Arc",
+            "name": "3607-storm-to-3607-river",
+            "capacity": 5,
+        }
+    },
+}
+
+
+class MyTestClass(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        with zipfile.ZipFile(
+            Path(__file__).parent / "test_model_data.zip", "r"
+        ) as zip_ref:
+            zip_ref.extractall(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def load(self):
+        constants.set_default_pollutants()
+        model = Model()
+        model.load(self.temp_dir.name)
+        return model
+
+    def test_space(self):
+        model = self.load()
+        arcs = ["3607-storm-to-3607-river", "3607-land-to-3607-river"]
+        space = ParameterSpace(
+            model,
+            [
+                {
+                    "arc": arcs,
+                    "parameter": "capacity",
+                    "bounds": [1, 1000],
+                    "transform": "log",
+                },
+                {
+                    "node": "3607-land",
+                    "surface": "Grass",
+                    "parameter": "rooting_depth",
+                    "name": "grass_depth",
+                },
+                {"node": "3607-river", "parameter": "length"},
+            ],
+        )
+        self.assertEqual(
+            [",".join(arcs) + ".capacity", "grass_depth", "3607-river.length"],
+            space.names,
+        )
+        self.assertEqual([0, log(1000)], [space.lower[0], space.upper[0]])
+        self.assertAlmostEqual(log(model.arcs[arcs[1]].capacity), space.default[0])
+        self.assertEqual(
+            [set_attributes, set_attributes, set_growing_surface, apply_overrides],
+            [x[1] for x in space.setters],
+        )
+
+        space.apply([log(10), 2, 100])
+        self.assertAlmostEqual(10, model.arcs[arcs[0]].capacity)
+        self.assertAlmostEqual(10, model.arcs[arcs[1]].capacity)
+        grass = model.nodes["3607-land"].get_surface("Grass")
+        self.assertEqual(2 * grass.total_porosity, grass.depth)
+        self.assertEqual(grass.depth * grass.area, grass.capacity)
+        self.assertEqual(
+            100 * model.nodes["3607-river"].width, model.nodes["3607-river"].area
+        )
+
+    def test_apply_identical(self):
+        dates = None
+        results = []
+        for use_space in [True, False]:
+            model = self.load()
+            dates = model.dates[:50]
+            if use_space:
+                space = ParameterSpace(model, PARAMETERS)
+                space.apply([0.3, 1.2, 100, 0.002, 3, 50, 500, 5])
+            else:
+                model.add_overrides(OVERRIDES)
+            results.append(model.run(dates=dates, verbose=False))
+        self.assertEqual(results[0], results[1])
+
+    def test_reset(self):
+        model = self.load()
+        model.parameters = PARAMETERS
+        space = ParameterSpace(model)
+        dates = model.dates[:50]
+        results = model.run(dates=dates, verbose=False)
+        space.apply(space.default * 2)
+        self.assertNotEqual(results, model.run(dates=dates, verbose=False))
+        space.reset()
+        self.assertEqual(results, model.run(dates=dates, verbose=False))
+
+
+if __name__ == "__main__":
+    unittest.main()
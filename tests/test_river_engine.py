@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Tests for the vectorised River engine."""
+
+import unittest
+from unittest import TestCase
+
+from wsimod.arcs.arcs import Arc
+from wsimod.core import constants
+from wsimod.nodes.catchment import Catchment
+from wsimod.nodes.nodes import Node
+from wsimod.nodes.storage import River
+from wsimod.nodes.waste import Waste
+from wsimod.orchestration.model import Model, to_datetime
+from wsimod.orchestration.river_engine import RiverEngine
+
+
+class MyTestClass(TestCase):
+    def create_model(self):
+        """Create a river network with a junction (which must fall back to River
+        objects) and a capacity constrained arc."""
+        constants.set_default_pollutants()
+        dates = [to_datetime("2000-01-{0:02d}".format(i)) for i in range(1, 31)]
+        data = {}
+        for i, date in enumerate(dates):
+            data[("temperature", date)] = 4 + i / 2
+            data[("flow", date)] = 5 + i % 4
+            for pol in constants.POLLUTANTS:
+                if pol != "temperature":
+                    data[(pol, date)] = 0.001 * (1 + i % 3)
+
+        initial_storage = {pol: 0.01 for pol in constants.POLLUTANTS}
+        initial_storage.update({"volume": 50, "temperature": 10})
+        rivers = {
+            name: River(
+                name=name,
+                length=length,
+                data_input_dict=data,
+                initial_storage=initial_storage,
+            )
+            for name, length in [("r1", 2000), ("r2", 200), ("r3", 5000), ("r4", 800)]
+        }
+        catchments = [
+            Catchment(name="c{0}".format(i), data_input_dict=data) for i in range(3)
+        ]
+        junction = Node(name="junction")
+        waste = Waste(name="waste")
+        arcs = [
+            Arc(name="c0-r3", in_port=catchments[0], out_port=rivers["r3"]),
+            Arc(name="c1-r4", in_port=catchments[1], out_port=rivers["r4"]),
+            Arc(name="c2-r2", in_port=catchments[2], out_port=rivers["r2"]),
+            Arc(name="r3-r2", in_port=rivers["r3"], out_port=rivers["r2"]),
+            Arc(name="r4-junction", in_port=rivers["r4"], out_port=junction),
+            Arc(name="junction-r2", in_port=junction, out_port=rivers["r2"]),
+            Arc(name="r2-r1", in_port=rivers["r2"], out_port=rivers["r1"], capacity=20),
+            Arc(name="r1-waste", in_port=rivers["r1"], out_port=waste),
+        ]
+        model = Model()
+        model.add_instantiated_nodes(
+            list(rivers.values()) + catchments + [junction, waste]
+        )
+        model.add_instantiated_arcs(arcs)
+        model.dates = dates
+        return model
+
+    def test_blocks(self):
+        model = self.create_model()
+        engine = RiverEngine(model)
+        self.assertEqual(len(engine.reaches), 4)
+        self.assertNotIn(model.nodes["r4"], engine.routes)
+        names = [
+            (
+                [x.name for x in block["reaches"]]
+                if isinstance(block, dict)
+                else block.name
+            )
+            for block in engine.blocks
+        ]
+        self.assertIn("r4", names)
+        self.assertEqual(
+            set(["r1", "r2", "r3"]),
+            set(name for block in names if isinstance(block, list) for name in block),
+        )
+
+    def test_engine_agrees(self):
+        results = []
+        for vectorised_rivers in [False, True]:
+            model = self.create_model()
+            model.vectorised_rivers = vectorised_rivers
+            flows, tanks, _, _ = model.run(
+                verbose=False, record_tanks=["r1", "r2", "r3", "r4"]
+            )
+            results.append((model, flows, tanks))
+
+        (model, flows, tanks), (model_, flows_, tanks_) = results
+        for row, row_ in zip(flows + tanks, flows_ + tanks_):
+            for key, value in row.items():
+                if isinstance(value, float):
+                    self.assertAlmostEqual(value, row_[key], 10)
+        # Lagged variables are returned to nodes
+        for name in ["r1", "r2", "r3", "r4"]:
+            lags = model.nodes[name].lagged_temperatures
+            lags_ = model_.nodes[name].lagged_temperatures
+            self.assertEqual(lags.position, lags_.position)
+            for value, value_ in zip(lags.values, lags_.values):
+                self.assertAlmostEqual(value, value_, 10)
+
+    def test_engine_steps(self):
+        models = []
+        for vectorised_rivers in [False, True]:
+            model = self.create_model()
+            model.vectorised_rivers = vectorised_rivers
+            model.start(verbose=False, record_all=False)
+            models.append(model)
+        model, model_ = models
+
+        # Lagged variables of nodes are current between steps, not only at the end
+        while model.step() is not None:
+            model_.step()
+            for name in ["r1", "r2", "r3", "r4"]:
+                for lag in ["lagged_temperatures", "lagged_total_phosphorus"]:
+                    lags = getattr(model.nodes[name], lag)
+                    lags_ = getattr(model_.nodes[name], lag)
+                    self.assertEqual(lags.position, lags_.position)
+                    for value, value_ in zip(lags.values, lags_.values):
+                        self.assertAlmostEqual(value, value_, 10)
+                    for window, sum_ in lags.sums.items():
+                        self.assertAlmostEqual(sum_, lags_.sums[window], 10)
+
+            # Arcs that the engine discharges along have separate in and out VQIPs
+            arc = model_.arcs["r3-r2"]
+            self.assertIsNot(arc.vqip_in, arc.vqip_out)
+            self.assertEqual(arc.vqip_in, arc.vqip_out)
+        model.finish()
+        model_.finish()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -15,6 +15,7 @@ from wsimod.core import constants
 from wsimod.nodes.sewer import Sewer
 from wsimod.nodes.storage import (
     Groundwater,
+    LaggedSums,
     QueueGroundwater,
     Reservoir,
     River,
@@ -95,6 +96,50 @@ class MyTestClass(TestCase):
         d2 = {"volume": 4 * 2 / 3, "phosphate": 0.2 * 2 / 3, "temperature": 12}
         self.assertDictAlmostEqual(d2, groundwater.tank.storage, 14)
 
+    def test_groundwater_distribute_steps(self):
+        constants.set_simple_pollutants()
+        d1 = {"volume": 4, "phosphate": 0.2, "temperature": 12}
+        groundwater = Groundwater(
+            name="", capacity=10, initial_storage=d1, residence_time=3
+        )
+        waste = Waste(name="")
+        arc1 = Arc(in_port=groundwater, out_port=waste, name="")
+
+        # One call representing two timesteps releases half of the outflow of both,
+        # and the other half on the next timestep
+        groundwater.steps = 2
+        groundwater.distribute()
+        d2 = {"volume": 4 * 5 / 18, "phosphate": 0.2 * 5 / 18, "temperature": 12}
+        self.assertDictAlmostEqual(d2, arc1.vqip_in, 15)
+        groundwater.steps = 1
+        arc1.end_timestep()
+        groundwater.release_baseflow()
+        self.assertDictAlmostEqual(d2, arc1.vqip_in, 15)
+        d2 = {"volume": 4 * 4 / 9, "phosphate": 0.2 * 4 / 9, "temperature": 12}
+        self.assertDictAlmostEqual(d2, groundwater.tank.storage, 14)
+
+    def test_groundwater_infiltrate_steps(self):
+        constants.set_simple_pollutants()
+        d1 = {"volume": 4, "phosphate": 0.2, "temperature": 12}
+        groundwater = Groundwater(
+            name="",
+            capacity=10,
+            initial_storage=d1,
+            infiltration_threshold=0.2,
+            infiltration_pct=0.1,
+        )
+        sewer = Sewer(name="", capacity=5)
+        arc1 = Arc(in_port=groundwater, out_port=sewer, name="")
+
+        # Infiltration of two timesteps, as storage decreases, released evenly
+        groundwater.steps = 2
+        groundwater.infiltrate()
+        nv1 = ((4 - (10 * 0.2)) * 0.1) ** 0.5
+        nv2 = ((4 - nv1 - (10 * 0.2)) * 0.1) ** 0.5
+        self.assertAlmostEqual((nv1 + nv2) / 2, arc1.vqip_in["volume"])
+        groundwater.release_infiltration()
+        self.assertAlmostEqual(4 - nv1 - nv2, groundwater.tank.storage["volume"])
+
     def test_groundwater_infiltrate(self):
         constants.set_simple_pollutants()
         d1 = {"volume": 4, "phosphate": 0.2, "temperature": 12}
@@ -178,6 +223,34 @@ class MyTestClass(TestCase):
         }
         self.assertDictAlmostEqual(d4, groundwater.tank.internal_arc.queue[1], 14)
 
+    def test_qgroundwater_timearea(self):
+        constants.set_simple_pollutants()
+        groundwater = QueueGroundwater(
+            name="", capacity=10, timearea={0: 0.2, 3: 0.5, 1: 0.3}
+        )
+
+        # Capacity is applied in the order of the timearea diagram
+        d1 = {"volume": 15, "phosphate": 0.3, "temperature": 12}
+        reply = groundwater.push_set_timearea(d1)
+        d2 = {"volume": 5, "phosphate": 0.1, "temperature": 12}
+        self.assertDictAlmostEqual(d2, reply, 14)
+
+        d3 = {"volume": 10, "phosphate": 0.2, "temperature": 12}
+        self.assertDictAlmostEqual(d3, groundwater.tank.storage, 14)
+        d4 = {"volume": 7, "phosphate": 0.14, "temperature": 12}
+        self.assertDictAlmostEqual(d4, groundwater.tank.internal_arc.queue[3], 14)
+        self.assertEqual(0, groundwater.tank.internal_arc.queue[1]["volume"])
+
+        # Non-additive pollutants are blended by volume as the queue advances
+        groundwater.end_timestep()
+        groundwater.tank.pull_proportion(0.5)
+        d5 = {"volume": 2, "phosphate": 0.04, "temperature": 20}
+        _ = groundwater.tank.push_storage(d5, time=1)
+        groundwater.end_timestep()
+        groundwater.end_timestep()
+        d6 = {"volume": 7, "phosphate": 0.14, "temperature": (5 * 12 + 2 * 20) / 7}
+        self.assertDictAlmostEqual(d6, groundwater.tank.active_storage, 14)
+
     def test_river_pull(self):
         constants.set_simple_pollutants()
         river = River(
@@ -216,6 +289,22 @@ class MyTestClass(TestCase):
         river.update_depth()
         self.assertEqual(0.0075, river.current_depth)
 
+    def test_lagged_sums(self):
+        lags = LaggedSums([3, 5])
+        values = [1.5, -2, 4, 0.25, 7, 3, -1, 2.5, 6, 0.5, 1]
+        for i, value in enumerate(values):
+            lags.append(value)
+            self.assertAlmostEqual(sum(values[max(0, i - 2) : i + 1]), lags.get_sum(3))
+            self.assertAlmostEqual(sum(values[max(0, i - 4) : i + 1]), lags.get_sum(5))
+
+        # Non-integer windows are rounded, and means are over the rounded window
+        lags = LaggedSums([2.5, 3.213])
+        self.assertEqual([2, 3], lags.windows)
+        for value in values:
+            lags.append(value)
+        self.assertAlmostEqual(sum(values[-3:]) / 3, lags.get_mean(3.213))
+        self.assertAlmostEqual(sum(values[-2:]) / 2, lags.get_mean(2.5))
+
     # TODO test river biochemical processes once they have been functionalised
 
     def test_reservoir(self):
@@ -386,6 +475,7 @@ class MyTestClass(TestCase):
             "prodPpar": 8.231,
             "muptNpar": 6.213,
             "muptPpar": 7.021,
+            "short_temp_lag": 2.5,
             "max_temp_lag": 3.213,
             "max_phosphorus_lag": 78.321,
         }
@@ -410,6 +500,18 @@ class MyTestClass(TestCase):
             river.apply_overrides({"capacity": 123})
             assert "specifying capacity is depreciated" in str(w[0])
 
+    def test_river_overrides_lags(self):
+        river = River(name="")
+        river.lagged_temperatures.append(15)
+
+        # Overriding other parameters keeps the lagged variables
+        river.apply_overrides({"length": 100, "short_temp_lag": 10})
+        self.assertEqual(15, river.lagged_temperatures.get_sum(10))
+
+        # Changing a lag creates new ones
+        river.apply_overrides({"short_temp_lag": 5})
+        self.assertEqual(0, river.lagged_temperatures.get_sum(5))
+
     def test_riverreservoir_overrides(self):
         riverreservoir = RiverReservoir(name="")
         riverreservoir.apply_overrides({"environmental_flow": 154})
@@ -191,6 +191,27 @@ class MyTestClass(TestCase):
             0.3 * 0.001 * 1.005 ** (15 - 20), tank.total_decayed["phosphate"]
         )
 
+    def test_decay_factors(self):
+        node = Node(
+            name="",
+            data_input_dict={("temperature", 1): 15, ("temperature", 2): 25},
+        )
+        node.t = 1
+        d1 = {"volume": 8, "phosphate": 0.4, "temperature": 10}
+        decays = {"phosphate": {"constant": 0.001, "exponent": 1.005}}
+        tank = DecayTank(decays=decays, initial_storage=d1, parent=node)
+
+        for t in [1, 2]:
+            node.t = t
+            expected, _ = tank.generic_temperature_decay(
+                d1, decays, node.data_input_dict[("temperature", t)]
+            )
+            self.assertDictAlmostEqual(expected, tank.make_decay(d1), 16)
+            self.assertEqual(tank.decay_factors_time, t)
+
+        tank.apply_overrides({"decays": {"phosphate": {"constant": 1, "exponent": 1}}})
+        self.assertEqual(tank.make_decay(d1)["phosphate"], 0)
+
     def test_queue_push(self):
         d1 = {"volume": 5, "phosphate": 0.4, "temperature": 10}
         tank = QueueTank(number_of_timesteps=1, capacity=10, initial_storage=d1)
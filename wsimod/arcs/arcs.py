@@ -6,8 +6,11 @@
 Converted to totals on Thur Apr 21 2022
 """
 
+from types import MappingProxyType
 from typing import Any, Dict
 
+import numpy as np
+
 from wsimod.core import constants
 from wsimod.core.core import DecayObj, WSIObj
 
@@ -278,16 +281,20 @@ class QueueArc(Arc):
         parameter, and additional number of timesteps can be specified when the requests
         are made.
 
-        The queue is a list of requests, where their travel time is decremented
-        by 1 each timestep. Any requests with a travel time of 0 will be sent
-        onwards if the 'update_queue' function is called.
+        Requests are stored in buckets keyed by the timestep that they arrive at the
+        out_port, where requests with the same arrival, direction and tag are merged.
+        Advancing a timestep simply moves to the next bucket, and any requests in
+        the current bucket will be sent onwards if the 'update_queue' function is
+        called. Each request's travel time is replaced by its 'arrival' timestep
+        when it enters a bucket.
 
         Args:
             number_of_timesteps (int, optional): Fixed number of timesteps that
                 it takes to traverse the arc. Defaults to 0.
         """
         self.number_of_timesteps = number_of_timesteps
-        self.queue = []
+        self.queue_buckets = {}
+        self.queue_step = 0
         super().__init__(**kwargs)
 
         self.queue_storage = self.empty_vqip()
@@ -295,6 +302,19 @@ class QueueArc(Arc):
 
         self.mass_balance_ds.append(lambda: self.queue_arc_ds())
 
+    @property
+    def queue(self):
+        """Return a list of all (merged) requests in the arc, in order of arrival.
+
+        Returns:
+            (list): Requests in the buckets
+        """
+        return [
+            request
+            for arrival in sorted(self.queue_buckets)
+            for request in self.queue_buckets[arrival].values()
+        ]
+
     def queue_arc_ds(self):
         """Calculate change in amount of water and other pollutants in the arc.
 
@@ -311,8 +331,9 @@ class QueueArc(Arc):
             (dict): A VQIP amount of water/pollutants in the arc
         """
         queue_storage = self.empty_vqip()
-        for request in self.queue:
-            queue_storage = self.sum_vqip(queue_storage, request["vqip"])
+        for bucket in self.queue_buckets.values():
+            for request in bucket.values():
+                queue_storage = self.sum_vqip(queue_storage, request["vqip"])
         return queue_storage
 
     def send_pull_request(self, vqip, tag="default", time=0):
@@ -443,19 +464,64 @@ class QueueArc(Arc):
         request = self.enter_arc(request, direction, tag)
 
         # Enter queue
-        self.queue.append(request)
+        self.enter_bucket(request)
+
+    def enter_bucket(self, request):
+        """Add a formatted request to the bucket of its arrival timestep, merging it
+        with any request in that bucket that has the same direction and tag. The
+        request's travel time ('time') is replaced by its 'arrival' timestep.
+
+        Args:
+            request (dict): A request dict formatted by enter_arc
+        """
+        arrival = self.queue_step + request.pop("time")
+        bucket = self.queue_buckets.setdefault(arrival, {})
+        key = (request["direction"], request["tag"])
+        if key in bucket:
+            self.merge_requests(bucket[key], request)
+        else:
+            request["arrival"] = arrival
+            bucket[key] = request
+
+    def merge_requests(self, request, other):
+        """Merge one request into another (that remains in the queue).
+
+        Args:
+            request (dict): A request in the queue that is updated
+            other (dict): A request to merge into it
+        """
+        request["vqip"] = self.sum_vqip(request["vqip"], other["vqip"])
+        request["average_flow"] += other["average_flow"]
+
+    def advance_queue(self):
+        """Move the queue on by one timestep. Requests that remain in the current
+        bucket (e.g., if backflow is not enabled) are merged into the next bucket,
+        and so remain ready to be sent onwards.
+        """
+        remaining = self.queue_buckets.pop(self.queue_step, {})
+        self.queue_step += 1
+        if remaining:
+            bucket = self.queue_buckets.pop(self.queue_step, {})
+            for key, request in bucket.items():
+                if key in remaining:
+                    self.merge_requests(remaining[key], request)
+                else:
+                    remaining[key] = request
+            for request in remaining.values():
+                request["arrival"] = self.queue_step
+            self.queue_buckets[self.queue_step] = remaining
 
     def update_queue(self, direction=None, backflow_enabled=True):
-        """Iterate over all requests in the queue, removing them if they have no volume.
+        """Iterate over the requests in the bucket of the current timestep, removing
+        them if they have no volume.
 
-        If a request is a push and has 0 travel time remaining then
-        the push will be triggered at the out_port, if the out_port responds that
-        it cannot receive the push, then this water will be returned as backflow
-        (if enabled).
+        If a request is a push then the push will be triggered at the out_port, if
+        the out_port responds that it cannot receive the push, then this water will
+        be returned as backflow (if enabled).
 
-        If a request is a pull and has 0 travel time remaining then it is simply summed
-        with other 0 travel time pull_requests and returned (since the pull is made at
-        the out_port when the send_pull_request is made).
+        If a request is a pull then it is simply summed with other pull_requests and
+        returned (since the pull is made at the out_port when the send_pull_request
+        is made).
 
 
         Args:
@@ -475,15 +541,16 @@ class QueueArc(Arc):
 
         total_removed = self.empty_vqip()
         total_backflow = self.empty_vqip()
-        # Iterate over requests
-        for request in self.queue:
+        # Iterate over requests that have arrived
+        bucket = self.queue_buckets.get(self.queue_step, {})
+        for key, request in bucket.items():
             if request["direction"] == direction:
                 vqip = request["vqip"]
 
                 if vqip["volume"] < constants.FLOAT_ACCURACY:
                     # Add to queue for removal
-                    done_requests.append(request)
-                elif request["time"] == 0:
+                    done_requests.append(key)
+                else:
                     if direction == "push":
                         # Attempt to push request
                         reply = self.out_port.push_set(vqip, request["tag"])
@@ -509,15 +576,15 @@ class QueueArc(Arc):
                         rejected["volume"] < constants.FLOAT_ACCURACY
                     ):
                         total_backflow = self.sum_vqip(rejected, total_backflow)
-                        done_requests.append(request)
+                        done_requests.append(key)
                     else:
                         request["vqip"] = rejected
 
         self.vqip_out = self.sum_vqip(self.vqip_out, total_removed)
 
         # Remove done requests
-        for request in done_requests:
-            self.queue.remove(request)
+        for key in done_requests:
+            del bucket[key]
 
         # return total_removed
         if direction == "pull":
@@ -541,20 +608,22 @@ class QueueArc(Arc):
         self.queue_storage_ = self.copy_vqip(self.queue_storage)
         self.queue_storage = self.empty_vqip()
 
-        for request in self.queue:
-            request["time"] = max(request["time"] - 1, 0)
+        self.advance_queue()
 
         # TODO - update_queue here?
 
     def reinit(self):
         """"""
         self.end_timestep()
-        self.queue = []
+        self.queue_buckets = {}
 
 
 class AltQueueArc(QueueArc):
     """"""
 
+    # The queue is a dict stored on the arc, rather than derived from buckets
+    queue = None
+
     def __init__(self, **kwargs):
         """A simpler queue arc that has a queue that is a dict where each key is the
         travel time.
@@ -564,9 +633,13 @@ class AltQueueArc(QueueArc):
         self.queue_arc_sum = self.alt_queue_arc_sum
 
         super().__init__(**kwargs)
-        self.queue = {0: self.empty_vqip(), 1: self.empty_vqip()}
+        self.reset_queue()
         self.max_travel = 1
 
+    def reset_queue(self):
+        """Empty the queue."""
+        self.queue = {0: self.empty_vqip(), 1: self.empty_vqip()}
+
     def alt_queue_arc_sum(self):
         """Sum the total water in the queue of the arc.
 
@@ -662,7 +735,297 @@ class AltQueueArc(QueueArc):
     def reinit(self):
         """"""
         self.end_timestep()
-        self.queue = {0: self.empty_vqip(), 1: self.empty_vqip()}
+        self.reset_queue()
+
+
+class ArrayQueueArc(AltQueueArc):
+    """"""
+
+    def __init__(self, **kwargs):
+        """An AltQueueArc whose queue is stored as a NumPy array, with one row for
+        each travel time and one column for volume and each pollutant. This enables a
+        timearea diagram to be applied to a push as a single convolution (see
+        enter_queue_array) and a proportion of the entire queue to be removed as a
+        single scaling (see pull_proportion), which is much faster than iterating over
+        the dict of an AltQueueArc when there are many travel times.
+
+        The array is a ring: the row of travel time 0 is `queue_start`, which moves
+        on by one row each timestep (see advance_queue_array). The queue property
+        still returns the VQIPs for each travel time, but is read-only.
+        """
+        self.columns = (
+            ["volume"]
+            + constants.ADDITIVE_POLLUTANTS
+            + constants.NON_ADDITIVE_POLLUTANTS
+        )
+        self.n_additive = 1 + len(constants.ADDITIVE_POLLUTANTS)
+
+        super().__init__(**kwargs)
+
+    @property
+    def queue(self):
+        """Return the queue as a read-only mapping where each key is the travel time.
+
+        Returns:
+            (MappingProxyType): VQIPs (which are copies) for each travel time
+        """
+        rows = self.queue_rows(np.arange(self.queue_array.shape[0]))
+        return MappingProxyType(
+            {t: self.array_to_vqip(self.queue_array[row]) for t, row in enumerate(rows)}
+        )
+
+    def reset_queue(self):
+        """Empty the queue."""
+        self.queue_array = np.zeros((2, len(self.columns)))
+        self.queue_start = 0
+
+    def queue_rows(self, times):
+        """Get the rows of the queue array that hold travel times.
+
+        Args:
+            times (np.ndarray): Travel times
+
+        Returns:
+            (np.ndarray): Rows
+        """
+        return (self.queue_start + times) % self.queue_array.shape[0]
+
+    def vqip_to_array(self, vqip):
+        """Convert a VQIP to a row of the queue array.
+
+        Args:
+            vqip (dict): A VQIP
+
+        Returns:
+            (np.ndarray): Volume and pollutants
+        """
+        return np.array([vqip[key] for key in self.columns], dtype=float)
+
+    def array_to_vqip(self, row):
+        """Convert a row of the queue array to a VQIP.
+
+        Args:
+            row (np.ndarray): Volume and pollutants
+
+        Returns:
+            vqip (dict): A VQIP
+        """
+        vqip = self.empty_vqip()
+        for key, value in zip(self.columns, row.tolist()):
+            vqip[key] = value
+        return vqip
+
+    def scale_array(self, amounts, proportions):
+        """Scale the volume and additive pollutants of rows of the queue array (the
+        equivalent of v_change_vqip).
+
+        Args:
+            amounts (np.ndarray): Rows of volume and pollutants
+            proportions (np.ndarray): Proportion to scale each row by
+
+        Returns:
+            amounts (np.ndarray): Scaled copy of amounts
+        """
+        amounts = amounts.copy()
+        amounts[:, : self.n_additive] *= proportions[:, None]
+        return amounts
+
+    def add_array(self, amounts, amounts_):
+        """Add rows of the queue array, where non-additive pollutants are blended by
+        volume (the equivalent of sum_vqip).
+
+        Args:
+            amounts (np.ndarray): Rows of volume and pollutants
+            amounts_ (np.ndarray): Rows of volume and pollutants to add
+
+        Returns:
+            total (np.ndarray): Rows of the sums
+        """
+        total = amounts + amounts_
+        if self.n_additive < len(self.columns):
+            blended = (
+                amounts[:, self.n_additive :] * amounts[:, [0]]
+                + amounts_[:, self.n_additive :] * amounts_[:, [0]]
+            )
+            total[:, self.n_additive :] = np.divide(
+                blended,
+                total[:, [0]],
+                out=amounts[:, self.n_additive :].copy(),
+                where=total[:, [0]] > 0,
+            )
+        return total
+
+    def sum_array(self, amounts):
+        """Sum rows of the queue array, where non-additive pollutants are blended by
+        volume.
+
+        Args:
+            amounts (np.ndarray): Rows of volume and pollutants
+
+        Returns:
+            (dict): A VQIP of the sum
+        """
+        total = amounts.sum(axis=0)
+        if total[0] > 0:
+            total[self.n_additive :] = (
+                amounts[:, self.n_additive :] * amounts[:, [0]]
+            ).sum(axis=0) / total[0]
+        else:
+            total[self.n_additive :] = 0
+        return self.array_to_vqip(total)
+
+    def alt_queue_arc_sum(self):
+        """Sum the total water in the queue of the arc.
+
+        Returns:
+            (dict): A VQIP amount of water/pollutants in the arc
+        """
+        return self.sum_array(self.queue_array)
+
+    def extend_queue(self, time):
+        """Add empty rows to the queue array so that it can hold a travel time.
+
+        Args:
+            time (int): Travel time
+        """
+        if time >= self.queue_array.shape[0]:
+            # Unroll the ring so that travel time 0 is the first row
+            self.queue_array = np.vstack(
+                [
+                    np.roll(self.queue_array, -self.queue_start, axis=0),
+                    np.zeros((time + 1 - self.queue_array.shape[0], len(self.columns))),
+                ]
+            )
+            self.queue_start = 0
+            self.max_travel = time
+
+    def enter_queue(self, request, direction="push", tag="default"):
+        """Add a request into the arc's queue.
+
+        Args:
+            request (dict): A dict with a VQIP under the 'vqip' key and the travel
+                time under the 'time' key.
+            direction (str): Direction of flow, can be 'push' only. Defaults to 'push'
+            tag (str, optional): Optional message for out_port's query handler, can be
+                'default' only. Defaults to 'default'.
+        """
+        # Update inflows and format request
+        request = self.enter_arc(request, direction, tag)
+
+        # Sum into queue
+        self.enter_array(
+            np.array([request["time"]]), self.vqip_to_array(request["vqip"])[None]
+        )
+
+    def enter_array(self, times, amounts):
+        """Sum rows into the queue array.
+
+        Args:
+            times (np.ndarray): Travel time of each row, each travel time should
+                occur only once
+            amounts (np.ndarray): Rows of volume and pollutants
+        """
+        self.extend_queue(int(times.max()))
+        rows = self.queue_rows(times)
+        self.queue_array[rows] = self.add_array(self.queue_array[rows], amounts)
+
+    def enter_queue_array(self, times, amounts):
+        """Add several amounts into the arc's queue at once, each with its own travel
+        time. Equivalent to calling enter_queue for each amount.
+
+        Args:
+            times (np.ndarray): Travel time of each amount (in addition to
+                number_of_timesteps), each travel time should occur only once
+            amounts (np.ndarray): Rows of volume and pollutants
+        """
+        times = times + self.number_of_timesteps
+
+        # Update inflows
+        self.flow_in += (amounts[:, 0] / (times + 1)).sum()
+        self.vqip_in = self.sum_vqip(self.vqip_in, self.sum_array(amounts))
+
+        # Sum into queue
+        self.enter_array(times, amounts)
+
+    def pull_proportion(self, proportion):
+        """Remove a proportion of every amount in the queue.
+
+        Args:
+            proportion (float): Proportion to remove
+
+        Returns:
+            (dict): A VQIP amount that was removed
+        """
+        pulled = self.queue_array.copy()
+        pulled[:, : self.n_additive] *= proportion
+        self.queue_array[:, : self.n_additive] -= pulled[:, : self.n_additive]
+        return self.sum_array(pulled)
+
+    def update_queue(self, direction=None, backflow_enabled=True):
+        """Trigger the push of water in the 0th key for the queue, if the out_port
+        responds that it cannot receive the push, then this water will be returned as
+        backflow (if enabled).
+
+        Args:
+            direction (str): Direction of flow, can be 'push' only. Defaults to 'push'
+            backflow_enabled (bool, optional): Enable backflow, described above, if not
+                enabled then the request will remain in the queue until all water has
+                been received. Defaults to True.
+
+        Returns:
+            backflow (dict): In the case of a push direction, any backflow will be
+                returned as a VQIP amount
+        """
+        row = self.queue_start
+        if not self.queue_array[row].any():
+            return self.empty_vqip()
+
+        total_removed = self.array_to_vqip(self.queue_array[row])
+
+        # Push 0 travel time water
+        backflow = self.out_port.push_set(total_removed)
+
+        if not backflow_enabled:
+            self.queue_array[row] = self.vqip_to_array(backflow)
+            backflow = self.empty_vqip()
+        else:
+            self.queue_array[row] = 0
+
+        total_removed = self.v_change_vqip(
+            total_removed, total_removed["volume"] - backflow["volume"]
+        )
+
+        self.flow_out += total_removed["volume"]
+        self.vqip_out = self.sum_vqip(self.vqip_out, total_removed)
+
+        return backflow
+
+    def advance_queue_array(self):
+        """Reduce the travel time of every row in the queue array by one, by moving
+        the start of the ring on by one row. The row of travel time 0 is retained
+        (i.e., combined with the row of travel time 1) and then emptied to become the
+        last travel time."""
+        start, next_ = self.queue_rows(np.arange(2))
+        self.queue_array[[next_]] = self.add_array(
+            self.queue_array[[start]], self.queue_array[[next_]]
+        )
+        self.queue_array[start] = 0
+        self.queue_start = int(next_)
+
+    def end_timestep(self):
+        """End timestep in an arc, resetting flow/vqip in/out (which determine) the
+        capacity for that timestep.
+
+        Update timings in the queue.
+        """
+        self.vqip_in = self.empty_vqip()
+        self.vqip_out = self.empty_vqip()
+        self.flow_in = 0
+        self.flow_out = 0
+        self.queue_storage_ = self.copy_vqip(self.queue_storage)
+        self.queue_storage = self.empty_vqip()
+
+        self.advance_queue_array()
 
 
 class DecayArc(QueueArc, DecayObj):
@@ -704,8 +1067,8 @@ class DecayArc(QueueArc, DecayObj):
         # Decay on entry
         request["vqip"] = self.make_decay(request["vqip"])
 
-        # Append to queue
-        self.queue.append(request)
+        # Enter queue
+        self.enter_bucket(request)
 
     def end_timestep(self):
         """End timestep in an arc, resetting flow/vqip in/out (which determine) the
@@ -723,9 +1086,11 @@ class DecayArc(QueueArc, DecayObj):
         self.queue_storage_ = self.copy_vqip(self.queue_storage)
         self.queue_storage = self.empty_vqip()
 
-        for request in self.queue:
-            request["vqip"] = self.make_decay(request["vqip"])
-            request["time"] = max(request["time"] - 1, 0)
+        for bucket in self.queue_buckets.values():
+            for request in bucket.values():
+                request["vqip"] = self.make_decay(request["vqip"])
+
+        self.advance_queue()
 
 
 class DecayArcAlt(AltQueueArc, DecayObj):
@@ -805,6 +1170,103 @@ class DecayArcAlt(AltQueueArc, DecayObj):
         self.queue[0] = self.sum_vqip(self.queue[0], self.make_decay(queue_[0]))
 
 
+class DecayArrayQueueArc(ArrayQueueArc, DecayObj):
+    """"""
+
+    def __init__(self, decays={}, **kwargs):
+        """An ArrayQueueArc that applies decays from a DecayObj.
+
+        Args:
+            decays (dict, optional): A dict of dicts containing a key for each pollutant
+                that decays and within that, a key for each parameter (a constant and
+                exponent). Defaults to {}.
+        """
+        self.decays = {}
+
+        ArrayQueueArc.__init__(self, **kwargs)
+        DecayObj.__init__(self, decays)
+
+        self.mass_balance_out.append(lambda: self.total_decayed)
+
+    def make_decay_array(self, amounts):
+        """Apply the make_decay function to rows of the queue array (in place).
+
+        Args:
+            amounts (np.ndarray): Rows of volume and pollutants
+        """
+        for pol, factor, additive in self.get_decay_factors():
+            column = self.columns.index(pol)
+            decayed = amounts[:, column] * factor
+            amounts[:, column] -= decayed
+            # Update total_decayed for mass balance checking
+            if additive:
+                self.total_decayed[pol] += decayed.sum()
+
+    def enter_queue(self, request, direction=None, tag="default"):
+        """Add a request into the arc's queue. Apply the make_decay function (i.e., the
+        decay that occur's this timestep).
+
+        Args:
+            request (dict): A dict with a VQIP under the 'vqip' key and the travel
+                time under the 'time' key.
+            direction (str): Direction of flow, can be 'push' only. Defaults to 'push'
+            tag (str, optional): Optional message for out_port's query handler, can be
+                'default' only. Defaults to 'default'.
+        """
+        # Update inflows and format
+        request = self.enter_arc(request, direction, tag)
+
+        # Decay on entry
+        request["vqip"] = self.make_decay(request["vqip"])
+
+        # Sum into queue
+        self.enter_array(
+            np.array([request["time"]]), self.vqip_to_array(request["vqip"])[None]
+        )
+
+    def enter_queue_array(self, times, amounts):
+        """Add several amounts into the arc's queue at once (see
+        ArrayQueueArc.enter_queue_array). Apply the make_decay function (i.e., the
+        decay that occur's this timestep).
+
+        Args:
+            times (np.ndarray): Travel time of each amount (in addition to
+                number_of_timesteps), each travel time should occur only once
+            amounts (np.ndarray): Rows of volume and pollutants
+        """
+        times = times + self.number_of_timesteps
+
+        # Update inflows
+        self.flow_in += (amounts[:, 0] / (times + 1)).sum()
+        self.vqip_in = self.sum_vqip(self.vqip_in, self.sum_array(amounts))
+
+        # Decay on entry
+        amounts = amounts.copy()
+        self.make_decay_array(amounts)
+
+        # Sum into queue
+        self.enter_array(times, amounts)
+
+    def end_timestep(self):
+        """End timestep in an arc, resetting flow/vqip in/out (which determine) the
+        capacity for that timestep.
+
+        Update timings in the queue. Apply the make_decay function (i.e., the decay that
+        occurs in the following timestep).
+        """
+        self.vqip_in = self.empty_vqip()
+        self.vqip_out = self.empty_vqip()
+        self.total_decayed = self.empty_vqip()
+        self.flow_in = 0
+        self.flow_out = 0
+
+        self.queue_storage_ = self.copy_vqip(self.queue_storage)
+        self.queue_storage = self.empty_vqip()
+
+        self.make_decay_array(self.queue_array)
+        self.advance_queue_array()
+
+
 class PullArc(Arc):
     """"""
 
@@ -130,3 +130,11 @@ def set_default_pollutants():
         "nitrite",
         "org-nitrogen",
     ]
+
+
+def set_no_pollutants():
+    """Simulate volumes only (i.e., hydrology), so that VQIPs contain only 'volume'
+    and processes that only change pollutants are not added to nodes."""
+    constants.POLLUTANTS = []
+    constants.ADDITIVE_POLLUTANTS = []
+    constants.NON_ADDITIVE_POLLUTANTS = []
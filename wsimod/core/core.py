@@ -9,6 +9,81 @@ from math import log10
 
 from wsimod.core import constants
 
+# Tables of temperature factors, one for each exponent (and direction) of a decay or
+# treatment process, shared by every DecayObj and treatment works (see
+# get_temperature_factors)
+TEMPERATURE_FACTORS = {}
+
+
+class TemperatureFactors(dict):
+    """"""
+
+    # Number of temperatures that a table holds before it is emptied
+    max_size = 2**16
+
+    def __init__(self, exponent, inverse=False):
+        """A memoising table of the temperature factor of a decay or treatment process,
+        i.e., `exponent ** (temperature - constants.DECAY_REFERENCE_TEMPERATURE)` (or
+        the reference minus temperature, if inverse), keyed by temperature. A factor is
+        calculated the first time that its temperature is looked up, and reused after
+        that, since temperatures come from forcing data and repeat between objects and
+        timesteps.
+
+        Args:
+            exponent (float): The temperature sensitive exponent of the process
+            inverse (bool, optional): Whether the factor decreases with temperature
+                (as in treatment works). Defaults to False.
+
+        Examples:
+            >>> factors = get_temperature_factors(1.005)
+            >>> factors[15] == 1.005 ** (15 - 20)
+            True
+        """
+        super().__init__()
+        self.exponent = exponent
+        self.inverse = inverse
+
+    def __missing__(self, temperature):
+        """Calculate and store the factor of a temperature that is not in the table.
+
+        Args:
+            temperature (float): The temperature
+
+        Returns:
+            factor (float): The temperature factor
+        """
+        if len(self) >= self.max_size:
+            self.clear()
+        if self.inverse:
+            factor = self.exponent ** (
+                constants.DECAY_REFERENCE_TEMPERATURE - temperature
+            )
+        else:
+            factor = self.exponent ** (
+                temperature - constants.DECAY_REFERENCE_TEMPERATURE
+            )
+        self[temperature] = factor
+        return factor
+
+
+def get_temperature_factors(exponent, inverse=False):
+    """Get the table of temperature factors of an exponent, which is shared by every
+    object whose process has that exponent.
+
+    Args:
+        exponent (float): The temperature sensitive exponent of the process
+        inverse (bool, optional): Whether the factor decreases with temperature (see
+            TemperatureFactors). Defaults to False.
+
+    Returns:
+        factors (TemperatureFactors): The table of temperature factors
+    """
+    key = (exponent, inverse)
+    factors = TEMPERATURE_FACTORS.get(key)
+    if factors is None:
+        factors = TEMPERATURE_FACTORS[key] = TemperatureFactors(exponent, inverse)
+    return factors
+
 
 class WSIObj:
     """"""
@@ -115,6 +190,38 @@ class WSIObj:
 
         return t
 
+    def add_vqip(self, t1, t2):
+        """Add a VQIP to another in place, as in sum_vqip, which avoids copying when
+        accumulating many VQIPs into one (e.g., a mass balance ledger).
+
+        Args:
+            t1 (dict): A VQIP where pollutant entries are mass totals, which is updated
+            t2 (dict): A VQIP where pollutant entries are mass totals
+
+        Returns:
+            t1 (dict): t1, updated to be the sum of t1 and t2
+
+        Examples:
+            >>> t1 = {'phosphate' : 0.25, 'volume' : 100, 'temperature' : 10}
+            >>> t2 = {'phosphate' : 0.25, 'volume' : 10, 'temperature' : 15}
+            >>> _ = add_vqip(t1, t2)
+            >>> print(t1)
+            {'phosphate' : 0.5, 'volume' : 110, 'temperature' : 10.45}
+        """
+        volume = t1["volume"]
+        t1["volume"] += t2["volume"]
+        for pollutant in constants.ADDITIVE_POLLUTANTS:
+            t1[pollutant] += t2[pollutant]
+
+        if t1["volume"] > 0:
+            # Assume proportional blending of non additive pollutants
+            for pollutant in constants.NON_ADDITIVE_POLLUTANTS:
+                t1[pollutant] = (
+                    t2[pollutant] * t2["volume"] + t1[pollutant] * volume
+                ) / t1["volume"]
+
+        return t1
+
     def concentration_to_total(self, c):
         """Convert a VQIP that has pollutant entries as concentrations into mass totals.
 
@@ -470,10 +577,60 @@ class DecayObj(WSIObj):
             print("warning: decay object cannot access temperature data")
 
         self.total_decayed = self.empty_vqip()
+        self.decay_factors = None
+        self.decay_factors_time = None
+
+    def get_decay_factors(self):
+        """Calculate the proportion of each pollutant that decays (see
+        generic_temperature_decay). Temperature is read, and the factors calculated,
+        only once per timestep, and reused for every call of make_decay in that
+        timestep, and temperature factors are looked up in the shared tables of
+        get_temperature_factors. Set `decay_factors` to None if the decays change.
+        Decays of pollutants that are not simulated are ignored (and temperature is
+        not read if there are none).
+
+        Returns:
+            decay_factors (list): A list of tuples of pollutant, proportion that
+                decays and whether the pollutant is additive
+        """
+        t = self.data_input_object.t
+        if self.decay_factors is None or self.decay_factors_time != t:
+            if not self.get_decay_input_variables():
+                self.decay_factors = []
+                self.decay_factors_time = t
+                return self.decay_factors
+            # Read temperature data
+            temperature = self.data_input_object.data_input_dict[("temperature", t)]
+            self.decay_factors = [
+                (
+                    pol,
+                    min(
+                        pars["constant"]
+                        * get_temperature_factors(pars["exponent"])[temperature],
+                        1,
+                    ),
+                    pol in constants.ADDITIVE_POLLUTANTS,
+                )
+                for pol, pars in self.decays.items()
+                if pol in constants.POLLUTANTS
+            ]
+            self.decay_factors_time = t
+        return self.decay_factors
+
+    def get_decay_input_variables(self):
+        """Variables read from the data_input_dict of `data_input_object` by
+        get_decay_factors. Used to check input data before a run.
+
+        Returns:
+            (set): Names of variables
+        """
+        if any(pol in constants.POLLUTANTS for pol in self.decays):
+            return set(["temperature"])
+        return set()
 
     def make_decay(self, vqip):
-        """Make decay, reading tempature and updating pollutant amounts. A wrapper for
-        generic_temperature_decay.
+        """Make decay, updating pollutant amounts with the decay factors of this
+        timestep. Equivalent to generic_temperature_decay.
 
         Args:
             vqip (dict): A VQIP to decay where pollutants are given as mass totals
@@ -481,14 +638,14 @@ class DecayObj(WSIObj):
         Returns:
             vqip_ (dict): A VQIP with pollutant amounts updated
         """
-        # Read temperature data
-        temperature = self.data_input_object.data_input_dict[
-            ("temperature", self.data_input_object.t)
-        ]
-        # Make decay
-        vqip_, diff = self.generic_temperature_decay(vqip, self.decays, temperature)
-        # Update total_decayed for mass balance checking
-        self.total_decayed = self.sum_vqip(self.total_decayed, diff)
+        vqip_ = self.copy_vqip(vqip)
+        for pol, factor, additive in self.get_decay_factors():
+            # Make decay
+            decayed = vqip_[pol] * factor
+            vqip_[pol] -= decayed
+            # Update total_decayed for mass balance checking
+            if additive:
+                self.total_decayed[pol] += decayed
         return vqip_
 
     def generic_temperature_decay(self, t, d, temperature):
@@ -511,8 +668,7 @@ class DecayObj(WSIObj):
             # Perform calculation
             diff[pol] = t[pol] * min(
                 pars["constant"]
-                * pars["exponent"]
-                ** (temperature - constants.DECAY_REFERENCE_TEMPERATURE),
+                * get_temperature_factors(pars["exponent"])[temperature],
                 1,
             )
             # Update VQIP
@@ -539,8 +695,7 @@ class DecayObj(WSIObj):
         for pol, pars in d.items():
             diff[pol] = c[pol] * min(
                 pars["constant"]
-                * pars["exponent"]
-                ** (temperature - constants.DECAY_REFERENCE_TEMPERATURE),
+                * get_temperature_factors(pars["exponent"])[temperature],
                 1,
             )
             c[pol] -= diff[pol]
@@ -4,6 +4,7 @@ from wsimod.nodes.demand import Demand, NonResidentialDemand, ResidentialDemand
 from wsimod.nodes.distribution import Distribution, UnlimitedDistribution
 from wsimod.nodes.land import Land
 from wsimod.nodes.nodes import NODES_REGISTRY, Node
+from wsimod.nodes.replay import Replay
 from wsimod.nodes.sewer import EnfieldFoulSewer, Sewer
 from wsimod.nodes.storage import (
     Groundwater,
@@ -51,28 +51,60 @@ class Catchment(Node):
         self.push_set_handler["default"] = self.push_set_deny
         self.push_check_handler["default"] = self.push_set_deny
         self.unrouted_water = self.empty_vqip()
+        self.flow_vqips = {}
         # Mass balance
         self.mass_balance_in.append(lambda: self.get_flow())
         self.mass_balance_out.append(lambda: self.unrouted_water)
         self.end_timestep = self.end_timestep_
 
     def get_flow(self):
+        """Get the flow VQIP for the current timestep, from those precomputed for
+        the run if available.
+
+        Returns:
+            vqip (dict): Return read data as a VQIP
+        """
+        vqip = self.flow_vqips.get(self.t)
+        if vqip is None:
+            return self.read_flow(self.t)
+        return self.copy_vqip(vqip)
+
+    def read_flow(self, t):
         """Read volume data, read pollutant data, convert additibve pollutants from
         kg/m3 to kg.
 
+        Args:
+            t (any): Time to read data for
+
         Returns:
             vqip (dict): Return read data as a VQIP
         """
         # TODO (if used) - note that if flow is < float accuracy then it won't
         # get pushed, and the pollutants will 'disappear', causing a mass balance error
-        vqip = {"volume": self.data_input_dict[("flow", self.t)]}
+        vqip = {"volume": self.data_input_dict[("flow", t)]}
         for pollutant in constants.POLLUTANTS:
-            vqip[pollutant] = self.data_input_dict[(pollutant, self.t)]
+            vqip[pollutant] = self.data_input_dict[(pollutant, t)]
         for pollutant in constants.ADDITIVE_POLLUTANTS:
             vqip[pollutant] *= vqip["volume"]
 
         return vqip
 
+    def precompute_inputs(self, dates):
+        """Read the flow VQIPs for all dates of a run in advance.
+
+        Args:
+            dates (list): Dates that will be simulated
+        """
+        self.flow_vqips = {date: self.read_flow(date) for date in dates}
+
+    def get_input_variables(self):
+        """Flow and pollutant concentrations are read at each timestep.
+
+        Returns:
+            (set): Names of variables
+        """
+        return set(["flow"] + constants.POLLUTANTS)
+
     def route(self):
         """Send any water that has not already been abstracted downstream."""
         # Get amount of water
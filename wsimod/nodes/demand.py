@@ -300,6 +300,14 @@ class ResidentialDemand(Demand):
 
         return excess * self.gardening_efficiency
 
+    def get_input_variables(self):
+        """Temperature is read to calculate foul water temperature.
+
+        Returns:
+            (set): Names of variables
+        """
+        return set(["temperature"])
+
     def get_house_demand(self):
         """Per capita calculations for household wastewater generation. Applies weighted
         temperature calculation.
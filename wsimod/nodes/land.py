@@ -13,6 +13,32 @@ from wsimod.nodes.nodes import Node
 from wsimod.nodes.nutrient_pool import NutrientPool
 from wsimod.nodes.tanks import DecayTank, ResidenceTank
 
+# Seasonal variation of rainfall erosivity (see GrowingSurface.erosion), for each day
+# of year
+EROSION_SEASONALITY = [sin(2 * constants.PI * ((doy - 70) / 365)) for doy in range(367)]
+
+
+def no_mass_balance(function):
+    """Decorator to register a surface inflow/process/outflow function as making no
+    contribution to the parent's mass balance (i.e., it always returns empty VQIPs),
+    so that Surface.run does not need to accumulate its reply.
+
+    Args:
+        function (function): The surface function
+
+    Returns:
+        (function): The surface function, flagged with mass_balance = False
+
+    Example:
+        >>> class MySurface(Surface):
+        ...     @no_mass_balance
+        ...     def my_process(self):
+        ...         self.storage["temperature"] = 10
+        ...         return (self.empty_vqip(), self.empty_vqip())
+    """
+    function.mass_balance = False
+    return function
+
 
 class Land(Node):
     """"""
@@ -274,6 +300,26 @@ class Land(Node):
         ]:
             tanks.end_timestep()
 
+    def get_input_variables(self):
+        """Variables read by the surfaces from the Land node's data_input_dict.
+
+        Returns:
+            (set): Names of variables
+        """
+        variables = set()
+        for surface in self.surfaces:
+            variables.update(surface.get_input_variables())
+        return variables
+
+    def precompute_inputs(self, dates):
+        """Call precompute_inputs in all surfaces.
+
+        Args:
+            dates (list): Dates that will be simulated
+        """
+        for surface in self.surfaces:
+            surface.precompute_inputs(dates)
+
     def get_surface(self, surface_):
         """Return a surface from the list of surfaces by the 'surface' entry in the
         surface. I.e., the name of the surface.
@@ -372,14 +418,18 @@ class Surface(DecayTank):
 
         # Populate function lists TODO.. not sure why I have deposition but no
         # precipitation here
-        if "nhx-dry" in set(x[0] for x in data_input_dict.keys()):
+        # (deposition only changes pollutants, so is skipped if none are simulated)
+        if ("nhx-dry" in set(x[0] for x in data_input_dict.keys())) & (
+            len(constants.ADDITIVE_POLLUTANTS) > 0
+        ):
             self.inflows = [self.atmospheric_deposition, self.precipitation_deposition]
         else:
             self.inflows = []
-        if len(self.pollutant_load) > 0:
+        if (len(self.pollutant_load) > 0) & (len(constants.ADDITIVE_POLLUTANTS) > 0):
             self.inflows.append(self.simple_deposition)
         self.processes = []
         self.outflows = []
+        self.deposition_vqips = {}
 
     def apply_overrides(self, overrides=Dict[str, Any]):
         """Override parameters.
@@ -438,15 +488,14 @@ class Surface(DecayTank):
             self.storage["nitrite"] += self.total_decayed["ammonia"]
             self.parent.running_inflow_mb["nitrite"] += self.total_decayed["ammonia"]
 
-        for f in self.inflows + self.processes + self.outflows:
-            # Iterate over function lists, updating mass balance
-            in_, out_ = f()
-            self.parent.running_inflow_mb = self.sum_vqip(
-                self.parent.running_inflow_mb, in_
-            )
-            self.parent.running_outflow_mb = self.sum_vqip(
-                self.parent.running_outflow_mb, out_
-            )
+        for functions in (self.inflows, self.processes, self.outflows):
+            for f in functions:
+                # Iterate over function lists, updating mass balance (unless the
+                # function is registered as not contributing to it)
+                in_, out_ = f()
+                if getattr(f, "mass_balance", True):
+                    self.add_vqip(self.parent.running_inflow_mb, in_)
+                    self.add_vqip(self.parent.running_outflow_mb, out_)
 
     def get_data_input(self, var):
         """Read data input from parent Land node (i.e., for precipitation/et0/temp).
@@ -470,6 +519,90 @@ class Surface(DecayTank):
         """
         return self.data_input_dict[(var, self.parent.monthyear)]
 
+    def precompute_inputs(self, dates):
+        """Read and scale the deposition VQIPs for all months of a run in advance.
+
+        Args:
+            dates (list): Dates that will be simulated
+        """
+        functions = self.inflows + self.processes + self.outflows
+        monthyears = set(date.to_period("M") for date in dates)
+        self.deposition_vqips = {}
+        for function, type_ in [
+            (self.atmospheric_deposition, "dry"),
+            (self.precipitation_deposition, "wet"),
+        ]:
+            if function in functions:
+                for monthyear in monthyears:
+                    self.deposition_vqips[(type_, monthyear)] = self.read_deposition(
+                        type_, monthyear
+                    )
+
+    def read_deposition(self, type_, monthyear):
+        """Read deposition data, scale by area and convert to a VQIP.
+
+        Args:
+            type_ (str): Type of deposition ('dry' or 'wet')
+            monthyear (any): Month to read data for
+
+        Returns:
+            vqip (dict): A VQIP amount of deposition
+        """
+        # TODO double check units in preprocessing - is weight of N or weight of
+        # NHX/noy?
+
+        # Read data and scale
+        nhx = self.data_input_dict[("nhx-" + type_, monthyear)] * self.area
+        noy = self.data_input_dict[("noy-" + type_, monthyear)] * self.area
+        srp = self.data_input_dict[("srp-" + type_, monthyear)] * self.area
+
+        # Assign pollutants
+        vqip = self.empty_vqip()
+        vqip["ammonia"] = nhx
+        vqip["nitrate"] = noy
+        vqip["phosphate"] = srp
+        return vqip
+
+    def get_deposition(self, type_):
+        """Get the deposition VQIP for the current timestep, from those precomputed
+        for the run if available.
+
+        Args:
+            type_ (str): Type of deposition ('dry' or 'wet')
+
+        Returns:
+            vqip (dict): A VQIP amount of deposition
+        """
+        vqip = self.deposition_vqips.get((type_, self.parent.monthyear))
+        if vqip is None:
+            return self.read_deposition(type_, self.parent.monthyear)
+        return self.copy_vqip(vqip)
+
+    def get_input_variables(self):
+        """Variables read from the parent Land node's data_input_dict (i.e., with
+        `get_data_input`) by the functions in inflows, processes and outflows.
+
+        Returns:
+            (set): Names of variables
+        """
+        return set()
+
+    def get_surface_input_variables(self):
+        """Variables read from this surface's data_input_dict (i.e., with
+        `get_data_input_surface`) by the functions in inflows, processes and
+        outflows.
+
+        Returns:
+            (set): Names of variables
+        """
+        functions = self.inflows + self.processes + self.outflows
+        variables = set()
+        if self.atmospheric_deposition in functions:
+            variables.update(["nhx-dry", "noy-dry", "srp-dry"])
+        if self.precipitation_deposition in functions:
+            variables.update(["nhx-wet", "noy-wet", "srp-wet"])
+        return variables
+
     def dry_deposition_to_tank(self, vqip):
         """Generic function for allocating dry pollution deposition to the surface.
         Simply sends the pollution into the tank (some subclasses overwrite this
@@ -533,19 +666,8 @@ class Surface(DecayTank):
             (tuple): A tuple containing a VQIP amount for model inputs and outputs
                 for mass balance checking.
         """
-        # TODO double check units in preprocessing - is weight of N or weight of
-        # NHX/noy?
-
         # Read data and scale
-        nhx = self.get_data_input_surface("nhx-dry") * self.area
-        noy = self.get_data_input_surface("noy-dry") * self.area
-        srp = self.get_data_input_surface("srp-dry") * self.area
-
-        # Assign pollutants
-        vqip = self.empty_vqip()
-        vqip["ammonia"] = nhx
-        vqip["nitrate"] = noy
-        vqip["phosphate"] = srp
+        vqip = self.get_deposition("dry")
 
         # Update tank
         in_ = self.dry_deposition_to_tank(vqip)
@@ -561,18 +683,8 @@ class Surface(DecayTank):
             (tuple): A tuple containing a VQIP amount for model inputs and outputs
                 for mass balance checking.
         """
-        # TODO double check units - is weight of N or weight of NHX/noy?
-
         # Read data and scale
-        nhx = self.get_data_input_surface("nhx-wet") * self.area
-        noy = self.get_data_input_surface("noy-wet") * self.area
-        srp = self.get_data_input_surface("srp-wet") * self.area
-
-        # Assign pollutants
-        vqip = self.empty_vqip()
-        vqip["ammonia"] = nhx
-        vqip["nitrate"] = noy
-        vqip["phosphate"] = srp
+        vqip = self.get_deposition("wet")
 
         # Update tank
         in_ = self.wet_deposition_to_tank(vqip)
@@ -696,6 +808,18 @@ class ImperviousSurface(Surface):
 
         return (self.precipitation, self.evaporation)
 
+    def get_input_variables(self):
+        """Precipitation, et0 and temperature are read by precipitation_evaporation.
+
+        Returns:
+            (set): Names of variables
+        """
+        variables = super().get_input_variables()
+        if self.precipitation_evaporation in self.inflows:
+            variables.update(["precipitation", "et0", "temperature"])
+        return variables
+
+    @no_mass_balance
     def push_to_sewers(self):
         """Outflow function that distributes ponded water (i.e., surface runoff) to the
         parent node's attached sewers.
@@ -826,13 +950,18 @@ class PerviousSurface(Surface):
         self.evaporation = self.empty_vqip()
         self.precipitation = self.empty_vqip()
 
+        # IHACRES response for the current timestep, if it has been calculated in
+        # advance (see orchestration/land_engine.py)
+        self.ihacres_response = None
+
         # Populate function lists
         self.inflows.append(self.ihacres)  # work out runoff
 
         # TODO interception if I hate myself enough?
-        self.processes.append(
-            self.calculate_soil_temperature
-        )  # Calculate soil temp + dependence factor
+        if "temperature" in constants.POLLUTANTS:
+            self.processes.append(
+                self.calculate_soil_temperature
+            )  # Calculate soil temp + dependence factor
 
         # self.processes.append(self.decay) #apply generic decay (currently handled by
         # decaytank at end of timestep) TODO decaytank uses air temperature not soil
@@ -910,19 +1039,18 @@ class PerviousSurface(Surface):
         evaporation_depth = self.get_data_input("et0") * self.et0_coefficient
         return precipitation_depth, evaporation_depth
 
-    def ihacres(self):
-        """Inflow function that runs the IHACRES model equations, updates tanks, and
-        store flows in state variables (which are later sent to the parent land node in
-        the route function).
+    def calculate_ihacres_response(self, precipitation_depth):
+        """Run the IHACRES model equations that do not depend on evaporation.
+
+        Args:
+            precipitation_depth (float): Depth of precipitation this timestep
 
         Returns:
-            (tuple): A tuple containing a VQIP amount for model inputs and outputs
-                for mass balance checking.
+            (list): The infiltrated precipitation depth, the infiltration excess
+                volume (including surface runoff), the proportion of potential
+                evaporation that occurs, the outflow depth, the soil moisture content,
+                and the volumes of percolation, subsurface flow and precipitation
         """
-        # Read data (leave in depth units since that is what IHACRES equations are in)
-        precipitation_depth, evaporation_depth = self.get_climate()
-        temperature = self.get_data_input("temperature")
-
         # Apply infiltration
         infiltrated_precipitation = min(precipitation_depth, self.infiltration_capacity)
         infiltration_excess = max(precipitation_depth - infiltrated_precipitation, 0)
@@ -932,7 +1060,7 @@ class PerviousSurface(Surface):
 
         # IHACRES equations (we do (depth - wilting_point_m or field capacity) to
         # convert from a deficit to storage tank)
-        evaporation = evaporation_depth * min(
+        evaporation_factor = min(
             1,
             exp(
                 2
@@ -952,10 +1080,6 @@ class PerviousSurface(Surface):
             )
         )
 
-        # Can't evaporate more than available moisture (presumably the IHACRES equation
-        # prevents this ever being needed)
-        evaporation = min(evaporation, precipitation_depth + self.get_smc())
-
         # Scale to volumes and apply proportions to work out percolation/surface
         # runoff/subsurface runoff
         surface = outflow * self.surface_coefficient * self.area
@@ -971,12 +1095,59 @@ class PerviousSurface(Surface):
             * self.subsurface_coefficient
             * self.area
         )
-        tank_recharge = (infiltrated_precipitation - evaporation - outflow) * self.area
         infiltration_excess *= self.area
         infiltration_excess += surface
-        evaporation *= self.area
         precipitation = precipitation_depth * self.area
 
+        return [
+            infiltrated_precipitation,
+            infiltration_excess,
+            evaporation_factor,
+            outflow,
+            self.get_smc(),
+            percolation,
+            subsurface_flow,
+            precipitation,
+        ]
+
+    def ihacres(self):
+        """Inflow function that runs the IHACRES model equations, updates tanks, and
+        store flows in state variables (which are later sent to the parent land node in
+        the route function).
+
+        Returns:
+            (tuple): A tuple containing a VQIP amount for model inputs and outputs
+                for mass balance checking.
+        """
+        # Read data (leave in depth units since that is what IHACRES equations are in)
+        precipitation_depth, evaporation_depth = self.get_climate()
+        temperature = self.get_data_input("temperature")
+
+        # Run IHACRES equations (unless already calculated for this timestep)
+        if self.ihacres_response is None:
+            response = self.calculate_ihacres_response(precipitation_depth)
+        else:
+            response = self.ihacres_response
+            self.ihacres_response = None
+        (
+            infiltrated_precipitation,
+            infiltration_excess,
+            evaporation_factor,
+            outflow,
+            smc,
+            percolation,
+            subsurface_flow,
+            precipitation,
+        ) = response
+        evaporation = evaporation_depth * evaporation_factor
+
+        # Can't evaporate more than available moisture (presumably the IHACRES equation
+        # prevents this ever being needed)
+        evaporation = min(evaporation, precipitation_depth + smc)
+
+        tank_recharge = (infiltrated_precipitation - evaporation - outflow) * self.area
+        evaporation *= self.area
+
         # Mix in tank to calculate pollutant concentrations
         total_water_passing_through_soil_tank = (
             tank_recharge + subsurface_flow + percolation
@@ -1043,6 +1214,7 @@ class PerviousSurface(Surface):
 
         return (in_, out_)
 
+    @no_mass_balance
     def route(self):
         """An outflow function that sends percolation, subsurface runoff and surface
         runoff to their respective tanks in the parent land node.
@@ -1057,6 +1229,21 @@ class PerviousSurface(Surface):
 
         return (self.empty_vqip(), self.empty_vqip())
 
+    def get_input_variables(self):
+        """Precipitation, et0 and temperature are read by ihacres, and temperature by
+        calculate_soil_temperature.
+
+        Returns:
+            (set): Names of variables
+        """
+        variables = super().get_input_variables()
+        if self.ihacres in self.inflows:
+            variables.update(["precipitation", "et0", "temperature"])
+        if self.calculate_soil_temperature in self.processes:
+            variables.add("temperature")
+        return variables
+
+    @no_mass_balance
     def calculate_soil_temperature(self):
         """Process function that calculates soil temperature based on a weighted.
 
@@ -1256,6 +1443,11 @@ class GrowingSurface(PerviousSurface):
             self.crop_cover_stages,
             self.autumn_sow,
         ) = self.infer_sow_harvest_calendar()
+        (
+            self.crop_factor_table,
+            self.crop_cover_table,
+            self.ground_cover_table,
+        ) = self.calculate_day_of_year_tables()
 
         # State variables
         self.days_after_sow = None
@@ -1350,6 +1542,33 @@ class GrowingSurface(PerviousSurface):
 
         return harvest_sow_calendar, ground_cover_stages, crop_cover_stages, autumn_sow
 
+    def calculate_day_of_year_tables(self):
+        """Interpolate crop factor, crop cover and ground cover (see calc_crop_cover)
+        for every day of year in advance, since they depend only on parameters. Should
+        be recalculated if the crop parameters or calendar change (as in
+        apply_overrides).
+
+        Returns:
+            (list): crop factor, indexed by day of year
+            (list): crop cover, indexed by day of year
+            (list): ground cover, indexed by day of year
+        """
+        tables = []
+        for xp, yp in [
+            (self.crop_factor_stage_dates, self.crop_factor_stages),
+            (self.harvest_sow_calendar, self.crop_cover_stages),
+            (self.harvest_sow_calendar, self.ground_cover_stages),
+        ]:
+            table = []
+            for doy in range(367):
+                try:
+                    table.append(self.quick_interp(doy, xp, yp))
+                except (IndexError, ZeroDivisionError):
+                    # Day of year is outside of the dates provided
+                    table.append(None)
+            tables.append(table)
+        return tables
+
     def calculate_available_water(self):
         """Calculate total/readily available water based on capacity/wp.
         Returns:
@@ -1425,6 +1644,11 @@ class GrowingSurface(PerviousSurface):
             self.crop_cover_stages,
             self.autumn_sow,
         ) = self.infer_sow_harvest_calendar()
+        (
+            self.crop_factor_table,
+            self.crop_cover_table,
+            self.ground_cover_table,
+        ) = self.calculate_day_of_year_tables()
         (
             self.total_available_water,
             self.readily_available_water,
@@ -1511,6 +1735,26 @@ class GrowingSurface(PerviousSurface):
         y = y_left + (y_right - y_left) * dif / (x_right - x_left)
         return y
 
+    def day_of_year_interp(self, table, doy, xp, yp):
+        """Read an interpolated value for the current day of year from a table made
+        by calculate_day_of_year_tables.
+
+        Args:
+            table (list): Interpolated values, indexed by day of year
+            doy (int): Current day of year
+            xp (list): Predefined days of year that the table was interpolated from
+            yp (list): Predefined values associated with xp
+
+        Returns:
+            (float): Interpolated value for current day of year
+        """
+        value = table[doy]
+        if value is None:
+            # Not in the table (will raise an error for invalid stage dates)
+            value = self.quick_interp(doy, xp, yp)
+        return value
+
+    @no_mass_balance
     def calc_crop_cover(self):
         """Process function that calculates how much crop cover there is, assigns
         whether crops are sown/harvested, and calculates et0_coefficient based on growth
@@ -1521,19 +1765,19 @@ class GrowingSurface(PerviousSurface):
                 for mass balance checking.
         """
         # Get current day of year
-        doy = self.parent.t.dayofyear
+        dayofyear = self.parent.t.dayofyear
+        doy = dayofyear
 
-        if self.parent.t.is_leap_year:
+        if doy > 59 and self.parent.t.is_leap_year:
             # Hacky way to handle leap years
-            if doy > 59:
-                doy -= 1
+            doy -= 1
 
         if self.days_after_sow is None:
-            if self.parent.t.dayofyear == self.sowing_day:
+            if dayofyear == self.sowing_day:
                 # sow
                 self.days_after_sow = 0
         else:
-            if self.parent.t.dayofyear == self.harvest_day:
+            if dayofyear == self.harvest_day:
                 # harvest
                 self.days_after_sow = None
                 self.crop_factor = self.crop_factor_stages[0]
@@ -1544,17 +1788,26 @@ class GrowingSurface(PerviousSurface):
                 self.days_after_sow += 1
 
         # Calculate relevant parameters
-        self.crop_factor = self.quick_interp(
-            doy, self.crop_factor_stage_dates, self.crop_factor_stages
+        self.crop_factor = self.day_of_year_interp(
+            self.crop_factor_table,
+            doy,
+            self.crop_factor_stage_dates,
+            self.crop_factor_stages,
         )
         if self.days_after_sow:
             # Move outside of this if, if you want nonzero crop/ground cover outside of
             # season
-            self.crop_cover = self.quick_interp(
-                doy, self.harvest_sow_calendar, self.crop_cover_stages
+            self.crop_cover = self.day_of_year_interp(
+                self.crop_cover_table,
+                doy,
+                self.harvest_sow_calendar,
+                self.crop_cover_stages,
             )
-            self.ground_cover = self.quick_interp(
-                doy, self.harvest_sow_calendar, self.ground_cover_stages
+            self.ground_cover = self.day_of_year_interp(
+                self.ground_cover_table,
+                doy,
+                self.harvest_sow_calendar,
+                self.ground_cover_stages,
             )
 
         root_zone_depletion = max(self.field_capacity_m - self.get_smc(), 0)
@@ -1602,6 +1855,7 @@ class GrowingSurface(PerviousSurface):
 
         return vqip
 
+    @no_mass_balance
     def effective_precipitation_flushing(self):
         """Remove the nutrients brought out by effective precipitation, which is surface
         runoff, subsurface runoff, and percolation, from the nutrients pool.
@@ -1810,6 +2064,7 @@ class GrowingSurface(PerviousSurface):
 
         return (in_, out_)
 
+    @no_mass_balance
     def calc_temperature_dependence_factor(self):
         """Process function that calculates the temperature dependence factor for the
         nutrient pool (which impacts soil pool transformations).
@@ -1830,6 +2085,7 @@ class GrowingSurface(PerviousSurface):
         self.nutrient_pool.temperature_dependence_factor = temperature_dependence_factor
         return (self.empty_vqip(), self.empty_vqip())
 
+    @no_mass_balance
     def calc_soil_moisture_dependence_factor(self):
         """Process function that calculates the soil moisture dependence factor for the
         nutrient pool (which impacts soil pool transformations).
@@ -1925,6 +2181,35 @@ class GrowingSurface(PerviousSurface):
         else:
             return (self.empty_vqip(), self.empty_vqip())
 
+    def get_input_variables(self):
+        """Precipitation is also read by erosion.
+
+        Returns:
+            (set): Names of variables
+        """
+        variables = super().get_input_variables()
+        if self.erosion in self.inflows + self.processes + self.outflows:
+            variables.add("precipitation")
+        return variables
+
+    def get_surface_input_variables(self):
+        """Fertiliser, manure and residue inputs are also read from this surface's
+        data_input_dict.
+
+        Returns:
+            (set): Names of variables
+        """
+        variables = super().get_surface_input_variables()
+        functions = self.inflows + self.processes + self.outflows
+        for function, source in [
+            (self.fertiliser, "fertiliser"),
+            (self.manure, "manure"),
+            (self.residue, "residue"),
+        ]:
+            if function in functions:
+                variables.update(["nhx-" + source, "noy-" + source, "srp-" + source])
+        return variables
+
     def erosion(self):
         """Outflow function that erodes adsorbed/humus phosphorus and sediment and sends
         onwards to percolation/surface runoff/subsurface runoff.
@@ -1943,11 +2228,7 @@ class GrowingSurface(PerviousSurface):
         if precipitation_depth > 5:
             rainfall_energy = 8.95 + 8.44 * log10(
                 precipitation_depth
-                * (
-                    0.257
-                    + sin(2 * constants.PI * ((self.parent.t.dayofyear - 70) / 365))
-                    * 0.09
-                )
+                * (0.257 + EROSION_SEASONALITY[self.parent.t.dayofyear] * 0.09)
                 * 2
             )
             rainfall_energy *= precipitation_depth
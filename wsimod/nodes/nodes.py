@@ -57,6 +57,16 @@ class Node(WSIObj):
         self.t = None
         self.data_input_dict = data_input_dict
 
+        # Number of timesteps represented by the current call of an orchestration
+        # function (see 'every' in Model.orchestration)
+        self.steps = 1
+
+        # Orchestration functions that may be called every N timesteps, mapped to the
+        # name of the function that is called on the timesteps in between (e.g., to
+        # release the outflow calculated by the last call). Other functions cannot,
+        # since the node would not act on the inputs of the timesteps it skips
+        self.multirate = {}
+
         # Initiailise default handlers
         self.pull_set_handler = {"default": self.pull_distributed}
         self.push_set_handler = {
@@ -342,10 +352,64 @@ class Node(WSIObj):
                 print("Some other error")
                 return handler[tag](ip)
 
+    def allocate_distributed(self, amount, connected, arcs):
+        """Allocate an amount between arcs in proportion to connected['allocation']
+        (i.e., availability multiplied by preference). Where an arc's share exceeds its
+        availability, it is capped and the excess is reallocated between the other arcs
+        in the same way (i.e., in proportion to their remaining availability multiplied
+        by preference), until the amount or availability is exhausted. This is the
+        allocation that repeatedly sending requests and checks converges to, but
+        without sending them.
+
+        Args:
+            amount (float): Total amount to allocate
+            connected (dict): Availability of arcs, as returned by get_connected
+            arcs (dict): Arcs named in connected (i.e., in_arcs or out_arcs)
+
+        Returns:
+            allocated (dict): Amount to request from/send to each arc
+
+        Examples:
+            >>> connected = my_node.get_connected(direction='pull')
+            >>> allocated = my_node.allocate_distributed(10, connected,
+                                                        my_node.in_arcs)
+        """
+        allocated = dict.fromkeys(connected["allocation"], 0)
+        remaining = connected["capacity"].copy()
+        allocation = connected["allocation"]
+        priority = connected["priority"]
+        while (amount > constants.FLOAT_ACCURACY) & (priority > 0):
+            # Allocate in proportion to priority, capped by availability
+            capped = False
+            total = 0
+            for key, weight in allocation.items():
+                share = amount * weight / priority
+                if share > remaining[key]:
+                    share = remaining[key]
+                    capped = True
+                allocated[key] += share
+                remaining[key] -= share
+                total += share
+            if not capped:
+                break
+
+            # Reallocate excess between arcs with remaining availability
+            amount -= total
+            allocation = {
+                key: (avail if avail >= constants.FLOAT_ACCURACY else 0)
+                * arcs[key].preference
+                for key, avail in remaining.items()
+            }
+            priority = sum(allocation.values())
+        return allocated
+
     def pull_distributed(self, vqip, of_type=None, tag="default"):
         """Send pull requests to all (or specified by type) nodes connecting to self.
-        Iterate until request is met or maximum iterations are hit. Streamlines if only
-        one in_arc exists.
+        Requests are allocated by the checks of connected nodes (see
+        allocate_distributed), and only if a node supplies less than its check
+        indicated (i.e., its availability depends on its state) is the allocation
+        iterated until the request is met or maximum iterations are hit. Streamlines if
+        only one in_arc exists.
 
         Args:
             vqip (dict): Total amount to pull (by default, only the
@@ -382,6 +446,25 @@ class Node(WSIObj):
             connected = self.get_connected(direction="pull", of_type=of_type, tag=tag)
             iter_ = 0
 
+            if (deficit > constants.FLOAT_ACCURACY) & (
+                connected["avail"] > constants.FLOAT_ACCURACY
+            ):
+                # Pull from connected, as allocated by their availability
+                allocated = self.allocate_distributed(deficit, connected, self.in_arcs)
+                for key, amount in allocated.items():
+                    received = self.in_arcs[key].send_pull_request(
+                        {"volume": amount}, tag=tag
+                    )
+                    pulled = self.sum_vqip(pulled, received)
+
+                # Update deficit, and connected only if the deficit was not met
+                deficit = vqip["volume"] - pulled["volume"]
+                if deficit > constants.FLOAT_ACCURACY:
+                    connected = self.get_connected(
+                        direction="pull", of_type=of_type, tag=tag
+                    )
+                iter_ += 1
+
             # Iterate over sending nodes until deficit met
             while (
                 (deficit > constants.FLOAT_ACCURACY)
@@ -408,7 +491,10 @@ class Node(WSIObj):
 
     def push_distributed(self, vqip, of_type=None, tag="default"):
         """Send push requests to all (or specified by type) nodes connecting to self.
-        Iterate until request is met or maximum iterations are hit. Streamlines if only
+        Requests are allocated by the checks of connected nodes (see
+        allocate_distributed), and only if a node accepts less than its check
+        indicated (i.e., its availability depends on its state) is the allocation
+        iterated until request is met or maximum iterations are hit. Streamlines if only
         one in_arc exists.
 
         Args:
@@ -449,6 +535,29 @@ class Node(WSIObj):
                 connected["priority"] = connected["avail"]
                 connected["allocation"] = connected["capacity"]
 
+            if (not_pushed > constants.FLOAT_ACCURACY) & (
+                connected["avail"] > constants.FLOAT_ACCURACY
+            ):
+                # Push to connected, as allocated by their availability
+                amount_to_push = min(connected["avail"], not_pushed)
+                allocated = self.allocate_distributed(
+                    amount_to_push, connected, self.out_arcs
+                )
+                for key, to_send in allocated.items():
+                    to_send = self.v_change_vqip(not_pushed_, to_send)
+                    reply = self.out_arcs[key].send_push_request(to_send, tag=tag)
+
+                    sent = self.extract_vqip(to_send, reply)
+                    not_pushed_ = self.extract_vqip(not_pushed_, sent)
+
+                # Update not_pushed, and connected only if not all was pushed
+                not_pushed = not_pushed_["volume"]
+                if not_pushed > constants.FLOAT_ACCURACY:
+                    connected = self.get_connected(
+                        direction="push", of_type=of_type, tag=tag
+                    )
+                iter_ += 1
+
             # Iterate over receiving nodes until sent
             while (
                 (not_pushed > constants.FLOAT_ACCURACY)
@@ -634,6 +743,26 @@ class Node(WSIObj):
         """
         return self.data_input_dict[(var, self.t)]
 
+    def precompute_inputs(self, dates):
+        """Prepare anything derived only from input data in advance of a run over
+        dates, so that it does not need to be recalculated at each timestep.
+        Subclasses that read data may overwrite this function.
+
+        Args:
+            dates (list): Dates that will be simulated
+        """
+        pass
+
+    def get_input_variables(self):
+        """Variables that the node reads from its data_input_dict at each timestep
+        (i.e., with `get_data_input`). Used to check input data before a run.
+        Subclasses that read data will overwrite this function.
+
+        Returns:
+            (set): Names of variables
+        """
+        return set()
+
     def end_timestep(self):
         """Empty function intended to be called at the end of every timestep.
 
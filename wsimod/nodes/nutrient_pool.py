@@ -3,10 +3,30 @@
 
 @author: barna
 """
+
 from typing import Any, Dict
 
 from wsimod.core import constants
 
+# Names of the pools of a NutrientPool (attributes are the name + '_pool')
+POOLS = [
+    "fast",
+    "humus",
+    "dissolved_inorganic",
+    "dissolved_organic",
+    "adsorbed_inorganic",
+]
+
+# Soil transformation processes, applied in this order, with the name of the
+# NutrientPool rate parameter, the pool extracted from and the pool received by
+TRANSFORMATIONS = [
+    ("degrhpar", "humus", "fast"),  # Turnover of humus
+    ("dishpar", "humus", "dissolved_organic"),  # Dissolution of humus
+    ("minfpar", "fast", "dissolved_inorganic"),  # Turnover of fast
+    ("disfpar", "fast", "dissolved_organic"),  # Dissolution of fast
+    ("immobdpar", "dissolved_inorganic", "fast"),  # Immobilisation
+]
+
 
 class NutrientPool:
     """"""
@@ -121,19 +141,13 @@ class NutrientPool:
         self.fraction_dry_n_to_fast = None
         self.calculate_fraction_parameters()
 
-        # Initialise different pools
+        # Initialise different pools (in the order of POOLS)
         self.fast_pool = NutrientStore()
         self.humus_pool = NutrientStore()
         self.dissolved_inorganic_pool = NutrientStore()
         self.dissolved_organic_pool = NutrientStore()
         self.adsorbed_inorganic_pool = NutrientStore()
-        self.pools = [
-            self.fast_pool,
-            self.humus_pool,
-            self.dissolved_inorganic_pool,
-            self.dissolved_organic_pool,
-            self.adsorbed_inorganic_pool,
-        ]
+        self.pools = [getattr(self, pool + "_pool") for pool in POOLS]
 
     def calculate_fraction_parameters(self):
         """Update fractions of nutrients input transformed into other forms in soil
@@ -403,50 +417,24 @@ class NutrientPool:
             (float): increase in dissolved organic nutrients resulting from
                 transformations (negative value indicates a decrease)
         """
-        # For mass balance purposes, assume fast is inorganic and humus is organic
-
-        # Initialise tracking
-        increase_in_dissolved_inorganic = self.get_empty_nutrient()
-        increase_in_dissolved_organic = self.get_empty_nutrient()
-
-        # Turnover of humus
-        amount = self.temp_soil_process(self.degrhpar, self.humus_pool, self.fast_pool)
-        # This is solid inorganic to solid organic... no tracking needed since solid
-        # nutrients aren't tracked in mass balance of the surface soil water tank!
-
-        # Dissolution of humus
-        amount = self.temp_soil_process(
-            self.dishpar, self.humus_pool, self.dissolved_organic_pool
-        )
-        increase_in_dissolved_organic = self.sum_nutrients(
-            increase_in_dissolved_organic, amount
-        )
-
-        # Turnover of fast
-        amount = self.temp_soil_process(
-            self.minfpar, self.fast_pool, self.dissolved_inorganic_pool
-        )
-        increase_in_dissolved_inorganic = self.sum_nutrients(
-            increase_in_dissolved_inorganic, amount
-        )
-
-        # Dissolution of fast
-        amount = self.temp_soil_process(
-            self.disfpar, self.fast_pool, self.dissolved_organic_pool
-        )
-        increase_in_dissolved_organic = self.sum_nutrients(
-            increase_in_dissolved_organic, amount
-        )
+        # For mass balance purposes, assume fast is inorganic and humus is organic.
+        # Transformations between solid pools need no tracking since solid nutrients
+        # aren't tracked in mass balance of the surface soil water tank!
+        change = {pool: self.get_empty_nutrient() for pool in POOLS}
+        for parameter, extract_pool, receive_pool in TRANSFORMATIONS:
+            amount = self.temp_soil_process(
+                getattr(self, parameter),
+                getattr(self, extract_pool + "_pool"),
+                getattr(self, receive_pool + "_pool"),
+            )
+            for nutrient in constants.NUTRIENTS:
+                change[extract_pool][nutrient] -= amount[nutrient]
+                change[receive_pool][nutrient] += amount[nutrient]
 
-        # Immobilisation
-        amount = self.temp_soil_process(
-            self.immobdpar, self.dissolved_inorganic_pool, self.fast_pool
-        )
-        increase_in_dissolved_inorganic = self.subtract_nutrients(
-            increase_in_dissolved_inorganic, amount
-        )  # TODO will a negative value affect the consequent processes in growing
+        # TODO will a negative value affect the consequent processes in growing
         # surface?
-
+        increase_in_dissolved_inorganic = change["dissolved_inorganic"]
+        increase_in_dissolved_organic = change["dissolved_organic"]
         return increase_in_dissolved_inorganic, increase_in_dissolved_organic
 
     def temp_soil_process(self, parameter, extract_pool, receive_pool):
@@ -467,17 +455,21 @@ class NutrientPool:
         """
         # Initialise nutrients
         to_extract = self.get_empty_nutrient()
+        extract = extract_pool.storage
+        receive = receive_pool.storage
         for nutrient in constants.NUTRIENTS:
-            # Calculate
-            to_extract[nutrient] = (
+            # Calculate, limited by the nutrients in the extract pool
+            amount = min(
+                extract[nutrient],
                 parameter[nutrient]
                 * self.temperature_dependence_factor
                 * self.soil_moisture_dependence_factor
-                * extract_pool.storage[nutrient]
+                * extract[nutrient],
             )
-        # Update pools
-        to_extract = extract_pool.extract(to_extract)
-        receive_pool.receive(to_extract)
+            # Update pools
+            extract[nutrient] -= amount
+            receive[nutrient] += amount
+            to_extract[nutrient] = amount
         return to_extract
 
     def get_empty_nutrient(self):
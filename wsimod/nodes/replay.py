@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Replay nodes, which replace the part of a model upstream of an arc with the flows
+recorded along that arc (see `Model.replay_boundary`)."""
+
+from wsimod.core import constants
+from wsimod.nodes.nodes import Node
+
+
+class Replay(Node):
+    """"""
+
+    def __init__(self, name, records=[]):
+        """Node that replays the VQIPs recorded entering its out_arc (see
+        `Model.run`'s `record_boundary` argument), in place of the nodes upstream of
+        that arc. Pushes are sent, and pulls are made available, at the same point in
+        the orchestration (and with the same tag) as they were recorded.
+
+        Args:
+            name (str): Node name
+            records (list, optional): List of dicts, where each dict is a VQIP entering
+                the arc, with keys 'time', 'position' (index in the model orchestration,
+                where the length of the orchestration indicates River distribution),
+                'direction' ('push' or 'pull') and 'tag', in the order they were
+                recorded. Defaults to [].
+
+        Functions intended to call in orchestration:
+            replay (called by `Model.run` at each point in the orchestration)
+
+        Key assumptions:
+            - The replaced nodes are unresponsive to changes downstream of the arc,
+                so the water that crossed the arc in a reference run is unchanged.
+            - Pushes that are not accepted (e.g., because a downstream parameter has
+                changed) and recorded pulls that are not requested leave the model.
+
+        Input data and parameter requirements:
+            - `records` of the arc, as recorded by `Model.run`.
+        """
+        # Update args
+        super().__init__(name)
+        self.replays = {}
+        for record in records:
+            vqip = {"volume": record["volume"]}
+            for pol in constants.POLLUTANTS:
+                vqip[pol] = record[pol]
+            self.replays.setdefault((record["time"], record["position"]), []).append(
+                (record["direction"], record["tag"], vqip)
+            )
+
+        # Update handlers
+        self.push_set_handler["default"] = self.push_set_deny
+        self.push_check_handler["default"] = self.push_check_deny
+        for direction, tag, _ in [x for y in self.replays.values() for x in y]:
+            if direction == "pull":
+                self.pull_set_handler[tag] = self.pull_set_replay
+                self.pull_check_handler[tag] = self.pull_check_replay
+
+        # Initialise states
+        self.pull_avail = self.empty_vqip()
+        self.replayed = self.empty_vqip()
+        self.unreplayed = self.empty_vqip()
+
+        # Mass balance
+        self.mass_balance_in.append(lambda: self.replayed)
+
+    def replay(self, position):
+        """Send the pushes, and make available the pulls, recorded at this point in
+        the orchestration of the current timestep.
+
+        Args:
+            position (int): Index in the model orchestration
+        """
+        # Recorded pulls not requested by the previous point are lost
+        self.unreplayed = self.sum_vqip(self.unreplayed, self.pull_avail)
+        self.pull_avail = self.empty_vqip()
+
+        for direction, tag, vqip in self.replays.get((self.t, position), []):
+            if direction == "pull":
+                self.pull_avail = self.sum_vqip(self.pull_avail, vqip)
+                continue
+            for arc in self.out_arcs.values():
+                reply = arc.send_push_request(vqip, tag=tag)
+                self.replayed = self.sum_vqip(
+                    self.replayed, self.extract_vqip(vqip, reply)
+                )
+                self.unreplayed = self.sum_vqip(self.unreplayed, reply)
+
+    def pull_check_replay(self, vqip=None):
+        """Respond to a pull check with the recorded pulls still available.
+
+        Args:
+            vqip (dict, optional): A VQIP that is compared with the availability and the
+                minimum is returned. Only the 'volume' key is used. Defaults to None.
+
+        Returns:
+            avail (dict): A VQIP of water available
+        """
+        avail = self.copy_vqip(self.pull_avail)
+        if vqip:
+            avail = self.v_change_vqip(avail, min(avail["volume"], vqip["volume"]))
+        return avail
+
+    def pull_set_replay(self, vqip):
+        """Give a pull request from the recorded pulls still available.
+
+        Args:
+            vqip (dict): A VQIP of water to pull. Only the 'volume' key is used.
+
+        Returns:
+            reply (dict): A VQIP of water pulled
+        """
+        reply = self.pull_check_replay(vqip)
+        self.pull_avail = self.extract_vqip(self.pull_avail, reply)
+        self.replayed = self.sum_vqip(self.replayed, reply)
+        return reply
+
+    def end_timestep(self):
+        """Reset replayed water."""
+        self.pull_avail = self.empty_vqip()
+        self.replayed = self.empty_vqip()
+        self.unreplayed = self.empty_vqip()
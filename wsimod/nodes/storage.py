@@ -9,7 +9,12 @@ from typing import Any, Dict
 
 from wsimod.core import constants
 from wsimod.nodes.nodes import Node
-from wsimod.nodes.tanks import DecayQueueTank, DecayTank, QueueTank, Tank
+from wsimod.nodes.tanks import (
+    DecayTank,
+    DecayTimeAreaTank,
+    Tank,
+    TimeAreaTank,
+)
 
 
 class Storage(Node):
@@ -151,7 +156,7 @@ class Groundwater(Storage):
         residence_time=200,
         infiltration_threshold=1,
         infiltration_pct=0,
-        data_input_dict={},
+        data_input_dict=None,
         **kwargs,
     ):
         # TODO why isn't this using a ResidenceTank?
@@ -166,7 +171,8 @@ class Groundwater(Storage):
             infiltration_pct (float, optional): Proportion of storage above the
                 threshold that is square rooted and infiltrated. Defaults to 0.
             data_input_dict (dict, optional): Dictionary of data inputs relevant for
-                the node (though I don't think it is used). Defaults to {}.
+                the node (i.e., temperature if `decays` are provided). Defaults to
+                None.
 
         Functions intended to call in orchestration:
             infiltrate (before sewers are discharged)
@@ -198,9 +204,16 @@ class Groundwater(Storage):
         self.residence_time = residence_time
         self.infiltration_threshold = infiltration_threshold
         self.infiltration_pct = infiltration_pct
-        # TODO not used data_input
-        self.data_input_dict = data_input_dict
-        super().__init__(**kwargs)
+        super().__init__(data_input_dict=data_input_dict, **kwargs)
+
+        # Outflows released on each timestep when distribute and infiltrate are called
+        # every N timesteps
+        self.multirate = {
+            "distribute": "release_baseflow",
+            "infiltrate": "release_infiltration",
+        }
+        self.baseflow = 0
+        self.infiltration = 0
 
     def apply_overrides(self, overrides=Dict[str, Any]):
         """Override parameters.
@@ -220,8 +233,34 @@ class Groundwater(Storage):
         super().apply_overrides(overrides)
 
     def distribute(self):
-        """Calculate outflow with residence time and send to Nodes or Rivers."""
+        """Calculate outflow with residence time and send to Nodes or Rivers.
+
+        When called every N timesteps (i.e., `steps` > 1), the outflow of the N
+        timesteps (as storage decreases without inflows) is released evenly over them
+        (see release_baseflow).
+        """
         avail = self.tank.get_avail()["volume"] / self.residence_time
+        if self.steps > 1:
+            self.baseflow = (
+                self.tank.get_avail()["volume"]
+                * (1 - (1 - 1 / self.residence_time) ** self.steps)
+                / self.steps
+            )
+            avail = self.baseflow
+        self.send_baseflow(avail)
+
+    def release_baseflow(self):
+        """Release the outflow calculated by the last call of distribute, on the
+        timesteps that it is not called.
+        """
+        self.send_baseflow(self.baseflow)
+
+    def send_baseflow(self, avail):
+        """Send outflow to Nodes or Rivers, which is limited by the storage.
+
+        Args:
+            avail (float): Volume to send
+        """
         to_send = self.tank.pull_storage({"volume": avail})
         retained = self.push_distributed(to_send, of_type=["Node", "River", "Waste"])
         _ = self.tank.push_storage(retained, force=True)
@@ -229,12 +268,40 @@ class Groundwater(Storage):
             print("Storage unable to push")
 
     def infiltrate(self):
-        """Calculate amount of water available for infiltration and send to sewers."""
+        """Calculate amount of water available for infiltration and send to sewers.
+
+        When called every N timesteps (i.e., `steps` > 1), the infiltration of the N
+        timesteps (as storage decreases without inflows) is released evenly over them
+        (see release_infiltration).
+        """
         # Calculate infiltration
         avail = self.tank.get_avail()["volume"]
-        avail = max(avail - self.tank.capacity * self.infiltration_threshold, 0)
+        threshold = self.tank.capacity * self.infiltration_threshold
+        if self.steps > 1:
+            self.infiltration = 0
+            for _ in range(self.steps):
+                amount = (max(avail - threshold, 0) * self.infiltration_pct) ** 0.5
+                amount = min(amount, avail)
+                avail -= amount
+                self.infiltration += amount / self.steps
+            self.send_infiltration(self.infiltration)
+            return
+        avail = max(avail - threshold, 0)
         avail = (avail * self.infiltration_pct) ** 0.5
+        self.send_infiltration(avail)
+
+    def release_infiltration(self):
+        """Release the infiltration calculated by the last call of infiltrate, on the
+        timesteps that it is not called.
+        """
+        self.send_infiltration(self.infiltration)
+
+    def send_infiltration(self, avail):
+        """Send infiltration to sewers, which is limited by the storage.
 
+        Args:
+            avail (float): Volume to send
+        """
         # Push to sewers
         to_send = self.tank.pull_storage({"volume": avail})
         retained = self.push_distributed(to_send, of_type="Sewer")
@@ -249,10 +316,11 @@ class QueueGroundwater(Storage):
     """"""
 
     # TODO - no infiltration as yet
-    def __init__(self, timearea={0: 1}, data_input_dict={}, **kwargs):
+    def __init__(self, timearea={0: 1}, data_input_dict=None, **kwargs):
         """Alternate formulation of Groundwater that uses a timearea property to enable
-        more nonlinear time behaviour of baseflow routing. Uses the QueueTank or
-        DecayQueueTank (see nodes.py/Tank subclassses).
+        more nonlinear time behaviour of baseflow routing. Uses the TimeAreaTank or
+        DecayTimeAreaTank (see nodes.py/Tank subclassses), so that the timearea
+        diagram is applied as a convolution over the array of the tank's queue.
 
         NOTE: abstraction behaviour from this kind of node need careful checking
 
@@ -263,7 +331,8 @@ class QueueGroundwater(Storage):
                 of flow. E.g., {0 : 0.7, 1 : 0.3} means 70% of flow takes 0 timesteps
                 and 30% takes 1 timesteps. Defaults to {0 : 1}.
             data_input_dict (dict, optional): Dictionary of data inputs relevant for
-                the node (though I don't think it is used). Defaults to {}.
+                the node (i.e., temperature if `decays` are provided). Defaults to
+                None.
 
         Functions intended to call in orchestration:
             distribute
@@ -287,9 +356,7 @@ class QueueGroundwater(Storage):
                 values. _Units_: -
         """
         self.timearea = timearea
-        # TODO not used
-        self.data_input_dict = data_input_dict
-        super().__init__(**kwargs)
+        super().__init__(data_input_dict=data_input_dict, **kwargs)
         # Label as Groundwater class so that other nodes treat it the same
         self.__class__.__name__ = "Groundwater"
         # Update handlers
@@ -298,14 +365,14 @@ class QueueGroundwater(Storage):
         self.pull_check_handler["default"] = self.pull_check_active
         # Enable decay
         if self.decays is None:
-            self.tank = QueueTank(
+            self.tank = TimeAreaTank(
                 capacity=self.capacity,
                 area=self.area,
                 datum=self.datum,
                 initial_storage=self.initial_storage,
             )
         else:
-            self.tank = DecayQueueTank(
+            self.tank = DecayTimeAreaTank(
                 capacity=self.capacity,
                 area=self.area,
                 datum=self.datum,
@@ -338,14 +405,8 @@ class QueueGroundwater(Storage):
         Returns:
             reply (dict): A VQIP amount that was not successfuly receivesd
         """
-        reply = self.empty_vqip()
-        # Iterate over timearea diagram TODO timearea diagram behaviour be generalised
-        # across nodes
-        for time, normalised in self.timearea.items():
-            vqip_ = self.v_change_vqip(vqip, vqip["volume"] * normalised)
-            reply_ = self.tank.push_storage(vqip_, time=time)
-            reply = self.sum_vqip(reply, reply_)
-        return reply
+        # TODO timearea diagram behaviour be generalised across nodes
+        return self.tank.push_timearea(vqip, self.timearea)
 
     def distribute(self):
         """Update internal arc, push active_storage onwards, update tank."""
@@ -402,51 +463,89 @@ class QueueGroundwater(Storage):
         if total_pull < constants.FLOAT_ACCURACY:
             return self.empty_vqip()
         else:
-            # Track total pull in pulled
-            pulled = self.empty_vqip()
-            # Iterate over queue
-            if isinstance(self.tank.internal_arc.queue, dict):
-                for t, v in self.tank.internal_arc.queue.items():
-                    # Pull proportionately
-                    t_pulled = self.v_change_vqip(
-                        self.tank.internal_arc.queue[t],
-                        v["volume"] * total_pull / total_storage,
-                    )
-                    # Reduce queue VQIPs
-                    self.tank.internal_arc.queue[t] = self.extract_vqip(
-                        self.tank.internal_arc.queue[t], t_pulled
-                    )
-                    # Track pull
-                    pulled = self.sum_vqip(pulled, t_pulled)
-                # Pull also from active storage
-                a_pulled = self.v_change_vqip(
-                    self.tank.active_storage,
-                    self.tank.active_storage["volume"] * total_pull / total_storage,
-                )
-                self.tank.active_storage = self.extract_vqip(
-                    self.tank.active_storage, a_pulled
-                )
-                pulled = self.sum_vqip(pulled, a_pulled)
+            # Pull proportionately from queue and active storage
+            return self.tank.pull_proportion(total_pull / total_storage)
+
+
+class LaggedSums:
+    """"""
+
+    def __init__(self, windows):
+        """Fixed-size ring buffer of the most recent values of a variable, which
+        maintains running sums over trailing windows so that moving averages can be
+        updated in constant time each timestep.
+
+        Args:
+            windows (list): Number of most recent values to sum over for each window
+                (non-integer windows are rounded, see `to_window`)
+
+        Examples:
+            >>> lags = LaggedSums([2, 3])
+            >>> for value in [1, 2, 3, 4]:
+            ...     lags.append(value)
+            >>> lags.get_sum(2), lags.get_sum(3)
+            (7, 9)
+        """
+        self.windows = [self.to_window(window) for window in windows]
+        self.size = max(self.windows)
+        # Unwritten values are 0 so that they can be subtracted before the buffer
+        # has filled
+        self.values = [0] * self.size
+        self.sums = {window: 0 for window in self.windows}
+        self.position = 0
+
+    @staticmethod
+    def to_window(window):
+        """Round a window to the nearest whole number of values (at least 1).
+
+        Args:
+            window (float): Window
+
+        Returns:
+            (int): Number of values in the window
+        """
+        return max(round(window), 1)
+
+    def append(self, value):
+        """Add the newest value, removing values that leave each window from its sum.
+
+        Args:
+            value (float): Value to add
+        """
+        for window in self.sums:
+            self.sums[window] += (
+                value - self.values[(self.position - window) % self.size]
+            )
+        self.values[self.position] = value
+        self.position = (self.position + 1) % self.size
+        if self.position == 0:
+            # Recalculate sums once per cycle to avoid accumulating rounding errors
+            for window in self.sums:
+                self.sums[window] = sum(self.values[self.size - window :])
+
+    def get_sum(self, window):
+        """Get the sum of the most recent values.
+
+        Args:
+            window (int): Which window to sum over
 
-                # Recalculate storage
-                self.tank.storage = self.extract_vqip(self.tank.storage, pulled)
-                return pulled
-            # elif isinstance(self.tank.internal_arc.queue, list): for req in
-            #     self.tank.internal_arc.queue: t_pulled = req['vqtip']['volume'] *
-            #         total_pull / total_storage req['vqtip'] =
-            #         self.v_change_vqip(req['vqtip'], req['vqtip']['volume'] -
-            #         t_pulled) pulled += t_pulled a_pulled =
-            #     self.tank.active_storage['volume'] * total_pull / total_storage
-            #     self.tank.active_storage =
-            #     self.v_change_vqip(self.tank.active_storage,
-            #     self.tank.active_storage['volume'] - a_pulled) pulled += a_pulled
+        Returns:
+            (float): Sum over the window
+        """
+        return self.sums[self.to_window(window)]
 
-            #     #Recalculate storage - doing this differently causes numerical errors
-            #     new_v = sum([x['vqtip']['volume'] for x in
-            #     self.tank.internal_arc.queue])+ self.tank.active_storage['volume']
-            #     self.tank.storage = self.v_change_vqip(self.tank.storage, new_v)
+    def get_mean(self, window):
+        """Get the mean of the most recent values, i.e., the sum divided by the
+        (rounded) window.
 
-            # return self.v_change_vqip(self.tank.storage, pulled)
+        Args:
+            window (int): Which window to average over
+
+        Returns:
+            (float): Mean over the window
+        """
+        window = self.to_window(window)
+        return self.sums[window] / window
 
 
 class River(Storage):
@@ -557,11 +656,11 @@ class River(Storage):
         self.muptNpar = 0.001  # [kg/m2/day] nitrogen macrophyte uptake rate
         self.muptPpar = 0.0001  # 0.01, # [kg/m2/day] phosphorus macrophyte uptake rate
 
+        # [days] windows for moving averages of temperature and total phosphorus
+        self.short_temp_lag = 10
         self.max_temp_lag = 20
-        self.lagged_temperatures = []
-
         self.max_phosphorus_lag = 365
-        self.lagged_total_phosphorus = []
+        self.init_lags()
 
         self.din_components = ["ammonia", "nitrate"]
         # TODO need a cleaner way to do this depending on whether e.g., nitrite is
@@ -635,13 +734,18 @@ class River(Storage):
                 "prodPpar",
                 "muptNpar",
                 "muptPpar",
+                "short_temp_lag",
                 "max_temp_lag",
                 "max_phosphorus_lag",
             ]
         )
 
+        lags = (self.short_temp_lag, self.max_temp_lag, self.max_phosphorus_lag)
         for param in overwrite_params.intersection(overrides.keys()):
             setattr(self, param, overrides.pop(param))
+        # Only discard the lagged variables if their windows have changed
+        if lags != (self.short_temp_lag, self.max_temp_lag, self.max_phosphorus_lag):
+            self.init_lags()
 
         if "area" in overrides.keys():
             warnings.warn(
@@ -657,6 +761,11 @@ class River(Storage):
         overrides["capacity"] = constants.UNBOUNDED_CAPACITY
         super().apply_overrides(overrides)
 
+    def init_lags(self):
+        """(Re)create the lagged temperature and total phosphorus buffers."""
+        self.lagged_temperatures = LaggedSums([self.short_temp_lag, self.max_temp_lag])
+        self.lagged_total_phosphorus = LaggedSums([self.max_phosphorus_lag])
+
     def pull_check_river(self, vqip=None):
         """Check amount of water that can be pulled from river tank and upstream.
 
@@ -750,13 +859,9 @@ class River(Storage):
         ] + (1 / self.T_wdays) * self.get_data_input("temperature")
 
         # Update lagged temperatures
-        if len(self.lagged_temperatures) > self.max_temp_lag:
-            del self.lagged_temperatures[0]
         self.lagged_temperatures.append(self.tank.storage["temperature"])
 
         # Update lagged total phosphorus
-        if len(self.lagged_total_phosphorus) > self.max_phosphorus_lag:
-            del self.lagged_total_phosphorus[0]
         total_phosphorus = (
             self.tank.storage["phosphate"] + self.tank.storage["org-phosphorus"]
         )
@@ -802,10 +907,12 @@ class River(Storage):
 
         din = self.get_din_pool()
 
-        # Calculate moving averages TODO generalise
-        temp_10_day = sum(self.lagged_temperatures[-10:]) / 10
-        temp_20_day = sum(self.lagged_temperatures[-20:]) / 20
-        total_phos_365_day = sum(self.lagged_total_phosphorus) / self.max_phosphorus_lag
+        # Calculate moving averages
+        temp_10_day = self.lagged_temperatures.get_mean(self.short_temp_lag)
+        temp_20_day = self.lagged_temperatures.get_mean(self.max_temp_lag)
+        total_phos_365_day = self.lagged_total_phosphorus.get_mean(
+            self.max_phosphorus_lag
+        )
 
         # Calculate coefficients
         tempfcn = (
@@ -914,6 +1021,16 @@ class River(Storage):
             riverrc = 1
         return riverrc
 
+    def get_input_variables(self):
+        """Temperature is read by biochemical processes (if modelled).
+
+        Returns:
+            (set): Names of variables
+        """
+        if "nitrate" in constants.POLLUTANTS:
+            return set(["temperature"])
+        return set()
+
     def calculate_discharge(self):
         """"""
         if "nitrate" in constants.POLLUTANTS:
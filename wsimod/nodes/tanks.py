@@ -2,7 +2,14 @@
 
 from typing import Any, Dict
 
-from wsimod.arcs.arcs import AltQueueArc, DecayArcAlt
+import numpy as np
+
+from wsimod.arcs.arcs import (
+    AltQueueArc,
+    ArrayQueueArc,
+    DecayArcAlt,
+    DecayArrayQueueArc,
+)
 from wsimod.core import constants
 from wsimod.core.core import DecayObj, WSIObj
 
@@ -437,6 +444,7 @@ class DecayTank(Tank, DecayObj):
             overrides (dict, optional): Dictionary of overrides. Defaults to {}.
         """
         self.decays.update(overrides.pop("decays", {}))
+        self.decay_factors = None
         super().apply_overrides(overrides)
 
     def end_timestep_decay(self):
@@ -684,6 +692,7 @@ class DecayQueueTank(QueueTank):
         )
         self.internal_arc.number_of_timesteps = self.number_of_timesteps
         self.internal_arc.decays.update(overrides.pop("decays", {}))
+        self.internal_arc.decay_factors = None
         super().apply_overrides(overrides)
 
     def _end_timestep(self):
@@ -694,3 +703,125 @@ class DecayQueueTank(QueueTank):
         self.storage = self.extract_vqip(self.storage, self.internal_arc.total_decayed)
         self.storage_ = self.copy_vqip(self.storage)
         self.internal_arc.end_timestep()
+
+
+class TimeAreaTank(QueueTank):
+    """"""
+
+    def __init__(self, **kwargs):
+        """A QueueTank whose internal_arc is an ArrayQueueArc, so that pushes can be
+        spread over a timearea diagram as a single convolution (see push_timearea), and
+        a proportion of the queue removed as a single scaling (see pull_proportion).
+
+        Args:
+            **kwargs: See QueueTank
+        """
+        super().__init__(**kwargs)
+        # Replace internal_arc with an ArrayQueueArc
+        self.internal_arc = ArrayQueueArc(
+            in_port=self, out_port=self, number_of_timesteps=self.number_of_timesteps
+        )
+
+    def push_timearea(self, vqip, timearea):
+        """Push storage into the TimeAreaTank, where it is spread over different
+        travel times according to a timearea diagram. Equivalent to calling
+        push_storage for each entry in the timearea diagram in turn.
+
+        Args:
+            vqip (dict): A VQIP of the amount to push
+            timearea (dict): Time area diagram, where the keys are the travel time
+                (in addition to number_of_timesteps property of internal_arc) and the
+                values are the proportion of vqip that takes that time
+
+        Returns:
+            reply (dict): A VQIP of water that could not be received by the tank
+        """
+        if vqip["volume"] <= 0:
+            reply = self.empty_vqip()
+            for time, normalised in timearea.items():
+                vqip_ = self.v_change_vqip(vqip, vqip["volume"] * normalised)
+                reply = self.sum_vqip(reply, self.push_storage(vqip_, time=time))
+            return reply
+
+        # Convolve vqip with timearea diagram
+        times = np.fromiter(timearea.keys(), dtype=int)
+        volumes = vqip["volume"] * np.fromiter(timearea.values(), dtype=float)
+        amounts = self.internal_arc.scale_array(
+            self.internal_arc.vqip_to_array(vqip)[None].repeat(times.size, axis=0),
+            volumes / vqip["volume"],
+        )
+
+        # Apply capacity in order of the timearea diagram, amounts too small to enter
+        # the queue are still added to storage
+        entered = volumes >= constants.FLOAT_ACCURACY
+        accepted = np.clip(
+            self.get_excess()["volume"] - (np.cumsum(volumes) - volumes), 0, volumes
+        )
+        accepted = np.where(entered, accepted, volumes)
+        proportion = np.divide(
+            accepted, volumes, out=np.ones_like(volumes), where=volumes > 0
+        )
+        not_pushed = self.internal_arc.scale_array(amounts, 1 - proportion)
+        amounts = self.internal_arc.scale_array(amounts, proportion)
+
+        # Enter queue and update storage
+        if entered.any():
+            self.internal_arc.enter_queue_array(times[entered], amounts[entered])
+            _ = self.internal_arc.update_queue(direction="push")
+        self.storage = self.sum_vqip(self.storage, self.internal_arc.sum_array(amounts))
+        return self.internal_arc.sum_array(not_pushed[entered])
+
+    def pull_proportion(self, proportion):
+        """Pull a proportion of the water in the queue and active_storage, updating
+        tank states.
+
+        Args:
+            proportion (float): Proportion to remove
+
+        Returns:
+            pulled (dict): VQIP amount that was pulled
+        """
+        # Pull from queue
+        pulled = self.internal_arc.pull_proportion(proportion)
+
+        # Pull from active storage
+        a_pulled = self.v_change_vqip(
+            self.active_storage, self.active_storage["volume"] * proportion
+        )
+        self.active_storage = self.extract_vqip(self.active_storage, a_pulled)
+        pulled = self.sum_vqip(pulled, a_pulled)
+
+        # Extract from storage
+        self.storage = self.extract_vqip(self.storage, pulled)
+        return pulled
+
+
+class DecayTimeAreaTank(DecayQueueTank, TimeAreaTank):
+    """"""
+
+    def __init__(self, decays={}, parent=None, number_of_timesteps=1, **kwargs):
+        """Adds a DecayArrayQueueArc in TimeAreaTank to enable decay to occur within
+        the internal_arc queue.
+
+        Args:
+            decays (dict): A dict of dicts containing a key for each pollutant and,
+                within that, a key for each parameter (a constant and exponent)
+            parent (object): An object that can be used to read temperature data from
+            number_of_timesteps (int, optional): Built in delay for the internal
+                queue - it is always added to the queue time, although delay can be
+                provided with pushes only. Defaults to 1.
+        """
+        super().__init__(
+            decays=decays,
+            parent=parent,
+            number_of_timesteps=number_of_timesteps,
+            **kwargs,
+        )
+        # Replace internal_arc with a DecayArrayQueueArc
+        self.internal_arc = DecayArrayQueueArc(
+            in_port=self,
+            out_port=self,
+            number_of_timesteps=number_of_timesteps,
+            parent=parent,
+            decays=decays,
+        )
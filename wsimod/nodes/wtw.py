@@ -7,6 +7,7 @@ Converted to totals on 2022-05-03
 from typing import Any, Dict
 
 from wsimod.core import constants
+from wsimod.core.core import get_temperature_factors
 from wsimod.nodes.nodes import Node
 from wsimod.nodes.tanks import Tank
 
@@ -188,9 +189,9 @@ class WTW(Node):
         for key in constants.ADDITIVE_POLLUTANTS + ["volume"]:
             if key != "volume":
                 # Temperature sensitive transform
-                temp_factor = self.process_parameters[key]["exponent"] ** (
-                    constants.DECAY_REFERENCE_TEMPERATURE - influent["temperature"]
-                )
+                temp_factor = get_temperature_factors(
+                    self.process_parameters[key]["exponent"], inverse=True
+                )[influent["temperature"]]
             else:
                 temp_factor = 1
             # Calculate discharge
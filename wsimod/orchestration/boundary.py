@@ -0,0 +1,339 @@
+"""Recording and replaying the flows that cross a boundary in a model.
+
+When only part of a model is being changed (e.g., when calibrating a WWTW or a river
+reach), the nodes upstream of it simulate the same flows in every run. A reference
+run can instead record the VQIPs entering a cut of arcs (the boundary), and later runs
+replace everything upstream of the cut with `Replay` nodes that send those VQIPs
+along the cut arcs at the same point in the orchestration:
+
+    >>> my_model.run(record_boundary=['sewer-to-wwtw'])
+    >>> my_model.replay_boundary()
+    >>> flows, tanks, _, _ = my_model.run()
+
+Records are a list of dicts (like the flows returned by `Model.run`), holding the
+arc, time, position (in the orchestration), direction, tag and VQIP (volume and
+pollutants) of each request. They are only held in memory, for runs of the same model
+object.
+
+Similarly, when only some outputs are needed, a model can be pruned to the nodes
+that can affect them (see `prune`), where the arcs leaving the pruned model end at
+`Waste` nodes. Pruning returns a new model and leaves the full model unchanged:
+
+    >>> pruned_model = my_model.prune(['my_gauge'])
+    >>> flows, tanks, _, _ = pruned_model.run()
+"""
+
+import warnings
+
+import dill as pickle
+
+from wsimod.core import constants
+from wsimod.nodes.replay import Replay
+from wsimod.nodes.waste import Waste
+
+
+class BoundaryRecorder:
+    """"""
+
+    def __init__(self, model, arcs):
+        """Record the VQIPs entering arcs, by wrapping their push and pull requests.
+
+        Args:
+            model (Model): The model
+            arcs (list): Names of arcs to record
+        """
+        self.arcs = [model.arcs[name] for name in arcs]
+        self.records = []
+        self.t = None
+        self.position = 0
+        self.originals = []
+        for arc in self.arcs:
+            for method in ["send_push_request", "send_pull_request"]:
+                self.originals.append((arc, method, arc.__dict__.get(method)))
+            arc.send_push_request = self.wrap_push(arc, arc.send_push_request)
+            arc.send_pull_request = self.wrap_pull(arc, arc.send_pull_request)
+
+    def wrap_push(self, arc, function):
+        """Wrap an arc's send_push_request to record the VQIP that was pushed.
+
+        Args:
+            arc (Arc): The arc
+            function (function): The arc's send_push_request
+
+        Returns:
+            (function): Wrapped function
+        """
+
+        def send_push_request(vqip, tag="default", **kwargs):
+            reply = function(vqip, tag=tag, **kwargs)
+            self.record(arc, "push", tag, arc.extract_vqip(vqip, reply))
+            return reply
+
+        return send_push_request
+
+    def wrap_pull(self, arc, function):
+        """Wrap an arc's send_pull_request to record the VQIP that was pulled.
+
+        Args:
+            arc (Arc): The arc
+            function (function): The arc's send_pull_request
+
+        Returns:
+            (function): Wrapped function
+        """
+
+        def send_pull_request(vqip, tag="default", **kwargs):
+            reply = function(vqip, tag=tag, **kwargs)
+            self.record(arc, "pull", tag, reply)
+            return reply
+
+        return send_pull_request
+
+    def record(self, arc, direction, tag, vqip):
+        """Store a VQIP entering an arc.
+
+        Args:
+            arc (Arc): The arc
+            direction (str): 'push' or 'pull'
+            tag (str): Tag of the request
+            vqip (dict): A VQIP that entered the arc
+        """
+        record = {
+            "arc": arc.name,
+            "time": self.t,
+            "position": self.position,
+            "direction": direction,
+            "tag": tag,
+            "volume": vqip["volume"],
+        }
+        for pol in constants.POLLUTANTS:
+            record[pol] = vqip[pol]
+        self.records.append(record)
+
+    def finish(self):
+        """Remove the wrappers from the arcs.
+
+        Returns:
+            records (list): List of dicts, where each dict is a VQIP entering an arc
+                (see `Replay`)
+        """
+        for arc, method, original in self.originals:
+            if original is None:
+                delattr(arc, method)
+            else:
+                setattr(arc, method, original)
+        return self.records
+
+
+def get_ancestors(nodes):
+    """Find nodes and every node upstream of them (i.e., that can reach them along
+    arcs).
+
+    Args:
+        nodes (list): Nodes to start from
+
+    Returns:
+        upstream (set): Names of the nodes and their ancestors
+    """
+    upstream = set()
+    to_visit = list(nodes)
+    while to_visit:
+        node = to_visit.pop()
+        if node.name in upstream:
+            continue
+        upstream.add(node.name)
+        to_visit.extend(arc.in_port for arc in node.in_arcs.values())
+    return upstream
+
+
+def is_accepting(node, visited=None):
+    """Check whether a node accepts any water pushed to it and never pulls water, so
+    that it does not influence the nodes that push to it (i.e., a River or Waste, or a
+    Node junction to such nodes along arcs without capacity).
+
+    Args:
+        node (Node): The node
+        visited (set, optional): Names of Node junctions already checked. Defaults to
+            None.
+
+    Returns:
+        (bool): True if the node accepts all water
+    """
+    type_ = node.__class__.__name__
+    if type_ in ["River", "Waste"]:
+        return True
+    if type_ != "Node":
+        return False
+    if visited is None:
+        visited = set()
+    if node.name in visited:
+        return True
+    visited.add(node.name)
+    return all(
+        (arc.capacity >= constants.UNBOUNDED_CAPACITY)
+        & is_accepting(arc.out_port, visited)
+        for arc in node.out_arcs.values()
+    )
+
+
+def remove_nodes(model, names, arcs=[]):
+    """Remove nodes from a model, along with the arcs connecting to them.
+
+    Args:
+        model (Model): The model
+        names (set): Names of nodes to remove
+        arcs (list, optional): Names of arcs connecting to the nodes to keep (which
+            must then be connected to other nodes). Defaults to [].
+    """
+    for type_, nodes in list(model.nodes_type.items()):
+        for name in names.intersection(nodes):
+            del nodes[name]
+        if not nodes:
+            del model.nodes_type[type_]
+    model.nodelist = [x for x in model.nodelist if x.name not in names]
+    model.nodes = {x.name: x for x in model.nodelist}
+    model.arcs = {
+        name: arc
+        for name, arc in model.arcs.items()
+        if ((arc.in_port.name not in names) & (arc.out_port.name not in names))
+        | (name in arcs)
+    }
+    if hasattr(model, "arclist"):
+        model.arclist = list(model.arcs.values())
+    model.river_discharge_order = [
+        x for x in model.river_discharge_order if x not in names
+    ]
+
+
+def add_nodes(model, nodes):
+    """Add instantiated nodes to a model that already contains nodes.
+
+    Args:
+        model (Model): The model
+        nodes (list): Nodes to add
+    """
+    model.nodelist += nodes
+    for node in nodes:
+        model.nodes[node.name] = node
+        model.nodes_type.setdefault(node.__class__.__name__, {})[node.name] = node
+
+
+def get_upstream(model, arcs):
+    """Find the nodes upstream of a cut of arcs, i.e., the in_ports of the arcs and
+    every node connected to them other than via the arcs.
+
+    Args:
+        model (Model): The model
+        arcs (list): Names of arcs in the cut
+
+    Returns:
+        upstream (set): Names of upstream nodes
+
+    Raises:
+        ValueError: If the arcs do not separate the upstream nodes from the rest of
+            the model
+    """
+    upstream = get_ancestors(model.arcs[name].in_port for name in arcs)
+    crossing = [
+        arc.name
+        for arc in model.arcs.values()
+        if (arc.in_port.name in upstream)
+        & ((arc.out_port.name in upstream) == (arc.name in arcs))
+    ]
+    if crossing:
+        raise ValueError(
+            "Arcs {0} do not form a boundary, the following arcs must be included in "
+            "(or removed from) it: {1}".format(arcs, crossing)
+        )
+    return upstream
+
+
+def replay_boundary(model, records, arcs=None):
+    """Replace the nodes upstream of a cut of arcs with `Replay` nodes (one per arc,
+    named '<arc>-replay') that replay the records of the arcs.
+
+    Args:
+        model (Model): The model
+        records (list): List of dicts, as recorded by `Model.run`'s record_boundary
+        arcs (list, optional): Names of arcs in the cut. Defaults to None, which uses
+            the arcs in records.
+
+    Returns:
+        upstream (set): Names of nodes that were removed
+    """
+    if arcs is None:
+        arcs = list(dict.fromkeys(record["arc"] for record in records))
+    upstream = get_upstream(model, arcs)
+    remove_nodes(model, upstream, arcs)
+
+    # Connect a Replay node to each arc
+    replays = []
+    for name in arcs:
+        arc = model.arcs[name]
+        replay = Replay(
+            name="{0}-replay".format(name),
+            records=[record for record in records if record["arc"] == name],
+        )
+        arc.in_port = replay
+        replay.out_arcs[name] = arc
+        replay.out_arcs_type[arc.out_port.__class__.__name__][name] = arc
+        replays.append(replay)
+    add_nodes(model, replays)
+    return upstream
+
+
+def prune(model, targets):
+    """Create a copy of a model that is reduced to the nodes that can affect targets,
+    i.e., the targets and the nodes upstream of them. A node that arcs leave to is
+    also kept (with the nodes upstream of it) if it may pull water through these arcs
+    or not accept all water pushed along them (i.e., a two-way coupling), until no
+    such arcs remain. Arcs leaving the reduced model are connected to `Waste` nodes
+    (one per removed node, named '<node>-pruned'). A warning is given if no nodes can
+    be removed. The model itself is not changed.
+
+    Args:
+        model (Model): The model
+        targets (list): Names of nodes or arcs (for which the in_port is used)
+
+    Returns:
+        pruned (Model): A pruned copy of the model
+    """
+    keep = get_ancestors(
+        model.arcs[name].in_port if name in model.arcs else model.nodes[name]
+        for name in targets
+    )
+    while True:
+        leaving = [
+            arc
+            for arc in model.arcs.values()
+            if (arc.in_port.name in keep) & (arc.out_port.name not in keep)
+        ]
+        coupled = [arc.out_port for arc in leaving if not is_accepting(arc.out_port)]
+        if not coupled:
+            break
+        keep.update(get_ancestors(coupled))
+
+    removed = set(model.nodes).difference(keep)
+    if not removed:
+        warnings.warn(
+            "Pruning to {0} removes no nodes, since they may all affect it".format(
+                targets
+            )
+        )
+    # Copy via pickling (as in `Model.compile_bundle`), since nodes' mass balance
+    # functions are closures, which copy.deepcopy would leave bound to the model
+    pruned = pickle.loads(pickle.dumps(model))
+    leaving = [pruned.arcs[arc.name] for arc in leaving]
+    remove_nodes(pruned, removed, [arc.name for arc in leaving])
+
+    # Connect a Waste node to each removed node that arcs leave to
+    sinks = {}
+    for arc in leaving:
+        name = arc.out_port.name
+        if name not in sinks:
+            sinks[name] = Waste(name="{0}-pruned".format(name))
+        arc.out_port = sinks[name]
+        arc.out_port.in_arcs[arc.name] = arc
+        arc.out_port.in_arcs_type[arc.in_port.__class__.__name__][arc.name] = arc
+    add_nodes(pruned, list(sinks.values()))
+    return pruned
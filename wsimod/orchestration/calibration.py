@@ -0,0 +1,160 @@
+"""Evaluating many parameter sets of a model (e.g., for calibration), where hopeless
+runs are stopped early.
+
+Each parameter set is a dict of overrides (as used by `Model.add_overrides`) that is
+applied to a fresh copy of the model, which is then simulated one timestep at a time
+(see `Model.iterate`). The objective is the sum of a cost calculated at each timestep,
+which must not be negative (e.g., squared errors to observations), so the running
+total is a lower bound on the final value. A run is stopped once this bound reaches a
+`threshold` (i.e., it cannot beat it), or once a `stop` predicate is true:
+
+    >>> def cost(model, date):
+    >>>     return (model.arcs['my_gauge'].vqip_out['volume'] - observed[date]) ** 2
+    >>>
+    >>> calibration = Calibration(address, cost, threshold=best_so_far, processes=8)
+    >>> results = calibration.run(parameter_sets)
+    >>> results[0]
+    {'objective': 1.2e7, 'aborted': True, 'time': Timestamp('2001-03-02')}
+
+Parameter sets are evaluated in parallel by worker processes, each of which loads the
+model once and copies it for every parameter set.
+"""
+
+import copy
+from multiprocessing import Pool
+
+import dill as pickle
+
+from wsimod.orchestration.model import Model
+
+# Model, objective and settings of a worker process (see initialise_worker)
+WORKER = {}
+
+
+def evaluate(model, overrides, cost, dates=None, threshold=None, stop=None):
+    """Simulate a model with overrides, stopping once its objective cannot beat the
+    threshold or the stop predicate is true.
+
+    Args:
+        model (Model): A model, which is changed by the overrides and simulation
+        overrides (dict): Overrides to apply to the model (see
+            `Model.add_overrides`)
+        cost (function): Function of the model and date, called after each timestep,
+            that returns the (non-negative) contribution of that timestep to the
+            objective
+        dates (list, optional): Dates to simulate. Defaults to None, which
+            simulates all dates that the model has data for.
+        threshold (float, optional): Objective value at which to stop the run.
+            Defaults to None.
+        stop (function, optional): Function of the model, date and running
+            objective, called after each timestep, that returns True to stop the run.
+            Defaults to None.
+
+    Returns:
+        result (dict): The objective (or lower bound on it, if aborted), whether the
+            run was aborted and the time of the last timestep simulated
+    """
+    model.add_overrides(copy.deepcopy(overrides))
+    result = {"objective": 0, "aborted": False, "time": None}
+    for date in model.iterate(dates=dates, record_all=False, verbose=False):
+        result["objective"] += cost(model, date)
+        result["time"] = date
+        if threshold is not None and result["objective"] >= threshold:
+            result["aborted"] = True
+            break
+        if stop and stop(model, date, result["objective"]):
+            result["aborted"] = True
+            break
+    return result
+
+
+def initialise_worker(address, config_name, settings):
+    """Load the model and objective of a worker process.
+
+    Args:
+        address (str): Path to the directory containing the model config
+        config_name (str): Name of the config file
+        settings (bytes): Pickled dict of the cost, dates, threshold and stop
+            arguments of `evaluate`
+    """
+    model = Model()
+    model.load(address, config_name=config_name)
+    WORKER["model"] = pickle.dumps(model)
+    WORKER["settings"] = pickle.loads(settings)
+
+
+def evaluate_worker(overrides):
+    """Evaluate a parameter set on a copy of the worker's model.
+
+    Args:
+        overrides (dict): Overrides to apply to the model
+
+    Returns:
+        result (dict): See `evaluate`
+    """
+    return evaluate(pickle.loads(WORKER["model"]), overrides, **WORKER["settings"])
+
+
+class Calibration:
+    """"""
+
+    def __init__(
+        self,
+        address,
+        cost,
+        config_name="config.yml",
+        dates=None,
+        threshold=None,
+        stop=None,
+        processes=None,
+    ):
+        """Evaluation of parameter sets of a model, with early termination of runs
+        that cannot beat a threshold.
+
+        Args:
+            address (str): Path to the directory containing the model config
+            cost (function): Function of the model and date, called after each
+                timestep, that returns the (non-negative) contribution of that
+                timestep to the objective
+            config_name (str, optional): Name of the config file. Defaults to
+                "config.yml".
+            dates (list, optional): Dates to simulate. Defaults to None, which
+                simulates all dates that the model has data for.
+            threshold (float, optional): Objective value at which runs are stopped,
+                e.g., the best value found so far. Defaults to None.
+            stop (function, optional): Function of the model, date and running
+                objective, called after each timestep, that returns True to stop a
+                run. Defaults to None.
+            processes (int, optional): Number of worker processes, where 1 evaluates
+                parameter sets in this process. Defaults to None, which uses the
+                number of CPUs.
+        """
+        self.address = address
+        self.config_name = config_name
+        self.settings = {
+            "cost": cost,
+            "dates": dates,
+            "threshold": threshold,
+            "stop": stop,
+        }
+        self.processes = processes
+
+    def run(self, parameter_sets):
+        """Evaluate parameter sets.
+
+        Args:
+            parameter_sets (list): Dicts of overrides (see `Model.add_overrides`)
+
+        Returns:
+            results (list): A dict for each parameter set (see `evaluate`)
+        """
+        initargs = (self.address, self.config_name, pickle.dumps(self.settings))
+        if self.processes == 1:
+            initialise_worker(*initargs)
+            results = [evaluate_worker(overrides) for overrides in parameter_sets]
+            WORKER.clear()
+            return results
+        with Pool(
+            self.processes, initializer=initialise_worker, initargs=initargs
+        ) as pool:
+            return pool.map(evaluate_worker, parameter_sets, chunksize=1)
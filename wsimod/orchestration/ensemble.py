@@ -0,0 +1,110 @@
+"""Simulating an ensemble of models (e.g., of the same network with different parameter
+sets) in lock-step.
+
+An `Ensemble` advances its members together, one stage of `Model.stages` at a time,
+so that, when they are enabled, a single `LandEngine` and `RiverEngine` (see
+`Model.vectorised_land` and `Model.vectorised_rivers`) calculate the surfaces and
+reaches of all members in the same arrays, rather than K copies of each engine
+being built and called. Only the work of those engines is shared: each member is
+still a separate model whose nodes, tanks and arcs hold their own (scalar) state, and
+every other node function is called once for each member, so each member's results
+are the same as from its own `Model.run`.
+
+    >>> members = []
+    >>> for parameters in parameter_sets:
+    >>>     model = Model()
+    >>>     model.load(address)
+    >>>     model.add_overrides(parameters)
+    >>>     members.append(model)
+    >>> results = Ensemble(members).run(record_arcs=['my_gauge'])
+    >>> flows, tanks, objective_results, surfaces = results[0]
+"""
+
+from tqdm import tqdm
+
+
+# TODO ensemble members still hold separate object graphs, so the interpreter overhead
+# of a member is unchanged. Holding VQIPs, tank storages, parameters and capacities
+# as length-K arrays (over an ensemble axis) is not implemented.
+class Ensemble:
+    """"""
+
+    def __init__(self, models):
+        """Members of an ensemble, which must have the same orchestration and use the
+        vectorised engines in the same way.
+
+        Args:
+            models (list): Models to simulate
+
+        Raises:
+            ValueError: If the members have different orchestrations or vectorised
+                flags
+        """
+        self.models = models
+        self.orchestration = models[0].orchestration
+        for model in models:
+            if model.orchestration != self.orchestration:
+                raise ValueError("Ensemble members must have the same orchestration")
+            if (model.vectorised_land, model.vectorised_rivers) != (
+                models[0].vectorised_land,
+                models[0].vectorised_rivers,
+            ):
+                raise ValueError(
+                    "Ensemble members must have the same vectorised_land and "
+                    "vectorised_rivers"
+                )
+
+    def run(self, dates=None, verbose=True, **kwargs):
+        """Run the members of the ensemble.
+
+        Args:
+            dates (list, optional): Dates to simulate. Defaults to None, which
+                simulates all dates that the first member has data for.
+            verbose (bool, optional): Prints updates on simulation if true.
+                Defaults to True.
+            **kwargs: Other arguments of `Model.run` (e.g., record_arcs or
+                objectives), which apply to every member
+
+        Returns:
+            results (list): A tuple of flows, tanks, objective results and surfaces
+                (as returned by `Model.run`) for each member
+        """
+        models = self.models
+        if dates is None:
+            dates = models[0].dates
+
+        # Optionally simulate all members' River nodes and pervious surfaces with
+        # shared vectorised engines, which are called by the first member
+        river_engine = None
+        if models[0].vectorised_rivers:
+            from wsimod.orchestration.river_engine import RiverEngine
+
+            river_engine = RiverEngine(models)
+
+        land_engine = None
+        if models[0].vectorised_land:
+            from wsimod.orchestration.land_engine import LandEngine
+
+            land_engine = LandEngine(models)
+
+        for i, model in enumerate(models):
+            model.start(
+                dates=dates,
+                verbose=False,
+                engines={"land": land_engine, "river": river_engine, "owner": i == 0},
+                **kwargs,
+            )
+        for _ in tqdm(dates, disable=(not verbose)):
+            # Advance every member by one stage (the date, each item of the
+            # orchestration and the rivers) before any member moves on
+            stages = [model.stages() for model in models]
+            for _ in range(len(self.orchestration) + 2):
+                for stages_ in stages:
+                    next(stages_)
+
+            # Record results
+            for stages_ in stages:
+                for _ in stages_:
+                    pass
+
+        return [model.finish() for model in models]
@@ -0,0 +1,180 @@
+"""Detecting events (e.g., combined sewer overflow spills or sewer flooding) while a
+model is run, so that flows do not need to be recorded for every timestep.
+
+Each monitor is a dict for an arc, whose flow is monitored, or a node, whose flow to
+nodes of some types is monitored (e.g., the flooding of a `Sewer`, which is pushed to
+`Land` nodes):
+
+    >>> monitors = [{'arc': 'sewer_overflow'},
+    >>>             {'node': 'my_sewer', 'of_type': ['Land'], 'name': 'flooding'}]
+    >>> my_model.run(record_events=monitors, record_all=False)
+    >>> my_model.events[0]
+    {'name': 'sewer_overflow', 'start': Timestamp('2000-01-03'),
+     'end': Timestamp('2000-01-04'), 'duration': 48, 'volume': 1520.2, 'peak': 910.1,
+     'count': 2}
+
+A timestep with a flow above the monitor's `threshold` is a spill. Spills separated by
+less than `gap` hours without spills are one event. The `count` of an event is the
+number of spills counted by the 12/24 method (a spill starts a block of `first` hours
+that counts as one spill; each following block of `block` hours containing a spill
+counts as another, until a block has no spill). Durations are in hours (where
+`timestep` is the length of a timestep), and blocks and gaps are rounded up to whole
+timesteps, so that with a daily timestep each day with a spill counts.
+"""
+
+from math import ceil
+
+from wsimod.core import constants
+
+
+class EventRecorder:
+    """"""
+
+    def __init__(
+        self,
+        model,
+        monitors,
+        threshold=constants.FLOAT_ACCURACY,
+        gap=24,
+        first=12,
+        block=24,
+        timestep=24,
+    ):
+        """Monitor arcs or nodes for events during a run.
+
+        Args:
+            model (Model): The model
+            monitors (list): Dicts with either an 'arc' (name of an arc whose flow
+                is monitored), or a 'node' and 'of_type' (name of a node and node
+                types, whose flow to nodes of those types is monitored). Monitors
+                may also have a 'name' (defaults to the arc or node name) and
+                'threshold', 'gap', 'first' and 'block' entries to override the
+                defaults.
+            threshold (float, optional): Flow above which a timestep is a spill.
+                Defaults to constants.FLOAT_ACCURACY.
+            gap (float, optional): Hours without spills that separate events.
+                Defaults to 24.
+            first (float, optional): Hours in the first block of the 12/24 method.
+                Defaults to 12.
+            block (float, optional): Hours in each later block of the 12/24 method.
+                Defaults to 24.
+            timestep (float, optional): Hours in a timestep. Defaults to 24.
+
+        Raises:
+            ValueError: If a monitor has no arc or node, or monitors no arcs (e.g., a
+                node without an 'of_type', or without arcs to nodes of those types)
+        """
+        self.timestep = timestep
+        self.events = []
+        self.index = 0
+        self.monitors = []
+        for monitor in monitors:
+            if "arc" in monitor.keys():
+                name = monitor["arc"]
+                arcs = [model.arcs[name]]
+            elif "node" in monitor.keys():
+                name = monitor["node"]
+                node = model.nodes[name]
+                arcs = [
+                    arc
+                    for type_ in monitor.get("of_type", [])
+                    for arc in node.out_arcs_type.get(type_, {}).values()
+                ]
+            else:
+                raise ValueError("Monitor {0} has no arc or node".format(monitor))
+            if not arcs:
+                raise ValueError("Monitor {0} has no arcs to monitor".format(monitor))
+            self.monitors.append(
+                {
+                    "name": monitor.get("name", name),
+                    "arcs": arcs,
+                    "threshold": monitor.get("threshold", threshold),
+                    "gap": self.to_timesteps(monitor.get("gap", gap)),
+                    "first": self.to_timesteps(monitor.get("first", first)),
+                    "block": self.to_timesteps(monitor.get("block", block)),
+                    # States of the monitor
+                    "event": None,
+                    "last_spill": None,
+                    "block_end": None,
+                    "block_spilled": False,
+                }
+            )
+
+    def to_timesteps(self, hours):
+        """Convert a duration to timesteps, rounding up.
+
+        Args:
+            hours (float): Duration in hours
+
+        Returns:
+            (int): Number of timesteps (at least 1)
+        """
+        return max(ceil(hours / self.timestep), 1)
+
+    def record(self, date):
+        """Update the events of the monitors with the flows of this timestep.
+
+        Args:
+            date (Timestamp): The date of the timestep
+        """
+        index = self.index
+        self.index += 1
+        for monitor in self.monitors:
+            # Move to the next 12/24 block, ending the sequence if the block had no
+            # spill
+            if monitor["block_end"] == index:
+                if monitor["block_spilled"]:
+                    monitor["block_spilled"] = False
+                    monitor["block_end"] = index + monitor["block"]
+                else:
+                    monitor["block_end"] = None
+
+            # End the event after a gap of timesteps without spills
+            event = monitor["event"]
+            if event and (index - monitor["last_spill"] > monitor["gap"]):
+                self.events.append(event)
+                event = monitor["event"] = None
+
+            flow = 0
+            for arc in monitor["arcs"]:
+                flow += arc.vqip_out["volume"]
+            if flow <= monitor["threshold"]:
+                continue
+
+            # Spill
+            if event is None:
+                event = monitor["event"] = {
+                    "name": monitor["name"],
+                    "start": date,
+                    "end": date,
+                    "duration": 0,
+                    "volume": 0,
+                    "peak": 0,
+                    "count": 0,
+                }
+            event["end"] = date
+            event["duration"] += self.timestep
+            event["volume"] += flow
+            event["peak"] = max(event["peak"], flow)
+            monitor["last_spill"] = index
+
+            if monitor["block_end"] is None:
+                event["count"] += 1
+                monitor["block_end"] = index + monitor["first"]
+                monitor["block_spilled"] = True
+            elif not monitor["block_spilled"]:
+                event["count"] += 1
+                monitor["block_spilled"] = True
+
+    def finish(self):
+        """End any events that are still ongoing.
+
+        Returns:
+            events (list): List of dicts, one for each event, in the order that they
+                ended
+        """
+        for monitor in self.monitors:
+            if monitor["event"]:
+                self.events.append(monitor["event"])
+                monitor["event"] = None
+        return self.events
@@ -0,0 +1,227 @@
+"""A vectorised engine for the IHACRES equations of pervious surfaces.
+
+The default orchestration runs `Land.run` one node at a time, and each
+`PerviousSurface` (including `GrowingSurface` and its subclasses) evaluates the
+IHACRES equations for itself in `PerviousSurface.ihacres`. For models with many land
+nodes, the `LandEngine` instead holds the IHACRES parameters of every pervious
+surface in arrays, and, at the start of the `Land` `run` step, calculates the
+infiltration, evaporation proportion, outflow, percolation and subsurface flow of all
+of them at once (see `PerviousSurface.calculate_ihacres_response`). Each surface then
+uses its precalculated response when `Land.run` reaches it, so that tank updates and
+routing (which differ between surface classes) are unchanged.
+
+Evaporation depends on `et0_coefficient`, which a `GrowingSurface` updates earlier in
+its inflows (see `GrowingSurface.calc_crop_cover`), and so it is left to the surface.
+Exponentials and powers are evaluated with the math library (NumPy's versions can
+differ in the last bit), so results are identical to the object-by-object
+orchestration.
+
+Surfaces whose IHACRES functions have been replaced (e.g., a `VariableAreaSurface`,
+or by `extensions.apply_patches`), or that have inflows before `ihacres` that may
+change their storage, calculate their own response as usual.
+
+The engine is opt-in, by setting `vectorised_land` on a `Model` (or in its config):
+
+    >>> my_model.vectorised_land = True
+    >>> flows, tanks, _, _ = my_model.run()
+
+An engine can also hold the surfaces of several models (i.e., the members of an
+`Ensemble`), so that their responses are calculated at once.
+"""
+
+from math import exp
+
+import numpy as np
+
+from wsimod.nodes.land import GrowingSurface, PerviousSurface, Surface
+from wsimod.orchestration.river_engine import is_handler
+
+IHACRES_PARAMETERS = [
+    "area",
+    "depth",
+    "wilting_point_m",
+    "field_capacity_m",
+    "infiltration_capacity",
+    "surface_coefficient",
+    "percolation_coefficient",
+    "subsurface_coefficient",
+    "ihacres_p",
+]
+
+IHACRES_FUNCTIONS = [
+    "ihacres",
+    "calculate_ihacres_response",
+    "get_climate",
+    "get_cmd",
+    "get_smc",
+    "get_excess",
+    "get_data_input",
+]
+
+# Inflow functions that do not change the volume of a surface's storage
+VOLUME_PRESERVING_INFLOWS = [
+    Surface.atmospheric_deposition,
+    Surface.precipitation_deposition,
+    Surface.simple_deposition,
+    GrowingSurface.calc_crop_cover,
+]
+
+
+class LandEngine:
+    """"""
+
+    def __init__(self, model):
+        """Collect the pervious surfaces of a model's Land nodes and their IHACRES
+        parameters into arrays.
+
+        Args:
+            model (Model or list): The model, whose overrides should already be
+                applied, or a list of models (i.e., the members of an ensemble)
+        """
+        models = model if isinstance(model, list) else [model]
+        self.surfaces = [
+            surface
+            for model_ in models
+            for node in model_.nodes_type.get("Land", {}).values()
+            for surface in node.surfaces
+            if self.is_compatible(surface)
+        ]
+
+        # Climate data is read once for each Land node
+        self.parents = list({id(x.parent): x.parent for x in self.surfaces}.values())
+        parent_index = {id(parent): i for i, parent in enumerate(self.parents)}
+        self.parent_index = np.array(
+            [parent_index[id(surface.parent)] for surface in self.surfaces], dtype=int
+        )
+
+        for parameter in IHACRES_PARAMETERS:
+            setattr(
+                self,
+                parameter,
+                np.array(
+                    [getattr(surface, parameter) for surface in self.surfaces],
+                    dtype=float,
+                ),
+            )
+
+    def is_compatible(self, surface):
+        """Check whether the IHACRES response of a surface can be calculated by the
+        engine.
+
+        Args:
+            surface (Surface): A surface of a Land node
+
+        Returns:
+            (bool): True if the surface is compatible
+        """
+        if not isinstance(surface, PerviousSurface):
+            return False
+        for function in IHACRES_FUNCTIONS:
+            if not is_handler(
+                getattr(surface, function), getattr(PerviousSurface, function)
+            ):
+                return False
+        if surface.ihacres not in surface.inflows:
+            return False
+        preceding = surface.inflows[: surface.inflows.index(surface.ihacres)]
+        return all(
+            any(is_handler(inflow, function) for function in VOLUME_PRESERVING_INFLOWS)
+            for inflow in preceding
+        )
+
+    def calculate_ihacres(self):
+        """Calculate the IHACRES response of all surfaces for this timestep (see
+        `PerviousSurface.calculate_ihacres_response`), and give each surface its
+        response."""
+        if not self.surfaces:
+            return
+
+        # Read data and states
+        precipitation = np.array(
+            [parent.get_data_input("precipitation") for parent in self.parents],
+            dtype=float,
+        )[self.parent_index]
+        storage = np.array(
+            [surface.storage["volume"] for surface in self.surfaces], dtype=float
+        )
+        capacity = np.array(
+            [surface.capacity for surface in self.surfaces], dtype=float
+        )
+
+        # Apply infiltration
+        infiltrated_precipitation = np.minimum(
+            precipitation, self.infiltration_capacity
+        )
+        infiltration_excess = np.maximum(precipitation - infiltrated_precipitation, 0)
+
+        # Get current moisture deficit (scaled as in Tank.get_excess)
+        excess = np.maximum(capacity - storage, 0)
+        excess = np.where(
+            storage > 0, storage * (excess / np.where(storage > 0, storage, 1)), excess
+        )
+        current_moisture_deficit_depth = excess / self.area
+
+        # IHACRES equations
+        evaporation_factor = np.minimum(
+            1,
+            list(
+                map(
+                    exp,
+                    (
+                        2
+                        * (
+                            1
+                            - current_moisture_deficit_depth
+                            / (self.depth - self.wilting_point_m)
+                        )
+                    ).tolist(),
+                )
+            ),
+        )
+        outflow = infiltrated_precipitation * (
+            1
+            - np.minimum(
+                1,
+                list(
+                    map(
+                        pow,
+                        (
+                            current_moisture_deficit_depth
+                            / (self.depth - self.field_capacity_m)
+                        ).tolist(),
+                        self.ihacres_p.tolist(),
+                    )
+                ),
+            )
+        )
+
+        # Scale to volumes and apply proportions
+        surface_runoff = outflow * self.surface_coefficient * self.area
+        percolation = (
+            outflow
+            * (1 - self.surface_coefficient)
+            * self.percolation_coefficient
+            * self.area
+        )
+        subsurface_flow = (
+            outflow
+            * (1 - self.surface_coefficient)
+            * self.subsurface_coefficient
+            * self.area
+        )
+        infiltration_excess = infiltration_excess * self.area + surface_runoff
+
+        responses = np.column_stack(
+            [
+                infiltrated_precipitation,
+                infiltration_excess,
+                evaporation_factor,
+                outflow,
+                storage / self.area,
+                percolation,
+                subsurface_flow,
+                precipitation * self.area,
+            ]
+        ).tolist()
+        for surface, response in zip(self.surfaces, responses):
+            surface.ihacres_response = response
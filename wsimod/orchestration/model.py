@@ -3,14 +3,17 @@
 
 @author: bdobson
 """
+import bisect
+import copy
 import csv
 import gzip
+import hashlib
 import importlib.util
 import inspect
 import os
 import sys
 from datetime import datetime
-from math import log10
+from math import lcm, log10
 
 import dill as pickle
 import yaml
@@ -30,13 +33,15 @@ except ImportError:
 
 from wsimod.arcs import arcs as arcs_mod
 from wsimod.core import constants
-from wsimod.core.core import WSIObj
+from wsimod.core.core import DecayObj, WSIObj
 from wsimod.nodes.land import ImperviousSurface
 from wsimod.nodes.nodes import NODES_REGISTRY
-from wsimod.nodes.tanks import QueueTank, ResidenceTank, Tank
+from wsimod.nodes.tanks import QueueTank, ResidenceTank, Tank, TimeAreaTank
 
 os.environ["USE_PYGEOS"] = "0"
 
+BUNDLE_VERSION = 1
+
 
 class to_datetime:
     """"""
@@ -186,6 +191,12 @@ class Model(WSIObj):
         self.nodes_type = {}
         self.extensions = []
         self.river_discharge_order = []
+        self.vectorised_rivers = False
+        self.vectorised_land = False
+        self.parameters = []
+        self.source_files = []
+        self.boundary = []
+        self.events = []
 
         # Default orchestration
         self.orchestration = [
@@ -213,13 +224,18 @@ class Model(WSIObj):
             init_args.extend(args)
         return init_args
 
-    def load(self, address, config_name="config.yml", overrides={}):
+    def load(
+        self, address, config_name="config.yml", overrides={}, hydrology_only=False
+    ):
         """
 
         Args:
             address:
             config_name:
             overrides:
+            hydrology_only (bool, optional): Simulate volumes only, ignoring the
+                pollutants of the config (see constants.set_no_pollutants). Can also
+                be set by 'hydrology_only' in the config. Defaults to False.
         """
         from ..extensions import apply_patches
 
@@ -239,6 +255,8 @@ class Model(WSIObj):
         constants.FLOAT_ACCURACY = float(
             data.get("float_accuracy", constants.FLOAT_ACCURACY)
         )
+        if hydrology_only or data.get("hydrology_only", False):
+            constants.set_no_pollutants()
         self.__dict__.update(Model().__dict__)
 
         """
@@ -247,11 +265,16 @@ class Model(WSIObj):
         """
         load_extension_files(data.get("extensions", []))
         self.extensions = data.get("extensions", [])
+        self.source_files = [os.path.join(address, config_name)] + self.extensions
 
         if "orchestration" in data.keys():
             # Update orchestration
             self.orchestration = data["orchestration"]
 
+        self.vectorised_rivers = data.get("vectorised_rivers", False)
+        self.vectorised_land = data.get("vectorised_land", False)
+        self.parameters = data.get("parameters", [])
+
         if "nodes" not in data.keys():
             raise ValueError("No nodes found in the config")
 
@@ -273,6 +296,11 @@ class Model(WSIObj):
 
         apply_patches(self)
 
+        # Optionally check (or fill, if "interpolate") input data before running
+        check_inputs = data.get("check_inputs", False)
+        if check_inputs and hasattr(self, "dates"):
+            self.check_inputs(interpolate=check_inputs == "interpolate")
+
     def _load_unified_data(self, address, unified_data_file, nodes, data):
         """Load model data from a unified parquet file.
 
@@ -282,32 +310,54 @@ class Model(WSIObj):
             nodes (dict): Dictionary of node configurations
             data (dict): Full configuration dictionary
         """
-        # Load unified data
+        # Only read rows for nodes (and their surfaces) that take input data
+        # A data_input_dict entry is either True (the node's/surface's own rows)
+        # or a reference to the rows of another node ([node]) or surface ([node,
+        # surface]) with identical data (see `save_unified_data`)
+        required_nodes = set()
+        for name, node in nodes.items():
+            if node.get("data_input_dict"):
+                reference = unified_data_reference(node["data_input_dict"], name)
+                required_nodes.add(reference)
+            for key, surface in node.get("surfaces", {}).items():
+                if surface.get("data_input_dict"):
+                    reference = unified_data_reference(
+                        surface["data_input_dict"], (name, key)
+                    )
+                    required_nodes.add(reference[0])
+        required_nodes = sorted(required_nodes)
+
+        # Works for a single file or a dataset partitioned by node, in which case
+        # only the partitions of the required nodes are read
         unified_data_path = os.path.join(address, unified_data_file)
-        self.unified_data = pd.read_parquet(unified_data_path)
-
-        # Create a single comprehensive data dictionary for all nodes
-        # This is much faster than individual lookups
-        surface_data = self.unified_data.dropna(subset=["surface"]).copy()
-        surface_data["time"] = pd.to_datetime(surface_data["time"]).dt.to_period("M")
-        surface_dict = (
-            surface_data.groupby(["node", "surface"])
-            .apply(lambda x: x.set_index(["variable", "time"]).value.to_dict())
-            .to_dict()
-        )
+        self.source_files.append(unified_data_path)
+        columns = ["node", "surface", "variable", "time", "value"]
+        if required_nodes:
+            self.unified_data = pd.read_parquet(
+                unified_data_path,
+                columns=columns,
+                filters=[("node", "in", required_nodes)],
+            )
+            self.unified_data["node"] = self.unified_data["node"].astype(str)
+        else:
+            self.unified_data = pd.DataFrame(columns=columns)
 
-        node_data = self.unified_data.loc[self.unified_data.surface.isna()].copy()
-        node_data["time"] = pd.to_datetime(node_data["time"])
-        node_dict = (
-            node_data.groupby("node")
-            .apply(lambda x: x.set_index(["variable", "time"]).value.to_dict())
-            .to_dict()
+        is_surface = self.unified_data.surface.notna()
+        surface_dict = build_data_input_dicts(
+            self.unified_data.loc[is_surface],
+            ["node", "surface"],
+            lambda times: pd.to_datetime(times).to_period("M"),
+        )
+        node_dict = build_data_input_dicts(
+            self.unified_data.loc[~is_surface], "node", pd.to_datetime
         )
 
         # Assign the same comprehensive data dict to all nodes that need it
         for name, node in nodes.items():
             if "data_input_dict" in node.keys() and node["data_input_dict"]:
-                node["data_input_dict"] = node_dict[name]
+                node["data_input_dict"] = node_dict[
+                    unified_data_reference(node["data_input_dict"], name)
+                ]
             if "surfaces" in node.keys():
                 for key, surface in node["surfaces"].items():
                     if (
@@ -315,9 +365,12 @@ class Model(WSIObj):
                         and surface["data_input_dict"]
                     ):
                         node["surfaces"][key]["data_input_dict"] = surface_dict[
-                            (name, key)
+                            unified_data_reference(
+                                surface["data_input_dict"], (name, key)
+                            )
                         ]
                 node["surfaces"] = list(node["surfaces"].values())
+        share_identical_data_input_dicts(nodes)
         if "dates" in data.keys():
             self.dates = pd.to_datetime(data["dates"])
 
@@ -329,21 +382,30 @@ class Model(WSIObj):
             nodes (dict): Dictionary of node configurations
             data (dict): Full configuration dictionary
         """
-        # Use individual files (original behavior)
+        # Use individual files (original behavior), reading files that are shared
+        # by several nodes/surfaces only once
+        data_files = {}
+
+        def read_data_file(filename):
+            file_path = os.path.join(address, filename)
+            if file_path not in data_files:
+                data_files[file_path] = read_csv(file_path)
+                self.source_files.append(file_path)
+            return data_files[file_path]
+
         for name, node in nodes.items():
             if "filename" in node.keys():
-                node["data_input_dict"] = read_csv(
-                    os.path.join(address, node["filename"])
-                )
+                node["data_input_dict"] = read_data_file(node["filename"])
                 del node["filename"]
             if "surfaces" in node.keys():
                 for key, surface in node["surfaces"].items():
                     if "filename" in surface.keys():
-                        node["surfaces"][key]["data_input_dict"] = read_csv(
-                            os.path.join(address, surface["filename"])
+                        node["surfaces"][key]["data_input_dict"] = read_data_file(
+                            surface["filename"]
                         )
                         del surface["filename"]
                 node["surfaces"] = list(node["surfaces"].values())
+        share_identical_data_input_dicts(nodes)
         if "dates" in data.keys():
             self.dates = [to_datetime(x) for x in data["dates"]]
 
@@ -376,6 +438,7 @@ class Model(WSIObj):
         unified_data_file=None,
         file_type="csv",
         compress=False,
+        data_input_references={},
     ):
         """Save model configuration to a YAML file.
 
@@ -386,7 +449,11 @@ class Model(WSIObj):
                 unified data
             file_type (str): File type for individual data files ("csv" or "csv.gz")
             compress (bool): Whether to compress individual files
+            data_input_references (dict, optional): Dictionary mapping node names
+                (or (node, surface) tuples) to the [node] (or [node, surface]) whose
+                rows in the unified data file contain their data. Defaults to {}.
         """
+        data_files = DataInputRegistry()
         nodes = {}
         for node in self.nodes.values():
             init_args = self.get_init_args(node.__class__)
@@ -422,8 +489,17 @@ class Model(WSIObj):
                     # Handle data input dict based on save mode
                     if "data_input_dict" in surface_args:
                         if unified_data_file and surface.data_input_dict:
-                            # Mark that data should be loaded from unified file
-                            surface_props["data_input_dict"] = True
+                            # Mark that data should be loaded from unified file,
+                            # possibly from another surface's identical data
+                            reference = data_input_references.get(
+                                (node.name, surface.surface),
+                                [node.name, surface.surface],
+                            )
+                            surface_props["data_input_dict"] = (
+                                True
+                                if reference == [node.name, surface.surface]
+                                else reference
+                            )
                         elif surface.data_input_dict:
                             # Save individual file
                             filename = (
@@ -435,13 +511,18 @@ class Model(WSIObj):
                                 .replace("/", "_")
                                 .replace(" ", "_")
                             )
-                            write_csv(
-                                surface.data_input_dict,
-                                {"node": node.name, "surface": surface.surface},
-                                os.path.join(address, filename),
-                                compress=compress,
+                            # Identical data is only written once
+                            _, shared_filename = data_files.add(
+                                surface.data_input_dict, filename
                             )
-                            surface_props["filename"] = filename
+                            if shared_filename == filename:
+                                write_csv(
+                                    surface.data_input_dict,
+                                    {"node": node.name, "surface": surface.surface},
+                                    os.path.join(address, filename),
+                                    compress=compress,
+                                )
+                            surface_props["filename"] = shared_filename
 
                     surfaces[surface_props["surface"]] = surface_props
                 node_props["surfaces"] = surfaces
@@ -449,18 +530,24 @@ class Model(WSIObj):
             # Handle node-level data input dict based on save mode
             if "data_input_dict" in init_args:
                 if unified_data_file and node.data_input_dict:
-                    # Mark that data should be loaded from unified file
-                    node_props["data_input_dict"] = True
+                    # Mark that data should be loaded from unified file, possibly
+                    # from another node's identical data
+                    reference = data_input_references.get(node.name, [node.name])
+                    node_props["data_input_dict"] = (
+                        True if reference == [node.name] else reference
+                    )
                 elif node.data_input_dict:
-                    # Save individual file
+                    # Save individual file, identical data is only written once
                     filename = "{0}-inputs.{1}".format(node.name, file_type)
-                    write_csv(
-                        node.data_input_dict,
-                        {"node": node.name},
-                        os.path.join(address, filename),
-                        compress=compress,
-                    )
-                    node_props["filename"] = filename
+                    _, shared_filename = data_files.add(node.data_input_dict, filename)
+                    if shared_filename == filename:
+                        write_csv(
+                            node.data_input_dict,
+                            {"node": node.name},
+                            os.path.join(address, filename),
+                            compress=compress,
+                        )
+                    node_props["filename"] = shared_filename
 
             nodes[node.name] = node_props
 
@@ -488,6 +575,13 @@ class Model(WSIObj):
             "river_discharge_order": self.river_discharge_order,
         }
 
+        if self.vectorised_rivers:
+            data["vectorised_rivers"] = True
+        if self.vectorised_land:
+            data["vectorised_land"] = True
+        if self.parameters:
+            data["parameters"] = self.parameters
+
         if unified_data_file:
             data["unified_data_file"] = unified_data_file
 
@@ -556,6 +650,7 @@ class Model(WSIObj):
         parquet_filename="unified_data.parquet",
         config_name="config.yml",
         compress=False,
+        partition_cols=None,
     ):
         """Save model data to a unified parquet file.
 
@@ -564,6 +659,9 @@ class Model(WSIObj):
             parquet_filename (str): Name of the parquet file
             config_name (str): Name of the config file
             compress (bool): Whether to compress (not used for parquet)
+            partition_cols (list, optional): Columns to partition the parquet
+                dataset by (e.g., ["node"]). If given, `parquet_filename` is
+                written as a directory of partitions. Defaults to None.
         """
         if not PARQUET_AVAILABLE:
             raise ImportError(
@@ -575,30 +673,52 @@ class Model(WSIObj):
             os.mkdir(address)
 
         # Collect all data from nodes and surfaces
+        # Identical data is only written once, and referenced by other nodes or
+        # surfaces
         nodes_data = {}
         surfaces_data = {}
+        references = {}
+        node_registry = DataInputRegistry()
+        surface_registry = DataInputRegistry()
 
         for node in self.nodes.values():
             if hasattr(node, "data_input_dict") and node.data_input_dict:
-                nodes_data[node.name] = node.data_input_dict
+                _, reference = node_registry.add(node.data_input_dict, [node.name])
+                references[node.name] = reference
+                if reference == [node.name]:
+                    nodes_data[node.name] = node.data_input_dict
 
             if hasattr(node, "surfaces"):
                 for surface in node.surfaces:
                     if hasattr(surface, "data_input_dict") and surface.data_input_dict:
-                        surfaces_data[(node.name, surface.surface)] = (
-                            surface.data_input_dict
+                        key = [node.name, surface.surface]
+                        _, reference = surface_registry.add(
+                            surface.data_input_dict, key
                         )
+                        references[tuple(key)] = reference
+                        if reference == key:
+                            surfaces_data[tuple(key)] = surface.data_input_dict
 
         # Create unified DataFrame
         unified_df = create_unified_dataframe(nodes_data, surfaces_data)
 
         # Save unified parquet file
         parquet_path = os.path.join(address, parquet_filename)
-        unified_df.to_parquet(parquet_path, index=False)
+        if partition_cols:
+            # Written as a directory dataset (in parallel by the parquet engine),
+            # enabling selective loading of partitions
+            unified_df.to_parquet(
+                parquet_path, index=False, partition_cols=partition_cols
+            )
+        else:
+            unified_df.to_parquet(parquet_path, index=False)
 
         # Save config file using the extracted method
         self._save_model_config(
-            address, config_name, unified_data_file=parquet_filename
+            address,
+            config_name,
+            unified_data_file=parquet_filename,
+            data_input_references=references,
         )
 
     def load_pickle(self, fid):
@@ -639,6 +759,94 @@ class Model(WSIObj):
         pickle.dump(self, file)
         return file.close()
 
+    def compile_bundle(self, fid):
+        """Save the model to a single versioned bundle file that can be loaded
+        quickly with `Model.from_bundle`.
+
+        The bundle contains the instantiated nodes and arcs (i.e., with resolved
+        parameters and overrides), the derived indexes (`nodes_type`,
+        `river_discharge_order`), the input data, the pollutant settings and a
+        fingerprint of each file that the model was loaded from. It is intended to be
+        called immediately after `load`, before the model has been run.
+
+        Args:
+            fid (str): File address to save the bundle to
+
+        Example:
+            >>> my_model = Model()
+            >>> my_model.load(model_dir, config_name = 'config.yml')
+            >>> my_model.compile_bundle('model.bundle')
+            >>>
+            >>> # Later (e.g., for each forecast run)
+            >>> my_model = Model.from_bundle('model.bundle')
+        """
+        header = {
+            "bundle_version": BUNDLE_VERSION,
+            "pollutants": constants.POLLUTANTS,
+            "additive_pollutants": constants.ADDITIVE_POLLUTANTS,
+            "non_additive_pollutants": constants.NON_ADDITIVE_POLLUTANTS,
+            "float_accuracy": constants.FLOAT_ACCURACY,
+            "extensions": self.extensions,
+            "source_files": {
+                file: fingerprint_file(file) for file in self.source_files
+            },
+        }
+
+        # The raw unified data is already contained in the data_input_dicts
+        model = copy.copy(self)
+        model.__dict__.pop("unified_data", None)
+
+        with open(fid, "wb") as file:
+            pickle.dump(header, file)
+            pickle.dump(model, file)
+
+    @classmethod
+    def from_bundle(cls, fid, check_sources=True):
+        """Load a model from a bundle file created by `Model.compile_bundle`.
+
+        Args:
+            fid (str): File address to load the bundle from
+            check_sources (bool, optional): Whether to refuse to load the bundle if
+                any of the files that the model was loaded from have changed since
+                the bundle was compiled. Defaults to True.
+
+        Raises:
+            ValueError: If the bundle was created by an incompatible version, or
+                if it is stale
+
+        Returns:
+            model (Model): The loaded model
+        """
+        with open(fid, "rb") as file:
+            header = pickle.load(file)
+            if (
+                not isinstance(header, dict)
+                or header.get("bundle_version") != BUNDLE_VERSION
+            ):
+                raise ValueError(
+                    "{0} is not a version {1} model bundle".format(fid, BUNDLE_VERSION)
+                )
+
+            if check_sources:
+                stale = [
+                    source
+                    for source, fingerprint in header["source_files"].items()
+                    if not check_fingerprint(source, fingerprint)
+                ]
+                if stale:
+                    raise ValueError(
+                        "Model bundle {0} is stale, source files have changed: "
+                        "{1}".format(fid, ", ".join(stale))
+                    )
+
+            constants.POLLUTANTS = header["pollutants"]
+            constants.ADDITIVE_POLLUTANTS = header["additive_pollutants"]
+            constants.NON_ADDITIVE_POLLUTANTS = header["non_additive_pollutants"]
+            constants.FLOAT_ACCURACY = header["float_accuracy"]
+            load_extension_files(header["extensions"])
+
+            return pickle.load(file)
+
     def add_nodes(self, nodelist):
         """Add nodes to the model object from a list of dicts, where each dict contains
         all of the parameters for a node. Intended to be called before add_arcs.
@@ -851,6 +1059,119 @@ class Model(WSIObj):
             "mass_balance": False,
         }
 
+    def check_inputs(self, dates=None, interpolate=False):
+        """Check that all input data that will be read during a run exists, before
+        running. Variables are identified by each node's (and surface's)
+        `get_input_variables` (and `get_surface_input_variables`), and by the
+        `get_decay_input_variables` of decaying tanks and arcs (which read from
+        their node or in_port), and all gaps are reported at once.
+
+        Args:
+            dates (list, optional): Dates to check. Defaults to None (i.e., the
+                model's dates).
+            interpolate (bool, optional): Whether to fill gaps by linear
+                interpolation in time between the available data of a variable (gaps
+                before/after the available data take the first/last value). Filled
+                data is assigned as a new data_input_dict, and the original (which
+                may be shared with other nodes) is left unchanged. Defaults to False.
+
+        Raises:
+            ValueError: If there are gaps and interpolate is False, or if a variable
+                has no data at all
+
+        Returns:
+            gaps (dict): Dictionary mapping node names (or (node, surface) tuples) to
+                dictionaries mapping variables to a list of missing times (filled if
+                interpolate is True). Empty if no data is missing.
+
+        Example:
+            >>> my_model.load(model_dir, config_name = 'config.yml')
+            >>> my_model.check_inputs(dates = my_model.dates, interpolate = True)
+        """
+        if dates is None:
+            dates = self.dates
+        monthyears = list(set(date.to_period("M") for date in dates))
+
+        # Tanks (including surfaces), the internal arcs of queue tanks, and arcs that
+        # decay read temperature from the data_input_dict of their node (or in_port)
+        decay_objects = list(self.arcs.values())
+        for node in self.nodes.values():
+            for obj in list(vars(node).values()) + getattr(node, "surfaces", []):
+                decay_objects.append(obj)
+                if isinstance(obj, Tank) and hasattr(obj, "internal_arc"):
+                    decay_objects.append(obj.internal_arc)
+        decay_variables = {}
+        for obj in decay_objects:
+            if isinstance(obj, DecayObj) and hasattr(obj, "data_input_object"):
+                decay_variables.setdefault(obj.data_input_object.name, set()).update(
+                    obj.get_decay_input_variables()
+                )
+
+        gaps = {}
+        # Filled copies of data_input_dicts, so that objects that shared data before
+        # interpolation (and have the same gaps) still share it afterwards
+        filled = {}
+        for node in self.nodes.values():
+            inputs = [
+                (
+                    node,
+                    node.name,
+                    node.get_input_variables().union(
+                        decay_variables.get(node.name, set())
+                    ),
+                    getattr(node, "data_input_dict", None),
+                    dates,
+                )
+            ]
+            for surface in getattr(node, "surfaces", []):
+                inputs.append(
+                    (
+                        surface,
+                        (node.name, surface.surface),
+                        surface.get_surface_input_variables(),
+                        surface.data_input_dict,
+                        monthyears,
+                    )
+                )
+            for obj, key, variables, data_input_dict, times in inputs:
+                if not variables:
+                    continue
+                missing = set(
+                    (variable, time) for variable in variables for time in times
+                ).difference(data_input_dict or {})
+                for variable, time in missing:
+                    gaps.setdefault(key, {}).setdefault(variable, []).append(time)
+                if missing and interpolate:
+                    if not data_input_dict:
+                        raise ValueError(
+                            "No input data to interpolate for {0}".format(key)
+                        )
+                    reference = (id(data_input_dict), frozenset(missing))
+                    if reference not in filled:
+                        # Keep the original, so that its id is not reused
+                        filled[reference] = (
+                            data_input_dict,
+                            interpolate_data_input(data_input_dict, gaps[key]),
+                        )
+                    obj.data_input_dict = filled[reference][1]
+
+        for variables in gaps.values():
+            for missing_times in variables.values():
+                missing_times.sort(key=time_to_number)
+
+        if gaps and not interpolate:
+            message = ["Input data is missing:"]
+            for key, variables in gaps.items():
+                for variable, missing_times in variables.items():
+                    message.append(
+                        "{0} - {1}: {2} times, first {3}".format(
+                            key, variable, len(missing_times), missing_times[0]
+                        )
+                    )
+            raise ValueError("\n".join(message))
+
+        return gaps
+
     def change_runoff_coefficient(self, relative_change, nodes=None):
         """Clunky way to change the runoff coefficient of a land node.
 
@@ -900,6 +1221,8 @@ class Model(WSIObj):
         verbose=True,
         record_all=True,
         objectives=[],
+        record_boundary=None,
+        record_events=None,
     ):
         """Run the model object with the default orchestration.
 
@@ -920,6 +1243,12 @@ class Model(WSIObj):
                 Defaults to True.
             objectives (list, optional): A list of dicts with objectives to
                 calculate (see examples). Defaults to [].
+            record_boundary (list, optional): List of arcs to record the VQIPs
+                entering, which are stored in self.boundary for replay_boundary.
+                Defaults to None.
+            record_events (list, optional): List of dicts of arcs or nodes to detect
+                events (e.g., CSO spills or sewer flooding) of, which are stored in
+                self.events (see wsimod/orchestration/events.py). Defaults to None.
 
         Returns:
             flows: simulated flows in a list of dicts
@@ -940,7 +1269,70 @@ class Model(WSIObj):
                            ['my_reservoir'].tank.capacity / 2) for y in x])
                            }]
             _, _, results, _ = my_model.run(record_all = False, objectives = objectives)
+
+            # Record the flows from sewers into a WWTW, and replay them in later runs
+            my_model.run(record_boundary = ['foul_to_wwtw'])
+            my_model.replay_boundary()
+
+            # Simulate only the nodes that can affect a gauge (note, this removes the
+            # other nodes from the model)
+            my_model.prune(['my_gauge'])
+            my_model.run()
+
+            # Count the spills of a CSO without recording flows
+            my_model.run(record_all = False,
+                         record_events = [{'arc' : 'sewer_overflow'}])
+            sum(event['count'] for event in my_model.events)
+        """
+        self.start(
+            dates=dates,
+            settings=settings,
+            record_arcs=record_arcs,
+            record_tanks=record_tanks,
+            record_surfaces=record_surfaces,
+            verbose=verbose,
+            record_all=record_all,
+            objectives=objectives,
+            record_boundary=record_boundary,
+            record_events=record_events,
+        )
+        while self.step() is not None:
+            pass
+        return self.finish()
+
+    def start(
+        self,
+        dates=None,
+        settings=None,
+        record_arcs=None,
+        record_tanks=None,
+        record_surfaces=None,
+        verbose=True,
+        record_all=True,
+        objectives=[],
+        record_boundary=None,
+        record_events=None,
+        engines=None,
+    ):
+        """Prepare a simulation that is advanced one timestep at a time with step,
+        and completed with finish (run does all three). Takes the same arguments as
+        run, and:
+
+        Args:
+            engines (dict, optional): The 'land' and 'river' vectorised engines shared
+                by the members of an ensemble (see ensemble.py), and whether this
+                member is the 'owner' that calls them. Defaults to None, which creates
+                engines for this model if it is vectorised.
+
+        Examples:
+            # Couple the model with another model in lock-step, without recording
+            my_model.start(record_all = False, verbose = False)
+            while my_model.step() is not None:
+                other_model.set_inflow(my_model.arcs['river-to-outlet'].vqip_out)
+            my_model.finish()
         """
+        schedules = compile_schedules(self.orchestration, self.nodes_type)
+
         if record_arcs is None:
             record_arcs = []
             if record_all:
@@ -954,28 +1346,50 @@ class Model(WSIObj):
         if settings is None:
             settings = self.default_settings()
 
-        def blockPrint():
-            """
+        # Prints are blocked during start, step and finish if not verbose
+        devnull = None
+        if not verbose:
+            devnull = open(os.devnull, "w")
+            stdout = sys.stdout
+            sys.stdout = devnull
+        if dates is None:
+            dates = self.dates
 
-            Returns:
+        # Prepare input data that does not depend on model state
+        for node in self.nodelist:
+            node.precompute_inputs(dates)
 
-            """
-            stdout = sys.stdout
-            sys.stdout = open(os.devnull, "w")
-            return stdout
+        # Optionally record VQIPs entering arcs at a boundary
+        recorder = None
+        if record_boundary:
+            from wsimod.orchestration.boundary import BoundaryRecorder
 
-        def enablePrint(stdout):
-            """
+            recorder = BoundaryRecorder(self, record_boundary)
 
-            Args:
-                stdout:
-            """
-            sys.stdout = stdout
+        # Optionally detect events (e.g., CSO spills) as the model is run
+        events = None
+        if record_events:
+            from wsimod.orchestration.events import EventRecorder
 
-        if not verbose:
-            stdout = blockPrint()
-        if dates is None:
-            dates = self.dates
+            events = EventRecorder(self, record_events)
+
+        # Optionally simulate River nodes with the vectorised engine
+        river_engine = None
+        if engines:
+            river_engine = engines["river"]
+        elif self.vectorised_rivers:
+            from wsimod.orchestration.river_engine import RiverEngine
+
+            river_engine = RiverEngine(self)
+
+        # Optionally calculate IHACRES for pervious surfaces with the vectorised engine
+        land_engine = None
+        if engines:
+            land_engine = engines["land"]
+        elif self.vectorised_land:
+            from wsimod.orchestration.land_engine import LandEngine
+
+            land_engine = LandEngine(self)
 
         for objective in objectives:
             if objective["element_type"] == "tanks":
@@ -987,193 +1401,368 @@ class Model(WSIObj):
             else:
                 print("element_type not recorded")
 
-        flows = []
-        tanks = []
-        surfaces = []
-        for date in tqdm(dates, disable=(not verbose)):
-            # for date in dates:
-            for node in self.nodelist:
-                node.t = date
-                node.monthyear = date.to_period("M")
-
-            # Iterate over orchestration
-            for timestep_item in self.orchestration:
-                for node_type, function in timestep_item.items():
+        self.simulation = {
+            "dates": iter(dates),
+            "progress": tqdm(total=len(dates), disable=(not verbose)),
+            "devnull": devnull,
+            "record_arcs": record_arcs,
+            "record_tanks": record_tanks,
+            "record_surfaces": record_surfaces,
+            "record_all": record_all,
+            "objectives": objectives,
+            "recorder": recorder,
+            "events": events,
+            "replays": list(self.nodes_type.get("Replay", {}).values()),
+            "schedules": schedules,
+            "index": 0,
+            "river_engine": river_engine,
+            "land_engine": land_engine,
+            "owner": engines["owner"] if engines else True,
+            "flows": [],
+            "tanks": [],
+            "surfaces": [],
+            "ended": True,
+        }
+        if devnull:
+            sys.stdout = stdout
+
+    def step(self):
+        """Simulate the next timestep of a simulation prepared by start.
+
+        The nodes and arcs hold the states and flows of this timestep until the next
+        call of step (or finish), when their end_timestep functions are called, so that
+        they can be inspected (or changed) between timesteps.
+
+        Returns:
+            date (Timestamp): The date simulated, or None if all dates have been
+                simulated
+        """
+        stages = self.stages()
+        date = next(stages)
+        for _ in stages:
+            pass
+        return date
+
+    def stages(self):
+        """Simulate the next timestep of a simulation prepared by start, pausing after
+        each item of the orchestration and after the rivers are distributed, so that
+        the members of an ensemble can be advanced in lock-step (see ensemble.py). The
+        timestep is complete (i.e., results are recorded) once the generator is
+        exhausted.
+
+        Yields:
+            date (Timestamp): The date simulated (or None if all dates have been
+                simulated), then the position of each stage completed
+        """
+        simulation = self.simulation
+        devnull = simulation["devnull"]
+        stdout = sys.stdout
+        if devnull:
+            sys.stdout = devnull
+
+        if not simulation["ended"]:
+            for node in self.nodes.values():
+                node.end_timestep()
+
+            for arc in self.arcs.values():
+                arc.end_timestep()
+            simulation["ended"] = True
+
+        date = next(simulation["dates"], None)
+        if devnull:
+            sys.stdout = stdout
+        yield date
+        if date is None:
+            return
+        if devnull:
+            sys.stdout = devnull
+
+        recorder = simulation["recorder"]
+        replays = simulation["replays"]
+        river_engine = simulation["river_engine"]
+        land_engine = simulation["land_engine"]
+        owner = simulation["owner"]
+        record_arcs = simulation["record_arcs"]
+        record_tanks = simulation["record_tanks"]
+        record_surfaces = simulation["record_surfaces"]
+        record_all = simulation["record_all"]
+        flows = simulation["flows"]
+        tanks = simulation["tanks"]
+        surfaces = simulation["surfaces"]
+        schedules = simulation["schedules"]
+        schedule = schedules[simulation["index"] % len(schedules)]
+        simulation["index"] += 1
+
+        monthyear = date.to_period("M")
+        for node in self.nodelist:
+            node.t = date
+            node.monthyear = monthyear
+        if recorder:
+            recorder.t = date
+
+        # Iterate over orchestration, skipping items that are not due
+        for position, timestep_item in enumerate(schedule):
+            if recorder:
+                recorder.position = position
+            for node in replays:
+                node.replay(position)
+            for node_type, function, steps in timestep_item:
+                if river_engine and (node_type, function) == (
+                    "River",
+                    "calculate_discharge",
+                ):
+                    if owner:
+                        river_engine.calculate_discharge()
+                    continue
+                if land_engine and owner and (node_type, function) == ("Land", "run"):
+                    land_engine.calculate_ihacres()
+                if steps == 1:
                     for node in self.nodes_type.get(node_type, {}).values():
                         getattr(node, function)()
-
-            # river
+                    continue
+                if steps == 0:
+                    # Between calls of a function called every N timesteps
+                    for node in self.nodes_type.get(node_type, {}).values():
+                        getattr(node, node.multirate[function])()
+                    continue
+                for node in self.nodes_type.get(node_type, {}).values():
+                    node.steps = steps
+                    getattr(node, function)()
+                    node.steps = 1
+            if devnull:
+                sys.stdout = stdout
+            yield position
+            if devnull:
+                sys.stdout = devnull
+
+        # river
+        if recorder:
+            recorder.position = len(self.orchestration)
+        for node in replays:
+            node.replay(len(self.orchestration))
+        if river_engine:
+            if owner:
+                river_engine.distribute()
+        else:
             for node_name in self.river_discharge_order:
                 self.nodes[node_name].distribute()
+        if devnull:
+            sys.stdout = stdout
+        yield len(self.orchestration)
+        if devnull:
+            sys.stdout = devnull
 
-            # mass balance checking
-            # nodes/system
-            sys_in = self.empty_vqip()
-            sys_out = self.empty_vqip()
-            sys_ds = self.empty_vqip()
+        # mass balance checking
+        # nodes/system
+        sys_in = self.empty_vqip()
+        sys_out = self.empty_vqip()
+        sys_ds = self.empty_vqip()
 
-            # arcs
-            for arc in self.arcs.values():
-                in_, ds_, out_ = arc.arc_mass_balance()
-                for v in constants.ADDITIVE_POLLUTANTS + ["volume"]:
-                    sys_in[v] += in_[v]
-                    sys_out[v] += out_[v]
-                    sys_ds[v] += ds_[v]
-            for node in self.nodelist:
-                # print(node.name)
-                in_, ds_, out_ = node.node_mass_balance()
-
-                # temp = {'name' : node.name,
-                #         'time' : date}
-                # for lab, dict_ in zip(['in','ds','out'], [in_, ds_, out_]):
-                #     for key, value in dict_.items():
-                #         temp[(lab, key)] = value
-                # node_mb.append(temp)
-
-                for v in constants.ADDITIVE_POLLUTANTS + ["volume"]:
-                    sys_in[v] += in_[v]
-                    sys_out[v] += out_[v]
-                    sys_ds[v] += ds_[v]
+        # arcs
+        for arc in self.arcs.values():
+            in_, ds_, out_ = arc.arc_mass_balance()
+            for v in constants.ADDITIVE_POLLUTANTS + ["volume"]:
+                sys_in[v] += in_[v]
+                sys_out[v] += out_[v]
+                sys_ds[v] += ds_[v]
+        for node in self.nodelist:
+            # print(node.name)
+            in_, ds_, out_ = node.node_mass_balance()
+
+            # temp = {'name' : node.name,
+            #         'time' : date}
+            # for lab, dict_ in zip(['in','ds','out'], [in_, ds_, out_]):
+            #     for key, value in dict_.items():
+            #         temp[(lab, key)] = value
+            # node_mb.append(temp)
 
             for v in constants.ADDITIVE_POLLUTANTS + ["volume"]:
-                # Find the largest value of in_, out_, ds_
-                largest = max(sys_in[v], sys_in[v], sys_in[v])
-
-                if largest > constants.FLOAT_ACCURACY:
-                    # Convert perform comparison in a magnitude to match the largest
-                    # value
-                    magnitude = 10 ** int(log10(largest))
-                    in_10 = sys_in[v] / magnitude
-                    out_10 = sys_in[v] / magnitude
-                    ds_10 = sys_in[v] / magnitude
-                else:
-                    in_10 = sys_in[v]
-                    ds_10 = sys_in[v]
-                    out_10 = sys_in[v]
-
-                if (in_10 - ds_10 - out_10) > constants.FLOAT_ACCURACY:
-                    print(
-                        "system mass balance error for "
-                        + v
-                        + " of "
-                        + str(sys_in[v] - sys_ds[v] - sys_out[v])
-                    )
+                sys_in[v] += in_[v]
+                sys_out[v] += out_[v]
+                sys_ds[v] += ds_[v]
+
+        for v in constants.ADDITIVE_POLLUTANTS + ["volume"]:
+            # Find the largest value of in_, out_, ds_
+            largest = max(sys_in[v], sys_in[v], sys_in[v])
+
+            if largest > constants.FLOAT_ACCURACY:
+                # Convert perform comparison in a magnitude to match the largest
+                # value
+                magnitude = 10 ** int(log10(largest))
+                in_10 = sys_in[v] / magnitude
+                out_10 = sys_in[v] / magnitude
+                ds_10 = sys_in[v] / magnitude
+            else:
+                in_10 = sys_in[v]
+                ds_10 = sys_in[v]
+                out_10 = sys_in[v]
+
+            if (in_10 - ds_10 - out_10) > constants.FLOAT_ACCURACY:
+                print(
+                    "system mass balance error for "
+                    + v
+                    + " of "
+                    + str(sys_in[v] - sys_ds[v] - sys_out[v])
+                )
+
+        # Store results
+        if simulation["events"]:
+            simulation["events"].record(date)
+
+        for arc in record_arcs:
+            arc = self.arcs[arc]
+            flows.append(
+                {"arc": arc.name, "flow": arc.vqip_out["volume"], "time": date}
+            )
+            for pol in constants.POLLUTANTS:
+                flows[-1][pol] = arc.vqip_out[pol]
+
+        for node in record_tanks:
+            node = self.nodes[node]
+            tanks.append(
+                {
+                    "node": node.name,
+                    "storage": node.tank.storage["volume"],
+                    "time": date,
+                }
+            )
 
-            # Store results
-            for arc in record_arcs:
-                arc = self.arcs[arc]
-                flows.append(
-                    {"arc": arc.name, "flow": arc.vqip_out["volume"], "time": date}
+        for node, surface in record_surfaces:
+            node = self.nodes[node]
+            name = node.name
+            surface = node.get_surface(surface)
+            if not isinstance(surface, ImperviousSurface):
+                surfaces.append(
+                    {
+                        "node": name,
+                        "surface": surface.surface,
+                        "percolation": surface.percolation["volume"],
+                        "subsurface_r": surface.subsurface_flow["volume"],
+                        "surface_r": surface.infiltration_excess["volume"],
+                        "storage": surface.storage["volume"],
+                        "evaporation": surface.evaporation["volume"],
+                        "precipitation": surface.precipitation["volume"],
+                        "tank_recharge": surface.tank_recharge,
+                        "capacity": surface.capacity,
+                        "time": date,
+                        "et0_coef": surface.et0_coefficient,
+                        # 'crop_factor' : surface.crop_factor
+                    }
                 )
                 for pol in constants.POLLUTANTS:
-                    flows[-1][pol] = arc.vqip_out[pol]
-
-            for node in record_tanks:
-                node = self.nodes[node]
-                tanks.append(
+                    surfaces[-1][pol] = surface.storage[pol]
+            else:
+                surfaces.append(
                     {
-                        "node": node.name,
-                        "storage": node.tank.storage["volume"],
+                        "node": name,
+                        "surface": surface.surface,
+                        "storage": surface.storage["volume"],
+                        "evaporation": surface.evaporation["volume"],
+                        "precipitation": surface.precipitation["volume"],
+                        "capacity": surface.capacity,
                         "time": date,
                     }
                 )
+                for pol in constants.POLLUTANTS:
+                    surfaces[-1][pol] = surface.storage[pol]
+        if record_all:
+            for node in self.nodes.values():
+                for prop_ in dir(node):
+                    prop = node.__getattribute__(prop_)
+                    if prop.__class__ in [
+                        QueueTank,
+                        Tank,
+                        ResidenceTank,
+                        TimeAreaTank,
+                    ]:
+                        tanks.append(
+                            {
+                                "node": node.name,
+                                "time": date,
+                                "storage": prop.storage["volume"],
+                                "prop": prop_,
+                            }
+                        )
+                        for pol in constants.POLLUTANTS:
+                            tanks[-1][pol] = prop.storage[pol]
 
-            for node, surface in record_surfaces:
-                node = self.nodes[node]
-                name = node.name
-                surface = node.get_surface(surface)
-                if not isinstance(surface, ImperviousSurface):
-                    surfaces.append(
-                        {
-                            "node": name,
-                            "surface": surface.surface,
-                            "percolation": surface.percolation["volume"],
-                            "subsurface_r": surface.subsurface_flow["volume"],
-                            "surface_r": surface.infiltration_excess["volume"],
-                            "storage": surface.storage["volume"],
-                            "evaporation": surface.evaporation["volume"],
-                            "precipitation": surface.precipitation["volume"],
-                            "tank_recharge": surface.tank_recharge,
-                            "capacity": surface.capacity,
-                            "time": date,
-                            "et0_coef": surface.et0_coefficient,
-                            # 'crop_factor' : surface.crop_factor
-                        }
-                    )
-                    for pol in constants.POLLUTANTS:
-                        surfaces[-1][pol] = surface.storage[pol]
-                else:
-                    surfaces.append(
-                        {
-                            "node": name,
-                            "surface": surface.surface,
-                            "storage": surface.storage["volume"],
-                            "evaporation": surface.evaporation["volume"],
-                            "precipitation": surface.precipitation["volume"],
-                            "capacity": surface.capacity,
-                            "time": date,
-                        }
-                    )
-                    for pol in constants.POLLUTANTS:
-                        surfaces[-1][pol] = surface.storage[pol]
-            if record_all:
-                for node in self.nodes.values():
-                    for prop_ in dir(node):
-                        prop = node.__getattribute__(prop_)
-                        if prop.__class__ in [QueueTank, Tank, ResidenceTank]:
-                            tanks.append(
-                                {
-                                    "node": node.name,
-                                    "time": date,
-                                    "storage": prop.storage["volume"],
-                                    "prop": prop_,
-                                }
-                            )
-                            for pol in constants.POLLUTANTS:
-                                tanks[-1][pol] = prop.storage[pol]
-
-                for name, node in self.nodes_type.get("Land", {}).items():
-                    for surface in node.surfaces:
-                        if not isinstance(surface, ImperviousSurface):
-                            surfaces.append(
-                                {
-                                    "node": name,
-                                    "surface": surface.surface,
-                                    "percolation": surface.percolation["volume"],
-                                    "subsurface_r": surface.subsurface_flow["volume"],
-                                    "surface_r": surface.infiltration_excess["volume"],
-                                    "storage": surface.storage["volume"],
-                                    "evaporation": surface.evaporation["volume"],
-                                    "precipitation": surface.precipitation["volume"],
-                                    "tank_recharge": surface.tank_recharge,
-                                    "capacity": surface.capacity,
-                                    "time": date,
-                                    "et0_coef": surface.et0_coefficient,
-                                    # 'crop_factor' : surface.crop_factor
-                                }
-                            )
-                            for pol in constants.POLLUTANTS:
-                                surfaces[-1][pol] = surface.storage[pol]
-                        else:
-                            surfaces.append(
-                                {
-                                    "node": name,
-                                    "surface": surface.surface,
-                                    "storage": surface.storage["volume"],
-                                    "evaporation": surface.evaporation["volume"],
-                                    "precipitation": surface.precipitation["volume"],
-                                    "capacity": surface.capacity,
-                                    "time": date,
-                                }
-                            )
-                            for pol in constants.POLLUTANTS:
-                                surfaces[-1][pol] = surface.storage[pol]
+            for name, node in self.nodes_type.get("Land", {}).items():
+                for surface in node.surfaces:
+                    if not isinstance(surface, ImperviousSurface):
+                        surfaces.append(
+                            {
+                                "node": name,
+                                "surface": surface.surface,
+                                "percolation": surface.percolation["volume"],
+                                "subsurface_r": surface.subsurface_flow["volume"],
+                                "surface_r": surface.infiltration_excess["volume"],
+                                "storage": surface.storage["volume"],
+                                "evaporation": surface.evaporation["volume"],
+                                "precipitation": surface.precipitation["volume"],
+                                "tank_recharge": surface.tank_recharge,
+                                "capacity": surface.capacity,
+                                "time": date,
+                                "et0_coef": surface.et0_coefficient,
+                                # 'crop_factor' : surface.crop_factor
+                            }
+                        )
+                        for pol in constants.POLLUTANTS:
+                            surfaces[-1][pol] = surface.storage[pol]
+                    else:
+                        surfaces.append(
+                            {
+                                "node": name,
+                                "surface": surface.surface,
+                                "storage": surface.storage["volume"],
+                                "evaporation": surface.evaporation["volume"],
+                                "precipitation": surface.precipitation["volume"],
+                                "capacity": surface.capacity,
+                                "time": date,
+                            }
+                        )
+                        for pol in constants.POLLUTANTS:
+                            surfaces[-1][pol] = surface.storage[pol]
+
+        simulation["ended"] = False
+        simulation["progress"].update()
+        if devnull:
+            sys.stdout = stdout
+
+    def finish(self):
+        """Complete a simulation prepared by start, without simulating any remaining
+        dates.
 
+        Returns:
+            flows: simulated flows in a list of dicts
+            tanks: simulated tanks storages in a list of dicts
+            objective_results: list of values based on objectives list
+            surfaces: simulated surface storages of land nodes in a list of dicts
+        """
+        simulation = self.simulation
+        devnull = simulation["devnull"]
+        if devnull:
+            stdout = sys.stdout
+            sys.stdout = devnull
+
+        if not simulation["ended"]:
             for node in self.nodes.values():
                 node.end_timestep()
 
             for arc in self.arcs.values():
                 arc.end_timestep()
+            simulation["ended"] = True
+        simulation["progress"].close()
+
+        if simulation["recorder"]:
+            self.boundary = simulation["recorder"].finish()
+
+        if simulation["events"]:
+            self.events = simulation["events"].finish()
+
+        objectives = simulation["objectives"]
+        flows = simulation["flows"]
+        tanks = simulation["tanks"]
+        surfaces = simulation["surfaces"]
         objective_results = []
         for objective in objectives:
             if objective["element_type"] == "tanks":
@@ -1195,10 +1784,83 @@ class Model(WSIObj):
                     self,
                 )
             objective_results.append(val)
-        if not verbose:
-            enablePrint(stdout)
+        if devnull:
+            sys.stdout = stdout
+            devnull.close()
         return flows, tanks, objective_results, surfaces
 
+    def iterate(self, **kwargs):
+        """Simulate a model one timestep at a time, as a generator (see start, step and
+        finish).
+
+        Args:
+            **kwargs: Arguments of start (and run)
+
+        Yields:
+            date (Timestamp): The date simulated, where the model's nodes and arcs hold
+                the states and flows of that date until the next iteration
+
+        Examples:
+            # Stop a simulation once a reservoir is empty
+            for date in my_model.iterate(record_all = False):
+                if my_model.nodes['my_reservoir'].tank.storage['volume'] == 0:
+                    break
+        """
+        self.start(**kwargs)
+        try:
+            while True:
+                date = self.step()
+                if date is None:
+                    break
+                yield date
+        finally:
+            self.finish()
+
+    def replay_boundary(self, boundary=None, arcs=None):
+        """Replace the nodes upstream of a boundary (i.e., a cut of arcs) with Replay
+        nodes, which replay the VQIPs that entered the arcs in a reference run (see
+        wsimod/orchestration/boundary.py).
+
+        Args:
+            boundary (list, optional): List of dicts, as recorded by run's
+                record_boundary. Defaults to None, which uses self.boundary.
+            arcs (list, optional): Names of arcs in the boundary. Defaults to None,
+                which uses the arcs in boundary.
+
+        Returns:
+            upstream (set): Names of nodes that were removed
+
+        Raises:
+            ValueError: If the arcs do not separate the upstream nodes from the rest
+                of the model
+        """
+        from wsimod.orchestration.boundary import replay_boundary
+
+        if boundary is None:
+            boundary = self.boundary
+        return replay_boundary(self, boundary, arcs)
+
+    def prune(self, targets):
+        """Create a copy of the model that is reduced to the nodes and arcs that can
+        affect targets (i.e., those upstream of them, and of any nodes that may pull
+        water from or reject water pushed by them), so that only these are simulated
+        (see wsimod/orchestration/boundary.py). This model is left unchanged. Arcs
+        leaving the reduced model end at Waste nodes.
+
+        Args:
+            targets (list): Names of nodes or arcs that results are needed for
+
+        Returns:
+            pruned (Model): The reduced copy of the model
+
+        Example:
+            >>> pruned_model = my_model.prune(['my_gauge'])
+            >>> flows, tanks, _, _ = pruned_model.run()
+        """
+        from wsimod.orchestration.boundary import prune
+
+        return prune(self, targets)
+
     def reinit(self):
         """Reinitialise by ending all node/arc timesteps and calling reinit function in
         all nodes (generally zero-ing their storage values)."""
@@ -1215,6 +1877,65 @@ class Model(WSIObj):
             arc.end_timestep()
 
 
+def compile_schedules(orchestration, nodes_type=None):
+    """Compile an orchestration into the functions that are called at each timestep.
+    An item of the orchestration with an 'every' entry (e.g., {'Groundwater':
+    'infiltrate', 'every': 7}) is only due every that many timesteps (starting from
+    the first), when the nodes' steps attribute is set to the number of timesteps that
+    the call represents. On the timesteps in between, the function that the nodes'
+    multirate attribute gives for it is called instead (e.g., to release the outflow
+    calculated by the last call evenly over the timesteps). Water entering these nodes
+    in between is stored by them as usual.
+
+    Args:
+        orchestration (list): List of dicts of node types and functions
+        nodes_type (dict, optional): Dict of node types to dicts of nodes (i.e.,
+            Model.nodes_type), whose multirate attributes are checked. Defaults to
+            None.
+
+    Returns:
+        schedules (list): A schedule for each timestep of a cycle (whose length is
+            the lowest common multiple of the 'every' entries), where a schedule has
+            a list for each item of the orchestration of (node type, function,
+            steps) tuples, where steps is the number of timesteps that the call
+            represents, or 0 on the timesteps in between
+
+    Raises:
+        ValueError: If an 'every' entry is not a positive integer, or is given for a
+            function that nodes cannot call every N timesteps
+    """
+    periods = []
+    for timestep_item in orchestration:
+        every = timestep_item.get("every", 1)
+        if not isinstance(every, int) or every < 1:
+            raise ValueError(
+                "'every' of orchestration item {0} must be a positive integer".format(
+                    timestep_item
+                )
+            )
+        if every > 1 and nodes_type is not None:
+            for node_type, function in timestep_item.items():
+                for node in nodes_type.get(node_type, {}).values():
+                    if node_type != "every" and function not in node.multirate:
+                        raise ValueError(
+                            "{0} of node {1} cannot be called every {2} timesteps, "
+                            "since the node would not act on the inputs of the "
+                            "timesteps in between".format(function, node.name, every)
+                        )
+        periods.append(every)
+    return [
+        [
+            [
+                (node_type, function, every if index % every == 0 else 0)
+                for node_type, function in timestep_item.items()
+                if node_type != "every"
+            ]
+            for timestep_item, every in zip(orchestration, periods)
+        ]
+        for index in range(lcm(*periods))
+    ]
+
+
 def write_yaml(address, config_name, data):
     """
 
@@ -1342,6 +2063,299 @@ def create_unified_dataframe(nodes_data, surfaces_data=None):
     return pd.DataFrame(rows)
 
 
+def build_data_input_dicts(data, group_cols, time_converter):
+    """Build data_input_dicts for each group of a unified DataFrame.
+
+    Times are converted once for each unique time value and shared between all
+    groups, and groups are split by index rather than by applying a function per
+    group.
+
+    Args:
+        data (pd.DataFrame): Unified DataFrame (see `create_unified_dataframe`)
+        group_cols (str or list): Column(s) that identify a data_input_dict (e.g.,
+            "node" or ["node", "surface"])
+        time_converter (function): Function that converts an array of time strings
+            to the time type used in the data_input_dict keys
+
+    Returns:
+        (dict): Dictionary mapping group names to data_input_dicts, where keys are
+            (variable, time) tuples
+    """
+    if data.empty:
+        return {}
+    codes, unique_times = pd.factorize(data["time"])
+    times = time_converter(unique_times).to_numpy(dtype=object)[codes]
+    variables = data["variable"].to_numpy(dtype=object)
+    values = data["value"].to_numpy()
+
+    data_input_dicts = {}
+    for group, idx in data.groupby(group_cols, sort=False).indices.items():
+        data_input_dicts[group] = ReadOnlyDict(
+            zip(zip(variables[idx], times[idx]), values[idx].tolist())
+        )
+    return data_input_dicts
+
+
+class ReadOnlyDict(dict):
+    """"""
+
+    def __init__(self, *args, **kwargs):
+        """A dict that cannot be modified after it is created, used for input data
+        that is shared between nodes (and surfaces), so that changing the data of
+        one node cannot silently change the data of another. Unlike
+        `types.MappingProxyType`, it can be pickled and deep copied.
+
+        Args:
+            *args: Passed to dict
+            **kwargs: Passed to dict
+
+        Returns:
+            ReadOnlyDict: A read-only dict
+        """
+        super().__init__(*args, **kwargs)
+
+    def _read_only(self, *args, **kwargs):
+        """Raise an error when an attempt is made to modify the dict.
+
+        Raises:
+            TypeError: Always
+        """
+        raise TypeError(
+            "Input data is shared between nodes and is read-only, assign a new "
+            "data_input_dict instead"
+        )
+
+    __setitem__ = __delitem__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+    __ior__ = _read_only
+
+    def __reduce__(self):
+        """Pickle (and copy) as a new ReadOnlyDict with the same contents.
+
+        Returns:
+            (tuple): The class and the contents as a dict
+        """
+        return (self.__class__, (dict(self),))
+
+
+class DataInputRegistry:
+    """"""
+
+    def __init__(self):
+        """Content-addressed registry of data_input_dicts, used to share (or only
+        write once) identical input data, e.g., nodes in the same climate grid cell
+        or surfaces with the same deposition tables.
+
+        Returns:
+            DataInputRegistry: An empty registry
+        """
+        self.by_id = {}
+        self.by_content = {}
+
+    def add(self, data_input_dict, reference=None):
+        """Add a data_input_dict to the registry, unless one with identical contents
+        has already been added.
+
+        Args:
+            data_input_dict (dict): A data_input_dict
+            reference (any, optional): Something that identifies where the
+                data_input_dict can be found (e.g., a filename). Defaults to None.
+
+        Returns:
+            (tuple): The registered data_input_dict with identical contents and its
+                reference (i.e., the arguments if no identical data has been added)
+        """
+        if id(data_input_dict) in self.by_id:
+            return self.by_id[id(data_input_dict)]
+
+        digest = hash(frozenset(data_input_dict.items()))
+        candidates = self.by_content.setdefault(digest, [])
+        for candidate in candidates:
+            if candidate[0] == data_input_dict:
+                break
+        else:
+            candidate = (data_input_dict, reference)
+            candidates.append(candidate)
+
+        self.by_id[id(data_input_dict)] = candidate
+        return candidate
+
+
+def share_identical_data_input_dicts(nodes):
+    """Replace data_input_dicts in node (and surface) configurations with a single
+    shared data_input_dict for each unique content. Shared data_input_dicts are
+    made read-only (see `ReadOnlyDict`), so nodes can safely share them.
+
+    Args:
+        nodes (dict): Dictionary of node configurations, where surfaces are a list
+    """
+    registry = DataInputRegistry()
+    read_only = {}
+
+    def share(data_input_dict):
+        data_input_dict, _ = registry.add(data_input_dict)
+        if id(data_input_dict) not in read_only:
+            read_only[id(data_input_dict)] = (
+                data_input_dict
+                if isinstance(data_input_dict, ReadOnlyDict)
+                else ReadOnlyDict(data_input_dict)
+            )
+        return read_only[id(data_input_dict)]
+
+    for node in nodes.values():
+        if node.get("data_input_dict"):
+            node["data_input_dict"] = share(node["data_input_dict"])
+        for surface in node.get("surfaces", []):
+            if surface.get("data_input_dict"):
+                surface["data_input_dict"] = share(surface["data_input_dict"])
+
+
+def unified_data_reference(value, default):
+    """Find which rows of a unified data file contain a node's (or surface's) data.
+
+    Args:
+        value (bool or list): The data_input_dict entry of a node configuration,
+            either True or a [node] (or [node, surface]) reference
+        default (str or tuple): The node name (or (node, surface) tuple)
+
+    Returns:
+        (str or tuple): Node name (or (node, surface) tuple) to read the data from
+    """
+    if isinstance(value, list):
+        return value[0] if len(value) == 1 else tuple(value)
+    return default
+
+
+def time_to_number(time):
+    """Convert a time used in data_input_dict keys to a number for ordering.
+
+    Args:
+        time (to_datetime, pd.Timestamp or pd.Period): A time
+
+    Returns:
+        (float): Seconds since epoch
+    """
+    if isinstance(time, to_datetime):
+        return time._date.timestamp()
+    if hasattr(time, "to_timestamp"):
+        time = time.to_timestamp()
+    return time.timestamp()
+
+
+def interpolate_data_input(data_input_dict, gaps):
+    """Fill missing times of variables in a data_input_dict by linear interpolation
+    between the neighbouring available times (or the nearest value if outside the
+    available times). The data_input_dict is not modified (it may be shared by
+    other nodes), instead a filled copy is returned.
+
+    Args:
+        data_input_dict (dict): A data_input_dict
+        gaps (dict): Dictionary mapping names of variables to a list of times to
+            fill
+
+    Raises:
+        ValueError: If there is no data for a variable
+
+    Returns:
+        (dict): A copy of data_input_dict with the gaps filled (read-only if
+            data_input_dict is)
+    """
+    filled = dict(data_input_dict)
+    for variable, times in gaps.items():
+        available = sorted(
+            (time_to_number(time), value)
+            for (variable_, time), value in data_input_dict.items()
+            if variable_ == variable
+        )
+        if not available:
+            raise ValueError("No input data to interpolate for {0}".format(variable))
+        x = [point[0] for point in available]
+        y = [point[1] for point in available]
+
+        for time in times:
+            number = time_to_number(time)
+            idx = bisect.bisect_left(x, number)
+            if idx == 0:
+                value = y[0]
+            elif idx == len(x):
+                value = y[-1]
+            else:
+                weight = (number - x[idx - 1]) / (x[idx] - x[idx - 1])
+                value = y[idx - 1] + weight * (y[idx] - y[idx - 1])
+            filled[(variable, time)] = value
+    if isinstance(data_input_dict, ReadOnlyDict):
+        return ReadOnlyDict(filled)
+    return filled
+
+
+def list_files(file_path):
+    """List a file, or all files in a directory (e.g., a partitioned parquet dataset).
+
+    Args:
+        file_path (str): Path to a file or directory
+
+    Returns:
+        (list): Sorted list of file paths
+    """
+    if os.path.isdir(file_path):
+        return sorted(
+            os.path.join(root, file)
+            for root, _, filenames in os.walk(file_path)
+            for file in filenames
+        )
+    return [file_path]
+
+
+def fingerprint_file(file_path):
+    """Describe the contents of a file (or of each file in a directory, such as a
+    partitioned parquet dataset) so that changes can be detected.
+
+    Args:
+        file_path (str): Path to a file or directory
+
+    Returns:
+        (dict): Dictionary mapping each file to its modification time, size and
+            sha256 hash
+    """
+    fingerprint = {}
+    for file in list_files(file_path):
+        sha256 = hashlib.sha256()
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha256.update(chunk)
+        fingerprint[file] = {
+            "mtime": os.path.getmtime(file),
+            "size": os.path.getsize(file),
+            "sha256": sha256.hexdigest(),
+        }
+    return fingerprint
+
+
+def check_fingerprint(file_path, fingerprint):
+    """Check whether a file (or directory) still matches a fingerprint created by
+    `fingerprint_file`. Files are only hashed if their modification time has changed.
+
+    Args:
+        file_path (str): Path to a file or directory
+        fingerprint (dict): Fingerprint created by `fingerprint_file`
+
+    Returns:
+        (bool): True if the contents are unchanged
+    """
+    if not os.path.exists(file_path):
+        return False
+    if list_files(file_path) != sorted(fingerprint.keys()):
+        return False
+
+    for file, details in fingerprint.items():
+        if os.path.getsize(file) != details["size"]:
+            return False
+        if os.path.getmtime(file) != details["mtime"]:
+            if fingerprint_file(file)[file]["sha256"] != details["sha256"]:
+                return False
+    return True
+
+
 def flatten_dict(d, parent_key="", sep="-"):
     """
 
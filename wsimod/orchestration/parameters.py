@@ -0,0 +1,471 @@
+"""Mapping flat vectors of parameter values (e.g., from an optimiser) onto a model.
+
+The parameters are declared in the 'parameters' entry of a model config (which is
+stored in `Model.parameters` when loaded), or passed directly, as a list of dicts:
+
+    parameters:
+    - node: 3607-land
+      surface: Grass
+      parameter: field_capacity
+      bounds: [0.1, 0.5]
+    - node: [3607-gw, 3976-gw]
+      parameter: residence_time
+      bounds: [1, 1000]
+      transform: log
+    - arc: 3607-storm-to-3607-river
+      parameter: capacity
+      bounds: [0, 100]
+
+where a parameter shared by several nodes (or arcs) lists their names. A
+`ParameterSpace` resolves the objects and parameters once, and then applies vectors
+directly to the objects. Where a class has a setter (see `SETTERS`), only the values
+derived from the changed parameters are recalculated (e.g., the capacity and available
+water of a `GrowingSurface`), rather than everything recalculated by
+`apply_overrides`, which is used for other classes.
+
+    >>> space = ParameterSpace(my_model)
+    >>> for vector in optimiser_vectors:
+    >>>     space.reset()
+    >>>     space.apply(vector)
+    >>>     flows, _, _, _ = my_model.run(record_arcs=['my_gauge'])
+
+`reset` restores the states (and parameters) of the model to when the space was
+created, so that each vector is simulated from the same initial conditions without
+reloading the model.
+"""
+
+import copy
+from math import exp, log
+
+import numpy as np
+
+from wsimod.arcs.arcs import Arc
+from wsimod.core.core import WSIObj
+from wsimod.nodes.land import (
+    GrowingSurface,
+    ImperviousSurface,
+    IrrigationSurface,
+    Land,
+    PerviousSurface,
+    Surface,
+)
+from wsimod.nodes.nutrient_pool import NutrientPool
+from wsimod.nodes.sewer import Sewer
+from wsimod.nodes.storage import Groundwater, LaggedSums, Storage
+
+# Functions that map a vector value to a parameter value, and their inverses
+TRANSFORMS = {
+    "linear": (lambda x: x, lambda x: x),
+    "log": (exp, log),
+}
+
+# Parameters that change the crop calendar of a GrowingSurface
+CALENDAR_PARAMETERS = [
+    "crop_factor_stages",
+    "crop_factor_stage_dates",
+    "sowing_day",
+    "harvest_day",
+    "crop_cover_max",
+    "ground_cover_max",
+]
+
+# Types of the objects that hold the states of a model
+COMPONENTS = (WSIObj, NutrientPool, LaggedSums)
+
+# Types of values that are stored as states
+STATES = (int, float, str, bool, type(None), np.ndarray, np.generic)
+
+
+def set_attributes(obj, values):
+    """Set parameters that no other values are derived from.
+
+    Args:
+        obj (object): A node, arc or surface
+        values (dict): Parameter values
+    """
+    for key, value in values.items():
+        setattr(obj, key, value)
+
+
+def set_storage(node, values):
+    """Set parameters of a Storage node and its tank (as in `apply_overrides`).
+
+    Args:
+        node (Storage): The node
+        values (dict): Parameter values
+    """
+    set_attributes(node, values)
+    for key in ["capacity", "area", "datum"]:
+        if key in values:
+            setattr(node.tank, key, values[key])
+
+
+def set_sewer(node, values):
+    """Set parameters of a Sewer and its tank (as in `apply_overrides`).
+
+    Args:
+        node (Sewer): The node
+        values (dict): Parameter values
+    """
+    set_attributes(node, values)
+    node.sewer_tank.capacity = node.capacity
+    node.sewer_tank.area = node.chamber_area
+    node.sewer_tank.datum = node.chamber_floor
+
+
+def set_land(node, values):
+    """Set residence times of a Land node and its tanks (as in `apply_overrides`).
+
+    Args:
+        node (Land): The node
+        values (dict): Parameter values
+    """
+    set_attributes(node, values)
+    node.surface_runoff.residence_time = node.surface_residence_time
+    node.subsurface_runoff.residence_time = node.subsurface_residence_time
+    node.percolation.residence_time = node.percolation_residence_time
+
+
+def set_surface(surface, values):
+    """Set parameters of a Surface (as in `apply_overrides`).
+
+    Args:
+        surface (Surface): The surface
+        values (dict): Parameter values
+    """
+    set_attributes(surface, values)
+    surface.capacity = surface.area * surface.depth
+
+
+def set_impervious_surface(surface, values):
+    """Set parameters of an ImperviousSurface (as in `apply_overrides`).
+
+    Args:
+        surface (ImperviousSurface): The surface
+        values (dict): Parameter values
+    """
+    set_attributes(surface, values)
+    surface.depth = surface.pore_depth
+    surface.capacity = surface.area * surface.depth
+
+
+def set_pervious_surface(surface, values):
+    """Set parameters of a PerviousSurface (as in `apply_overrides`), where depth is
+    the physical (i.e., root) depth.
+
+    Args:
+        surface (PerviousSurface): The surface
+        values (dict): Parameter values
+    """
+    depth = values.pop("depth", surface.depth / surface.total_porosity)
+    set_attributes(surface, values)
+    surface.subsurface_coefficient = 1 - surface.percolation_coefficient
+    surface.field_capacity_m = surface.field_capacity * depth
+    surface.wilting_point_m = surface.wilting_point * depth
+    surface.depth = depth * surface.total_porosity
+    surface.capacity = surface.depth * surface.area
+
+
+def set_growing_surface(surface, values):
+    """Set parameters of a GrowingSurface (as in `apply_overrides`), recalculating
+    the crop calendar only if it has changed.
+
+    Args:
+        surface (GrowingSurface): The surface
+        values (dict): Parameter values
+    """
+    surface.rooting_depth = values.pop("rooting_depth", surface.rooting_depth)
+    values["depth"] = surface.rooting_depth
+    calendar = set(CALENDAR_PARAMETERS).intersection(values)
+    set_pervious_surface(surface, values)
+    if calendar:
+        (
+            surface.harvest_sow_calendar,
+            surface.ground_cover_stages,
+            surface.crop_cover_stages,
+            surface.autumn_sow,
+        ) = surface.infer_sow_harvest_calendar()
+        (
+            surface.crop_factor_table,
+            surface.crop_cover_table,
+            surface.ground_cover_table,
+        ) = surface.calculate_day_of_year_tables()
+    (
+        surface.total_available_water,
+        surface.readily_available_water,
+    ) = surface.calculate_available_water()
+
+
+def apply_overrides(obj, values):
+    """Set parameters with the object's `apply_overrides`.
+
+    Args:
+        obj (object): A node, arc or surface
+        values (dict): Parameter values
+    """
+    obj.apply_overrides(values)
+
+
+GROWING_PARAMETERS = [
+    "area",
+    "rooting_depth",
+    "field_capacity",
+    "wilting_point",
+    "total_porosity",
+    "infiltration_capacity",
+    "surface_coefficient",
+    "percolation_coefficient",
+    "et0_coefficient",
+    "ihacres_p",
+    "ET_depletion_factor",
+] + CALENDAR_PARAMETERS
+
+# Parameters that can be set, and the function that sets them, for classes that
+# define apply_overrides
+SETTERS = {
+    Arc: (["capacity", "preference"], set_attributes),
+    Storage: (["capacity", "area", "datum"], set_storage),
+    Groundwater: (
+        [
+            "residence_time",
+            "infiltration_threshold",
+            "infiltration_pct",
+            "capacity",
+            "area",
+            "datum",
+        ],
+        set_storage,
+    ),
+    Sewer: (["capacity", "chamber_area", "chamber_floor", "pipe_time"], set_sewer),
+    Land: (
+        [
+            "surface_residence_time",
+            "subsurface_residence_time",
+            "percolation_residence_time",
+        ],
+        set_land,
+    ),
+    Surface: (["area", "depth"], set_surface),
+    ImperviousSurface: (["area", "pore_depth", "et0_to_e"], set_impervious_surface),
+    PerviousSurface: (
+        [
+            "area",
+            "depth",
+            "field_capacity",
+            "wilting_point",
+            "total_porosity",
+            "infiltration_capacity",
+            "surface_coefficient",
+            "percolation_coefficient",
+            "et0_coefficient",
+            "ihacres_p",
+        ],
+        set_pervious_surface,
+    ),
+    GrowingSurface: (GROWING_PARAMETERS, set_growing_surface),
+    IrrigationSurface: (
+        GROWING_PARAMETERS + ["irrigation_coefficient"],
+        set_growing_surface,
+    ),
+}
+
+
+def get_setter(obj, parameters):
+    """Find the function that sets parameters of an object, which is its class's
+    setter if it has one that can set all of them, and otherwise its
+    apply_overrides.
+
+    Args:
+        obj (object): A node, arc or surface
+        parameters (list): Names of parameters
+
+    Returns:
+        (function): Function of the object and a dict of parameter values
+    """
+    for cls in obj.__class__.__mro__:
+        if "apply_overrides" in cls.__dict__:
+            break
+    supported, setter = SETTERS.get(cls, ([], apply_overrides))
+    if set(parameters).issubset(supported):
+        return setter
+    return apply_overrides
+
+
+def get_value(obj, parameter):
+    """Get the current value of a parameter.
+
+    Args:
+        obj (object): A node, arc or surface
+        parameter (str): Name of the parameter
+
+    Returns:
+        (float): Value
+    """
+    if isinstance(obj, PerviousSurface) and parameter == "depth":
+        return obj.depth / obj.total_porosity
+    return getattr(obj, parameter)
+
+
+def is_state(value):
+    """Check whether a value is a state (i.e., data rather than a function or
+    component).
+
+    Args:
+        value (object): The value
+
+    Returns:
+        (bool): True if the value is a state
+    """
+    if isinstance(value, STATES):
+        return True
+    if isinstance(value, (list, tuple)):
+        return all(is_state(x) for x in value)
+    if isinstance(value, dict):
+        return all(is_state(k) & is_state(v) for k, v in value.items())
+    return False
+
+
+def get_components(model):
+    """Find the objects that hold the states of a model, i.e., its nodes and arcs and
+    the objects they contain (e.g., tanks, surfaces and nutrient pools).
+
+    Args:
+        model (Model): The model
+
+    Returns:
+        components (list): The objects
+    """
+    components = {}
+    to_visit = list(model.nodelist) + list(model.arcs.values())
+    while to_visit:
+        obj = to_visit.pop()
+        if id(obj) in components:
+            continue
+        components[id(obj)] = obj
+        for value in obj.__dict__.values():
+            if isinstance(value, dict):
+                value = list(value.values())
+            elif not isinstance(value, (list, tuple)):
+                value = [value]
+            to_visit.extend(x for x in value if isinstance(x, COMPONENTS))
+    return list(components.values())
+
+
+class ParameterSpace:
+    """"""
+
+    def __init__(self, model, parameters=None):
+        """Parameters of a model that are set from a vector of values.
+
+        Args:
+            model (Model): The model, whose overrides should already be applied
+            parameters (list, optional): List of dicts declaring a parameter, with
+                keys 'node' or 'arc' (a name or list of names), 'parameter', and,
+                optionally, 'surface' (of a Land node), 'bounds' (in the units of the
+                parameter), 'transform' ('linear' or 'log', see TRANSFORMS) and
+                'name'. Defaults to None, which uses the parameters of the model
+                config (model.parameters).
+
+        Raises:
+            ValueError: If a parameter does not have a node or arc, or its transform
+                is not recognised
+        """
+        if parameters is None:
+            parameters = model.parameters
+        self.model = model
+        self.names = []
+        self.transforms = []
+        lower = []
+        upper = []
+        default = []
+
+        # Group the parameters of each object
+        objects = {}
+        for index, parameter in enumerate(parameters):
+            if "node" in parameter.keys():
+                names = parameter["node"]
+                elements = model.nodes
+            elif "arc" in parameter.keys():
+                names = parameter["arc"]
+                elements = model.arcs
+            else:
+                raise ValueError("Parameter {0} has no node or arc".format(parameter))
+            if isinstance(names, str):
+                names = [names]
+            if parameter.get("transform", "linear") not in TRANSFORMS:
+                raise ValueError(
+                    "Transform {0} not recognised".format(parameter["transform"])
+                )
+            to_value, to_vector = TRANSFORMS[parameter.get("transform", "linear")]
+
+            for name in names:
+                obj = elements[name]
+                if "surface" in parameter.keys():
+                    obj = obj.get_surface(parameter["surface"])
+                objects.setdefault(id(obj), (obj, []))[1].append(
+                    (parameter["parameter"], index)
+                )
+            self.names.append(
+                parameter.get(
+                    "name",
+                    ".".join(
+                        [",".join(names)]
+                        + [
+                            parameter[x]
+                            for x in ["surface", "parameter"]
+                            if x in parameter
+                        ]
+                    ),
+                )
+            )
+            self.transforms.append(to_value)
+            bounds = parameter.get("bounds", [-np.inf, np.inf])
+            lower.append(to_vector(bounds[0]) if bounds[0] > -np.inf else -np.inf)
+            upper.append(to_vector(bounds[1]) if bounds[1] < np.inf else np.inf)
+            default.append(to_vector(get_value(obj, parameter["parameter"])))
+
+        self.setters = [
+            (obj, get_setter(obj, [x for x, _ in keys]), keys)
+            for obj, keys in objects.values()
+        ]
+        self.lower = np.array(lower)
+        self.upper = np.array(upper)
+        self.default = np.array(default)
+
+        # Store states for reset, and the components that hold them (which
+        # apply_overrides may replace, e.g., River.init_lags)
+        self.components = get_components(model)
+        self.states = copy.deepcopy(
+            [
+                {key: value for key, value in x.__dict__.items() if is_state(value)}
+                for x in self.components
+            ]
+        )
+        self.references = [
+            {
+                key: value
+                for key, value in x.__dict__.items()
+                if isinstance(value, COMPONENTS)
+            }
+            for x in self.components
+        ]
+
+    def apply(self, vector):
+        """Set the parameters of the model from a vector.
+
+        Args:
+            vector (iterable): A value for each parameter, in the transformed units
+        """
+        values = [to_value(float(x)) for to_value, x in zip(self.transforms, vector)]
+        for obj, setter, keys in self.setters:
+            setter(obj, {key: values[index] for key, index in keys})
+
+    def reset(self):
+        """Restore the states and parameters of the model to when the parameter space
+        was created."""
+        states = copy.deepcopy(self.states)
+        for component, states_, references in zip(
+            self.components, states, self.references
+        ):
+            component.__dict__.update(states_)
+            component.__dict__.update(references)
@@ -0,0 +1,675 @@
+"""A vectorised engine for River reaches.
+
+The default orchestration runs `River.calculate_discharge` and `River.distribute` one
+node at a time. For networks with many reaches, the `RiverEngine` instead holds reach
+state in arrays (one row per reach) so that biochemical processes are computed for
+all reaches at once, and outflows are routed wave by wave along
+`Model.river_discharge_order`.
+
+Only plain `River` reaches, with a single outgoing `Arc` to another `River` or a
+`Waste`, are routed by the engine. Any other reach (e.g., one that discharges into a
+`Node` junction, is also abstracted from by a `Reservoir`, or has been patched) falls
+back to its own `distribute`, in the same position of the discharge order. Results
+agree with the object-by-object orchestration to floating point tolerance.
+
+The engine is opt-in, by setting `vectorised_rivers` on a `Model` (or in its config):
+
+    >>> my_model.vectorised_rivers = True
+    >>> flows, tanks, _, _ = my_model.run()
+
+An engine can also simulate the River nodes of several models of the same network
+(i.e., the members of an `Ensemble`), whose reaches are then stacked in the same arrays.
+"""
+
+from operator import itemgetter
+
+import numpy as np
+
+from wsimod.arcs.arcs import Arc
+from wsimod.core import constants
+from wsimod.nodes.storage import River
+from wsimod.nodes.tanks import DecayTank, Tank
+from wsimod.nodes.waste import Waste
+
+BIOCHEMICAL_PARAMETERS = [
+    "area",
+    "T_wdays",
+    "halfsatINwater",
+    "denpar_w",
+    "limpppar",
+    "hsatTP",
+    "prodNpar",
+    "prodPpar",
+    "uptake_PNratio",
+    "muptNpar",
+    "muptPpar",
+]
+
+
+def is_patched(obj, methods):
+    """Check whether any methods of an object have been replaced on the instance
+    (e.g., by `extensions.apply_patches`).
+
+    Args:
+        obj (object): Object to check
+        methods (list): Names of methods
+
+    Returns:
+        (bool): True if any method has been replaced
+    """
+    return any(method in vars(obj) for method in methods)
+
+
+def gather(vqips, keys):
+    """Collect values from a list of VQIPs into an array.
+
+    Args:
+        vqips (list): A list of VQIPs (or other dicts)
+        keys (list): Keys to collect
+
+    Returns:
+        (np.array): Values (VQIP x key)
+    """
+    if not keys:
+        return np.zeros((len(vqips), 0))
+    getter = itemgetter(*keys)
+    return np.array([getter(vqip) for vqip in vqips], dtype=float).reshape(
+        len(vqips), len(keys)
+    )
+
+
+def is_handler(handler, function):
+    """Check whether a handler is a (bound) default function.
+
+    Args:
+        handler (function): Handler to check
+        function (function): The unbound function that the handler should be
+
+    Returns:
+        (bool): True if the handler is the function
+    """
+    return getattr(handler, "__func__", None) is function
+
+
+class LaggedSumsArray:
+    """"""
+
+    def __init__(self, lags):
+        """Array version of `storage.LaggedSums`, with one row for each of a list of
+        LaggedSums that have the same number of windows. The LaggedSums are kept up to
+        date as values are appended, so that nodes always show the current state.
+
+        Args:
+            lags (list): A list of LaggedSums whose values, positions and sums are
+                adopted
+        """
+        self.lags = lags
+        self.rows = np.arange(len(lags))
+        self.sizes = np.array([lag.size for lag in lags], dtype=int)
+        self.windows = np.array([lag.windows for lag in lags], dtype=int)
+        self.values = np.zeros((len(lags), max(self.sizes, default=1)))
+        for row, lag in zip(self.rows, lags):
+            self.values[row, : lag.size] = lag.values
+        self.positions = np.array([lag.position for lag in lags], dtype=int)
+        self.sums = np.array(
+            [[lag.sums[window] for window in lag.windows] for lag in lags],
+            dtype=float,
+        ).reshape(self.windows.shape)
+
+    def append(self, values):
+        """Add the newest value to each row (see `LaggedSums.append`), and to the
+        adopted LaggedSums.
+
+        Args:
+            values (np.array): Value to add for each row
+        """
+        positions = self.positions.tolist()
+        for k in range(self.windows.shape[1]):
+            self.sums[:, k] += (
+                values
+                - self.values[
+                    self.rows, (self.positions - self.windows[:, k]) % self.sizes
+                ]
+            )
+        self.values[self.rows, self.positions] = values
+        self.positions = (self.positions + 1) % self.sizes
+        for row in np.flatnonzero(self.positions == 0):
+            # Recalculate sums once per cycle to avoid accumulating rounding errors
+            size = self.sizes[row]
+            for k, window in enumerate(self.windows[row]):
+                self.sums[row, k] = sum(self.values[row, size - window : size].tolist())
+
+        # Only the newest value, the positions and the sums have changed
+        for lag, value, position, position_, sums in zip(
+            self.lags,
+            values.tolist(),
+            positions,
+            self.positions.tolist(),
+            self.sums.tolist(),
+        ):
+            lag.values[position] = value
+            lag.position = position_
+            lag.sums.update(zip(lag.windows, sums))
+
+    def get_mean(self, k):
+        """Get the means of the most recent values (see `LaggedSums.get_mean`).
+
+        Args:
+            k (int): Index of the window (in the order they were given to LaggedSums)
+
+        Returns:
+            (np.array): Mean over the window for each row
+        """
+        return self.sums[:, k] / self.windows[:, k]
+
+
+class RiverEngine:
+    """"""
+
+    def __init__(self, model):
+        """Vectorised `calculate_discharge` and `distribute` for the River nodes of a
+        model. Parameters, outflow coefficients and lagged variables are read when the
+        engine is created (i.e., at the start of `Model.run`), and lagged variables are
+        updated on the nodes every timestep.
+
+        Args:
+            model (Model or list): The model whose River nodes should be simulated, or
+                a list of models with the same river discharge order (i.e., the
+                members of an ensemble)
+        """
+        self.models = model if isinstance(model, list) else [model]
+        self.model = self.models[0]
+        for model_ in self.models:
+            if model_.river_discharge_order != self.model.river_discharge_order:
+                raise ValueError("Models must have the same river discharge order")
+        rivers = [
+            node
+            for model_ in self.models
+            for node in model_.nodes_type.get("River", {}).values()
+        ]
+
+        # Reaches whose biochemical processes are vectorised
+        self.biochemistry = "nitrate" in constants.POLLUTANTS
+        self.reaches = []
+        self.fallback = []
+        for node in rivers:
+            if self.biochemistry and self.is_vectorisable(node):
+                self.reaches.append(node)
+            else:
+                self.fallback.append(node)
+        if self.reaches:
+            self.init_biochemistry()
+
+        # Reaches whose discharge is routed by the engine, where the members of an
+        # ensemble are interleaved so that their waves are discharged together
+        self.routes = {}
+        for node in rivers:
+            route = self.get_route(node)
+            if route is not None:
+                self.routes[node] = route
+        self.blocks = self.get_blocks(
+            [
+                model_.nodes[name]
+                for name in self.model.river_discharge_order
+                for model_ in self.models
+            ]
+        )
+
+    def is_vectorisable(self, node):
+        """Check that a node is a River that behaves as the River class.
+
+        Args:
+            node (Node): Node to check
+
+        Returns:
+            (bool): True if the node can be simulated by the engine
+        """
+        return (
+            type(node) is River
+            and type(node.tank) in [Tank, DecayTank]
+            and not is_patched(
+                node,
+                [
+                    "calculate_discharge",
+                    "biochemical_processes",
+                    "update_depth",
+                    "get_din_pool",
+                    "get_data_input",
+                    "distribute",
+                    "get_riverrc",
+                    "push_distributed",
+                ],
+            )
+            and not is_patched(node.tank, ["pull_storage", "push_storage"])
+            and set(node.din_components).issubset(constants.ADDITIVE_POLLUTANTS)
+        )
+
+    def get_route(self, node):
+        """Identify whether a River discharges via a single plain Arc into a River or
+        Waste (in which case its discharge can be routed by the engine).
+
+        Args:
+            node (River): River node
+
+        Returns:
+            (tuple): The arc and receiving node, or None if the node must be
+                distributed by its own `distribute`
+        """
+        if not self.is_vectorisable(node) or len(node.out_arcs) != 1:
+            return None
+        arc = next(iter(node.out_arcs.values()))
+        if type(arc) is not Arc or is_patched(arc, ["send_push_request", "get_excess"]):
+            return None
+        target = arc.out_port
+        if type(target) is River:
+            if not (
+                is_handler(target.push_set_handler["default"], River.push_set_river)
+                and is_handler(
+                    target.push_check_handler["default"], River.push_check_accept
+                )
+                and type(target.tank) in [Tank, DecayTank]
+                and not is_patched(target.tank, ["push_storage"])
+            ):
+                return None
+        elif type(target) is Waste:
+            if not (
+                is_handler(target.push_set_handler["default"], Waste.push_set_accept)
+                and is_handler(
+                    target.push_check_handler["default"], Waste.push_check_accept
+                )
+            ):
+                return None
+        else:
+            return None
+        if is_patched(target, ["push_set", "push_check"]):
+            return None
+        return arc, target
+
+    def get_blocks(self, order):
+        """Split the river discharge order into blocks of consecutive reaches routed
+        by the engine, and nodes that fall back to their own `distribute`. Each block
+        is split into waves, where a new wave begins whenever a reach receives
+        discharge from a reach in the current wave, so that discharging a wave at
+        once is the same as discharging its reaches in order.
+
+        Args:
+            order (list): River nodes in the order that they distribute
+
+        Returns:
+            blocks (list): A list of blocks (dicts) and fallback nodes
+        """
+        blocks = []
+        block = None
+        for node in order:
+            if node not in self.routes:
+                blocks.append(node)
+                block = None
+                continue
+            if block is None:
+                block = {"reaches": [], "waves": []}
+                blocks.append(block)
+                wave_targets = None
+            if wave_targets is None or node in wave_targets:
+                block["waves"].append([])
+                wave_targets = set()
+            block["reaches"].append(node)
+            block["waves"][-1].append(node)
+            wave_targets.add(self.routes[node][1])
+
+        for block in blocks:
+            if isinstance(block, dict):
+                self.init_block(block)
+        return blocks
+
+    def init_block(self, block):
+        """Index the reaches, receiving Rivers, arcs and waves of a block.
+
+        Args:
+            block (dict): A block from `get_blocks`
+        """
+        reaches = block["reaches"]
+        nodes = list(reaches)
+        for node in reaches:
+            _, target = self.routes[node]
+            if type(target) is River and target not in nodes:
+                nodes.append(target)
+        index = {node: i for i, node in enumerate(nodes)}
+
+        block["nodes"] = nodes
+        block["arcs"] = [self.routes[node][0] for node in reaches]
+        block["riverrc"] = np.array([node.get_riverrc() for node in reaches])
+        waves = []
+        for wave in block["waves"]:
+            sources = np.array([index[node] for node in wave], dtype=int)
+            targets = np.array(
+                [index.get(self.routes[node][1], -1) for node in wave],
+                dtype=int,
+            )
+            waves.append((sources, targets))
+        block["waves"] = waves
+
+    def init_biochemistry(self):
+        """Read parameters and adopt the lagged variables of vectorised reaches."""
+        self.parameters = {
+            name: np.array([float(getattr(node, name)) for node in self.reaches])
+            for name in BIOCHEMICAL_PARAMETERS
+        }
+        self.din_mask = np.array(
+            [
+                [pol in node.din_components for pol in constants.ADDITIVE_POLLUTANTS]
+                for node in self.reaches
+            ]
+        )
+        self.lagged_temperatures = LaggedSumsArray(
+            [node.lagged_temperatures for node in self.reaches]
+        )
+        self.lagged_total_phosphorus = LaggedSumsArray(
+            [node.lagged_total_phosphorus for node in self.reaches]
+        )
+
+    def calculate_discharge(self):
+        """Replaces calling `calculate_discharge` for each River node."""
+        for node in self.fallback:
+            node.calculate_discharge()
+        if self.reaches:
+            self.biochemical_processes()
+
+    def biochemical_processes(self):
+        """Vectorised `River.biochemical_processes`, updating the tank storage and
+        mass balance (`bio_in` and `bio_out`) of every reach."""
+        additive = constants.ADDITIVE_POLLUTANTS
+        storages = [node.tank.storage for node in self.reaches]
+        states = gather(storages, ["volume", "temperature"] + additive)
+        volume = states[:, 0]
+        temperature = states[:, 1]
+        pollutants = states[:, 2:]
+        data_temperature = np.array(
+            [node.get_data_input("temperature") for node in self.reaches], dtype=float
+        )
+        par = self.parameters
+        phos = additive.index("phosphate")
+        orgp = additive.index("org-phosphorus")
+
+        depth = volume / par["area"]
+        temperature = (1 - 1 / par["T_wdays"]) * temperature + (
+            1 / par["T_wdays"]
+        ) * data_temperature
+
+        # Update lagged temperatures and total phosphorus
+        self.lagged_temperatures.append(temperature)
+        self.lagged_total_phosphorus.append(pollutants[:, phos] + pollutants[:, orgp])
+
+        # Processes only occur when there is water above freezing
+        active = np.flatnonzero(
+            (volume >= constants.FLOAT_ACCURACY) & (temperature > 0)
+        )
+        in_, out_, pollutants_ = self.biochemical_transforms(
+            volume[active],
+            temperature[active],
+            depth[active],
+            pollutants[active],
+            active,
+        )
+
+        # Update nodes
+        empty = self.reaches[0].empty_vqip()
+        for node, storage, temperature_, depth_ in zip(
+            self.reaches, storages, temperature.tolist(), depth.tolist()
+        ):
+            node.current_depth = depth_
+            storage["temperature"] = temperature_
+            node.bio_in = empty.copy()
+            node.bio_out = empty.copy()
+        for i, row, in_row, out_row in zip(
+            active.tolist(), pollutants_.tolist(), in_.tolist(), out_.tolist()
+        ):
+            node = self.reaches[i]
+            node.tank.storage.update(zip(additive, row))
+            node.bio_in.update(zip(additive, in_row))
+            node.bio_out.update(zip(additive, out_row))
+
+    def biochemical_transforms(self, volume, temperature, depth, pollutants, rows):
+        """Denitrification, mineralisation/production and macrophyte uptake for
+        reaches where processes are active (see `River.biochemical_processes`).
+
+        Args:
+            volume (np.array): Volume of each reach
+            temperature (np.array): Temperature of each reach
+            depth (np.array): Depth of each reach
+            pollutants (np.array): Additive pollutant amounts (reach x pollutant)
+            rows (np.array): Indices of the reaches in the engine
+
+        Returns:
+            in_ (np.array): Gain in pollutant amounts
+            out_ (np.array): Loss in pollutant amounts
+            pollutants (np.array): Updated pollutant amounts
+        """
+        additive = constants.ADDITIVE_POLLUTANTS
+        par = {key: value[rows] for key, value in self.parameters.items()}
+        din_mask = self.din_mask[rows]
+        phos = additive.index("phosphate")
+        orgp = additive.index("org-phosphorus")
+        orgn = additive.index("org-nitrogen")
+        in_ = np.zeros_like(pollutants)
+        out_ = np.zeros_like(pollutants)
+
+        def get_din_pool():
+            return (pollutants * din_mask).sum(axis=1)
+
+        def din_proportion(amount, din):
+            # Split an amount between din components in proportion to their storage
+            has_din = din > 0
+            din = np.where(has_din, din, 1)
+            return np.where(
+                has_din[:, None], amount[:, None] * pollutants / din[:, None], 0
+            ) * (din_mask)
+
+        # Denitrification
+        tempfcn = 2 ** ((temperature - 20) / 10)
+        tempfcn = np.where(temperature < 5, tempfcn * (temperature / 5), tempfcn)
+
+        din = get_din_pool()
+        din_concentration = din / volume
+        confcn = din_concentration / (din_concentration + par["halfsatINwater"])
+        denitri_water = par["denpar_w"] * par["area"] * tempfcn * confcn
+
+        river_denitrification = np.minimum(denitri_water, 0.5 * din)
+        din_ = din - river_denitrification
+        has_din = din > 0
+        proportion = np.where(has_din, (din - din_) / np.where(has_din, din, 1), 0)
+        loss = proportion[:, None] * pollutants * din_mask
+        out_ += loss
+        pollutants -= loss
+
+        din = get_din_pool()
+
+        # Calculate moving averages
+        temp_10_day = self.lagged_temperatures.get_mean(0)[rows]
+        temp_20_day = self.lagged_temperatures.get_mean(1)[rows]
+        total_phos_365_day = self.lagged_total_phosphorus.get_mean(0)[rows]
+
+        # Calculate coefficients
+        tempfcn = temperature / 20 * (temp_10_day - temp_20_day) / 5
+        denominator = total_phos_365_day - par["limpppar"] + par["hsatTP"]
+        totalphosfcn = np.where(
+            denominator > 0,
+            (total_phos_365_day - par["limpppar"])
+            / np.where(denominator > 0, denominator, 1),
+            0,
+        )
+
+        # Mineralisation/production
+        minprodN = par["prodNpar"] * totalphosfcn * tempfcn * par["area"] * depth
+        minprodP = (
+            par["prodPpar"]
+            * totalphosfcn
+            * tempfcn
+            * par["area"]
+            * depth
+            * par["uptake_PNratio"]
+        )
+        production = minprodN > 0
+        minprodN = np.where(
+            production,
+            np.minimum(0.5 * din, minprodN),
+            np.minimum(0.5 * pollutants[:, orgn], -minprodN),
+        )
+        minprodP = np.where(
+            production,
+            np.minimum(0.5 * pollutants[:, phos], minprodP),
+            np.minimum(0.5 * pollutants[:, orgp], -minprodP),
+        )
+
+        # production (inorg -> org) or mineralisation (org -> inorg)
+        out_[:, phos] = np.where(production, minprodP, out_[:, phos])
+        in_[:, phos] = np.where(production, in_[:, phos], minprodP)
+        pollutants[:, phos] = np.where(
+            production,
+            pollutants[:, phos] - minprodP,
+            pollutants[:, phos] + minprodP,
+        )
+        in_[:, orgp] = np.where(production, minprodP, in_[:, orgp])
+        out_[:, orgp] = np.where(production, out_[:, orgp], minprodP)
+        pollutants[:, orgp] = np.where(
+            production,
+            pollutants[:, orgp] + minprodP,
+            pollutants[:, orgp] - minprodP,
+        )
+        change = din_proportion(minprodN, din)
+        production_ = production[:, None]
+        out_ += np.where(production_, change, 0)
+        in_ += np.where(production_, 0, change)
+        pollutants += np.where(production_, -change, change)
+        in_[:, orgn] = np.where(production, minprodN, in_[:, orgn])
+        out_[:, orgn] = np.where(production, out_[:, orgn], minprodN)
+        pollutants[:, orgn] = np.where(
+            production,
+            pollutants[:, orgn] + minprodN,
+            pollutants[:, orgn] - minprodN,
+        )
+
+        din = get_din_pool()
+
+        # macrophyte uptake temperature dependence factor
+        tempfcn1 = (np.maximum(0, temperature) / 20) ** 0.3
+        tempfcn2 = (temperature - temp_20_day) / 5
+        tempfcn = np.maximum(0, tempfcn1 * tempfcn2)
+
+        macrouptN = par["muptNpar"] * tempfcn * par["area"]
+        macrophyte_uptake_N = np.minimum(0.5 * din, macrouptN)
+        loss = din_proportion(macrophyte_uptake_N, din)
+        out_ += loss
+        pollutants -= loss
+
+        macrouptP = (
+            par["muptPpar"] * tempfcn * np.maximum(0, totalphosfcn) * par["area"]
+        )
+        macrophyte_uptake_P = np.minimum(0.5 * pollutants[:, phos], macrouptP)
+        out_[:, phos] += macrophyte_uptake_P
+        pollutants[:, phos] -= macrophyte_uptake_P
+
+        return in_, out_, pollutants
+
+    def distribute(self):
+        """Replaces calling `distribute` for each node in the river discharge
+        order."""
+        for block in self.blocks:
+            if isinstance(block, dict):
+                self.route_block(block)
+            else:
+                block.distribute()
+
+    def route_block(self, block):
+        """Discharge each wave of a block at once (see `River.distribute`), updating
+        the tanks of the reaches and receiving Rivers, and the arcs that they discharge
+        along.
+
+        Args:
+            block (dict): A block from `get_blocks`
+        """
+        additive = ["volume"] + constants.ADDITIVE_POLLUTANTS
+        non_additive = constants.NON_ADDITIVE_POLLUTANTS
+        nodes = block["nodes"]
+        arcs = block["arcs"]
+
+        # Gather states, where non-additive pollutants are blended by volume
+        storages = [node.tank.storage for node in nodes]
+        states = gather(storages, additive + non_additive)
+        amounts = states[:, : len(additive)]
+        blended = states[:, len(additive) :]
+        arc_states = gather([arc.vqip_in for arc in arcs], additive + non_additive)
+        arc_amounts = arc_states[:, : len(additive)]
+        arc_blended = arc_states[:, len(additive) :]
+        flow = np.array([arc.flow_in for arc in arcs], dtype=float)
+        capacity = np.array([arc.capacity for arc in arcs], dtype=float)
+        riverrc = block["riverrc"]
+
+        for sources, targets in block["waves"]:
+            # Pull outflow from tanks (see Tank.pull_storage)
+            volume = amounts[sources, 0]
+            outflow = np.minimum(volume * riverrc[sources], volume)
+            ratio = np.where(
+                volume > 0,
+                outflow / np.where(volume > 0, volume, 1),
+                (volume < 0).astype(float),
+            )
+            outflow = amounts[sources] * ratio[:, None]
+            amounts[sources] -= outflow
+
+            # Apply arc capacity (see Arc.send_push_request) and return any water that
+            # is not pushed to the tank
+            outflow_volume = outflow[:, 0]
+            excess = np.minimum(capacity[sources] - flow[sources], outflow_volume)
+            not_pushed = np.maximum(outflow_volume - excess, 0)
+            ratio = np.where(
+                outflow_volume > 0,
+                not_pushed / np.where(outflow_volume > 0, outflow_volume, 1),
+                0,
+            )
+            not_pushed = outflow * ratio[:, None]
+            pushed = outflow - not_pushed
+            amounts[sources] += not_pushed
+            for i in np.flatnonzero(not_pushed[:, 0] > constants.FLOAT_ACCURACY):
+                print("river cant push: {0}".format(not_pushed[i, 0]))
+
+            # Update arcs
+            pushed_volume = pushed[:, 0]
+            pushed_heat = blended[sources] * pushed_volume[:, None]
+            arc_volume = arc_amounts[sources, 0] + pushed_volume
+            arc_blended[sources] = np.where(
+                arc_volume[:, None] > 0,
+                (pushed_heat + arc_blended[sources] * arc_amounts[sources, 0, None])
+                / np.where(arc_volume > 0, arc_volume, 1)[:, None],
+                arc_blended[sources],
+            )
+            arc_amounts[sources] += pushed
+            flow[sources] += pushed_volume
+
+            # Push into receiving Rivers (see Tank.push_storage)
+            rivers = targets >= 0
+            if not rivers.any():
+                continue
+            targets = targets[rivers]
+            received = np.zeros_like(amounts)
+            received_heat = np.zeros_like(blended)
+            np.add.at(received, targets, pushed[rivers])
+            np.add.at(received_heat, targets, pushed_heat[rivers])
+            targets = np.unique(targets)
+            volume = amounts[targets, 0] + received[targets, 0]
+            blended[targets] = np.where(
+                volume[:, None] > 0,
+                (received_heat[targets] + blended[targets] * amounts[targets, 0, None])
+                / np.where(volume > 0, volume, 1)[:, None],
+                blended[targets],
+            )
+            amounts[targets] += received[targets]
+
+        # Update nodes and arcs
+        keys = additive + non_additive
+        for storage, row in zip(storages, states.tolist()):
+            storage.update(zip(keys, row))
+        for arc, row, flow_ in zip(arcs, arc_states.tolist(), flow.tolist()):
+            arc.vqip_in = dict(zip(keys, row))
+            arc.vqip_out = dict(zip(keys, row))
+            arc.flow_in = flow_
+            arc.flow_out = flow_